@@ -0,0 +1,182 @@
+import json
+import logging
+import os
+
+import numpy as np
+
+# Setup basic logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+def _unit(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    return vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+
+
+def kmeans(vectors, k, iterations=10, seed=0, block_size=4096):
+    """Spherical k-means on unit vectors. Returns (k x dim) unit centroids."""
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), size=k, replace=False)].copy()
+    for _ in range(iterations):
+        labels = assign(vectors, centroids, block_size)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, labels, vectors)
+        empty = np.bincount(labels, minlength=k) == 0
+        # Re-seed empty clusters with random points
+        sums[empty] = vectors[rng.choice(len(vectors), size=int(empty.sum()))]
+        centroids = _unit(sums)
+    return centroids
+
+
+def assign(vectors, centroids, block_size=4096):
+    labels = np.empty(len(vectors), dtype=np.int32)
+    for start in range(0, len(vectors), block_size):
+        labels[start:start + block_size] = np.argmax(vectors[start:start + block_size] @ centroids.T, axis=1)
+    return labels
+
+
+class IVFIndex:
+    """Inverted-file ANN index over an EmbeddingStore, persisted under `<store>/ivf/`.
+
+    A query scores only the articles in its `nprobe` closest k-means lists;
+    until `min_train_size` articles are indexed, every query is an exact scan.
+    """
+
+    def __init__(self, store, nprobe=8, min_train_size=5000, retrain_factor=4):
+        self.store = store
+        self.nprobe = nprobe
+        self.min_train_size = min_train_size
+        self.retrain_factor = retrain_factor
+        self.path = os.path.join(store.path, 'ivf')
+        os.makedirs(self.path, exist_ok=True)
+        self.centroids = None
+        self.trained_size = 0
+        self.ids = np.empty(0, dtype=np.int64)
+        self.lists = np.empty(0, dtype=np.int32)
+        self.times = np.empty(0, dtype=np.float64)
+        self.positions = {}
+        self._load()
+
+    def _file(self, name):
+        return os.path.join(self.path, name)
+
+    def _load(self):
+        meta_path = self._file('meta.json')
+        if not os.path.exists(meta_path):
+            return
+        with open(meta_path) as f:
+            self.trained_size = json.load(f).get('trained_size', 0)
+        if os.path.exists(self._file('centroids.npy')):
+            self.centroids = np.load(self._file('centroids.npy'))
+        self.ids = np.fromfile(self._file('ids.i64'), dtype=np.int64)
+        self.lists = np.fromfile(self._file('lists.i32'), dtype=np.int32)
+        self.times = np.fromfile(self._file('times.f64'), dtype=np.float64)
+        n = min(len(self.ids), len(self.lists), len(self.times))
+        self.ids, self.lists, self.times = self.ids[:n], self.lists[:n], self.times[:n]
+        self.positions = {int(i): p for p, i in enumerate(self.ids)}
+        self._build_lists()
+
+    def _save_meta(self):
+        with open(self._file('meta.json'), 'w') as f:
+            json.dump({"trained_size": self.trained_size,
+                       "nlist": 0 if self.centroids is None else len(self.centroids)}, f)
+
+    def _build_lists(self):
+        order = np.argsort(self.lists, kind='stable')
+        nlist = 1 if self.centroids is None else len(self.centroids)
+        bounds = np.searchsorted(self.lists[order], np.arange(nlist + 1))
+        self.members = [order[bounds[i]:bounds[i + 1]] for i in range(nlist)]
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __contains__(self, article_id):
+        return article_id in self.positions
+
+    def _vectors(self, positions):
+        return _unit(self.store.get(self.ids[positions]))
+
+    def train(self):
+        """(Re)build the coarse quantizer over everything indexed so far."""
+        n = len(self.ids)
+        # 4 * sqrt(n) lists, but never more lists than articles (small min_train_size)
+        nlist = max(1, min(n, int(4 * np.sqrt(n))))
+        sample = np.random.default_rng(0).choice(n, size=min(n, 50 * nlist), replace=False)
+        self.centroids = kmeans(self._vectors(np.sort(sample)), nlist)
+        self.lists = np.concatenate([
+            assign(self._vectors(np.arange(s, min(s + 8192, n))), self.centroids)
+            for s in range(0, n, 8192)
+        ]).astype(np.int32)
+        self.trained_size = n
+        np.save(self._file('centroids.npy'), self.centroids)
+        self.lists.tofile(self._file('lists.i32'))
+        self._save_meta()
+        self._build_lists()
+        logger.info(f"Trained IVF index: {n} articles, {nlist} lists.")
+
+    def add(self, article_ids, timestamps):
+        """Index articles already present in the embedding store."""
+        new = [(int(a), t) for a, t in zip(article_ids, timestamps) if int(a) not in self.positions]
+        if not new:
+            return
+        ids = np.array([a for a, _ in new], dtype=np.int64)
+        times = np.array([t for _, t in new], dtype=np.float64)
+        start = len(self.ids)
+        if self.centroids is None:
+            lists = np.zeros(len(ids), dtype=np.int32)
+        else:
+            lists = assign(_unit(self.store.get(ids)), self.centroids)
+
+        with open(self._file('ids.i64'), 'ab') as f:
+            f.write(ids.tobytes())
+        with open(self._file('lists.i32'), 'ab') as f:
+            f.write(lists.tobytes())
+        with open(self._file('times.f64'), 'ab') as f:
+            f.write(times.tobytes())
+        self.ids = np.concatenate([self.ids, ids])
+        self.lists = np.concatenate([self.lists, lists])
+        self.times = np.concatenate([self.times, times])
+        for offset, article_id in enumerate(ids):
+            self.positions[int(article_id)] = start + offset
+        self._save_meta()
+
+        n = len(self.ids)
+        if n >= self.min_train_size and (self.centroids is None or n >= self.retrain_factor * self.trained_size):
+            self.train()
+        else:
+            self._build_lists()
+
+    def count_neighbors(self, article_ids, threshold=0.65, window_seconds=None):
+        """Per article: indexed articles (excluding itself) with cosine > threshold.
+
+        With `window_seconds`, only neighbors whose timestamp is within that
+        distance of the query article's timestamp are counted.
+        """
+        positions = np.array([self.positions[int(a)] for a in article_ids], dtype=np.int64)
+        counts = np.zeros(len(positions), dtype=np.int64)
+        if not len(positions):
+            return counts
+        queries = self._vectors(positions)
+        query_times = self.times[positions]
+
+        if self.centroids is None:
+            probes = np.zeros((len(positions), 1), dtype=np.int64)
+        else:
+            nprobe = min(self.nprobe, len(self.centroids))
+            probes = np.argpartition(-(queries @ self.centroids.T), nprobe - 1, axis=1)[:, :nprobe]
+
+        # Score list by list: every query probing list l against l's members at once
+        for l in np.unique(probes):
+            members = self.members[l]
+            if not len(members):
+                continue
+            q = np.nonzero((probes == l).any(axis=1))[0]
+            for start in range(0, len(members), 8192):
+                chunk = members[start:start + 8192]
+                hits = (queries[q] @ self._vectors(chunk).T) > threshold
+                hits &= positions[q, None] != chunk[None, :]
+                if window_seconds is not None:
+                    hits &= np.abs(query_times[q, None] - self.times[chunk][None, :]) <= window_seconds
+                counts[q] += hits.sum(axis=1)
+        return counts
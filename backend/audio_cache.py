@@ -0,0 +1,153 @@
+import hashlib
+import io
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+import numpy as np
+
+try:
+    import soundfile
+    SOUNDFILE_AVAILABLE = True
+except ImportError:
+    SOUNDFILE_AVAILABLE = False
+
+# Setup basic logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+def audio_key(text, speaker, language, model):
+    """Content address of one synthesized sentence.
+
+    `speaker` identifies the speaker latents (the reference WAV's file hash).
+    """
+    material = "\x1f".join([model, speaker or "default", language, " ".join(text.split())])
+    return hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+
+def encode_audio(samples, sample_rate):
+    """Compress float samples: FLAC when soundfile is installed, else zlib'd 16-bit PCM."""
+    pcm = (np.clip(np.asarray(samples, dtype=np.float32), -1.0, 1.0) * 32767).astype('<i2')
+    if SOUNDFILE_AVAILABLE:
+        buf = io.BytesIO()
+        soundfile.write(buf, pcm, sample_rate, format='FLAC', subtype='PCM_16')
+        return 'flac', buf.getvalue()
+    return 'pcm16z', zlib.compress(pcm.tobytes(), 6)
+
+
+def decode_audio(codec, data):
+    if codec == 'flac':
+        pcm, _ = soundfile.read(io.BytesIO(data), dtype='int16')
+    else:
+        pcm = np.frombuffer(zlib.decompress(data), dtype='<i2')
+    return pcm.astype(np.float32) / 32767
+
+
+class AudioSegmentCache:
+    """Persistent cache of synthesized sentences in a standalone SQLite file.
+
+    Each entry is one compressed mono segment keyed by audio_key(). Once the
+    stored audio exceeds `max_mb`, least recently used segments are evicted.
+    Entries whose codec can't be decoded here (FLAC without soundfile) are
+    treated as misses.
+    """
+
+    def __init__(self, path="data/tts_cache.db", max_mb=500):
+        self.path = path
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._conn = None
+
+    @property
+    def conn(self):
+        # Opened on first use, so a generator that never synthesizes leaves no file behind
+        if self._conn is None:
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS segments ("
+                " key TEXT PRIMARY KEY, codec TEXT NOT NULL, sample_rate INTEGER NOT NULL,"
+                " audio BLOB NOT NULL, size INTEGER NOT NULL, created REAL NOT NULL, last_used REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS segments_last_used ON segments (last_used)")
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def get_many(self, keys, sample_rate):
+        """Cached samples per key (None for misses)."""
+        found = {}
+        with self.lock:
+            unique = list(dict.fromkeys(keys))
+            for start in range(0, len(unique), 500):
+                batch = unique[start:start + 500]
+                marks = ",".join("?" * len(batch))
+                rows = self.conn.execute(
+                    f"SELECT key, codec, audio FROM segments WHERE sample_rate = ? AND key IN ({marks})",
+                    [sample_rate] + batch,
+                )
+                for key, codec, audio in rows:
+                    if codec == 'flac' and not SOUNDFILE_AVAILABLE:
+                        continue
+                    found[key] = decode_audio(codec, audio)
+            if found:
+                now = time.time()
+                self.conn.executemany("UPDATE segments SET last_used = ? WHERE key = ?", [(now, k) for k in found])
+                self.conn.commit()
+            self.hits += sum(1 for k in keys if k in found)
+            self.misses += sum(1 for k in keys if k not in found)
+        return [found.get(k) for k in keys]
+
+    def put_many(self, items, sample_rate):
+        """Store (key, samples) pairs."""
+        now = time.time()
+        rows = []
+        for key, samples in items:
+            codec, data = encode_audio(samples, sample_rate)
+            rows.append((key, codec, sample_rate, sqlite3.Binary(data), len(data), now, now))
+        if not rows:
+            return
+        with self.lock:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO segments (key, codec, sample_rate, audio, size, created, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)", rows
+            )
+            self._evict()
+            self.conn.commit()
+
+    def _evict(self):
+        total = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM segments").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # Oldest first until back under the cap
+        doomed = []
+        for key, size in self.conn.execute("SELECT key, size FROM segments ORDER BY last_used"):
+            if total <= self.max_bytes:
+                break
+            doomed.append((key,))
+            total -= size
+        self.conn.executemany("DELETE FROM segments WHERE key = ?", doomed)
+        self.evictions += len(doomed)
+        logger.info(f"Audio cache evicted {len(doomed)} segments.")
+
+    def stats(self):
+        with self.lock:
+            entries, size = self.conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM segments").fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "entries": entries,
+            "bytes": size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
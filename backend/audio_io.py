@@ -0,0 +1,115 @@
+import logging
+import struct
+import wave
+
+import numpy as np
+
+# Setup basic logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# RIFF/data sizes for a stream whose length is not known up front
+STREAMING_SIZE = 0xFFFFFFFF
+
+# Narration pace used to size placeholder audio to a script
+WORDS_PER_MINUTE = 150
+
+
+def wav_header(sample_rate, data_size=STREAMING_SIZE, channels=1, sample_width=2):
+    riff_size = STREAMING_SIZE if data_size == STREAMING_SIZE else 36 + data_size
+    return struct.pack(
+        '<4sI4s4sIHHIIHH4sI',
+        b'RIFF', riff_size, b'WAVE', b'fmt ', 16, 1, channels, sample_rate,
+        sample_rate * channels * sample_width, channels * sample_width, sample_width * 8,
+        b'data', data_size,
+    )
+
+
+def finalize_streamed_wav(path):
+    """Replace a streamed WAV's placeholder sizes with the real ones; returns the PCM byte count."""
+    with open(path, 'r+b') as f:
+        size = f.seek(0, 2)
+        if size < 44:
+            raise ValueError(f"{path} has no WAV data")
+        f.seek(4)
+        f.write(struct.pack('<I', size - 8))
+        f.seek(40)
+        f.write(struct.pack('<I', size - 44))
+    return size - 44
+
+
+def to_pcm16(samples):
+    samples = np.clip(np.asarray(samples, dtype=np.float32), -1.0, 1.0)
+    return (samples * 32767).astype('<i2').tobytes()
+
+
+def from_pcm16(data):
+    return np.frombuffer(data, dtype='<i2').astype(np.float32) / 32767
+
+
+def speech_seconds(text, words_per_minute=WORDS_PER_MINUTE, minimum=1.0):
+    """Roughly how long `text` (a string or list of segments) takes to narrate."""
+    if not isinstance(text, str):
+        text = " ".join(t for t in text if t)
+    return max(minimum, len(text.split()) * 60.0 / words_per_minute)
+
+
+def silence(seconds, sample_rate):
+    return np.zeros(int(round(seconds * sample_rate)), dtype=np.float32)
+
+
+def crossfade_concat(pieces, sample_rate, crossfade_ms=40):
+    """Join sample arrays with linear crossfades.
+
+    Returns (samples, spans) where spans[i] = (start, end) in seconds of
+    piece i in the output; neighbours overlap by the crossfade.
+    """
+    fade = int(sample_rate * crossfade_ms / 1000)
+    out = np.zeros(sum(len(p) for p in pieces), dtype=np.float32)
+    spans = []
+    length = 0
+    for piece in pieces:
+        piece = np.asarray(piece, dtype=np.float32)
+        overlap = min(fade, length, len(piece))
+        start = length - overlap
+        if overlap:
+            ramp = np.linspace(0.0, 1.0, overlap, endpoint=False, dtype=np.float32)
+            out[start:length] = out[start:length] * (1.0 - ramp) + piece[:overlap] * ramp
+        out[length:start + len(piece)] = piece[overlap:]
+        length = start + len(piece)
+        spans.append((start / sample_rate, length / sample_rate))
+    return out[:length], spans
+
+
+def write_wav(path, samples, sample_rate):
+    """Write float samples in [-1, 1] as a 16-bit mono WAV in one writeframes() call."""
+    with wave.open(path, 'wb') as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(sample_rate)
+        f.writeframes(to_pcm16(samples))
+    return path
+
+
+def write_silence(path, seconds, sample_rate):
+    """Placeholder narration: `seconds` of silence (see speech_seconds())."""
+    return write_wav(path, silence(seconds, sample_rate), sample_rate)
+
+
+def wav_duration(path):
+    """Length of a WAV in seconds, from its header."""
+    with wave.open(path, 'rb') as f:
+        return f.getnframes() / f.getframerate()
+
+
+def read_wav(path):
+    """(float32 samples, sample_rate) of a 16-bit WAV; stereo is mixed down to mono."""
+    with wave.open(path, 'rb') as f:
+        if f.getsampwidth() != 2:
+            raise ValueError(f"{path}: only 16-bit PCM is supported")
+        channels = f.getnchannels()
+        sample_rate = f.getframerate()
+        samples = from_pcm16(f.readframes(f.getnframes()))
+    if channels > 1:
+        samples = samples.reshape(-1, channels).mean(axis=1)
+    return samples, sample_rate
@@ -0,0 +1,78 @@
+"""Compare embedding backends: throughput and top-K ranking agreement.
+
+Usage: python -m backend.bench_embeddings --backends torch torch-int8 onnx onnx-int8
+"""
+import argparse
+import random
+import time
+
+import numpy as np
+
+from .embedding_backends import BACKENDS, load_embedding_model
+from .embeddings import normalize
+from .trends import count_similar
+
+NAMES = ["Taylor Swift", "Travis Kelce", "Kim Kardashian", "Drake", "Rihanna", "Beyonce", "Zendaya", "Tom Holland"]
+EVENTS = ["spotted at dinner", "reveals secret", "breakup rumors", "new album", "wedding plans", "shocking outfit"]
+
+
+def load_titles(n, seed=0):
+    try:
+        from .models import Article
+        titles = [t for (t,) in Article.select(Article.title).limit(n).tuples()]
+    except Exception:
+        titles = []
+    if len(titles) >= n:
+        return titles
+    rnd = random.Random(seed)
+    titles += [f"{rnd.choice(NAMES)} {rnd.choice(EVENTS)} in {rnd.choice(['LA', 'NYC', 'London'])}"
+               for _ in range(n - len(titles))]
+    return titles
+
+
+def neighbor_overlap(base, other, k):
+    def knn(vectors):
+        sims = normalize(vectors) @ normalize(vectors).T
+        np.fill_diagonal(sims, -np.inf)
+        return np.argpartition(-sims, k, axis=1)[:, :k]
+    a, b = knn(base), knn(other)
+    return float(np.mean([len(set(x) & set(y)) / k for x, y in zip(a, b)]))
+
+
+def trend_overlap(base, other, k, threshold):
+    top = lambda v: set(np.argsort(-count_similar(v, threshold), kind='stable')[:k])
+    return len(top(base) & top(other)) / k
+
+
+def run(backends, model_name, n, k, batch_size, threshold):
+    titles = load_titles(n)
+    results = {}
+    for backend in backends:
+        model = load_embedding_model(model_name, backend=backend, batch_size=batch_size)
+        if model is None:
+            raise SystemExit("sentence-transformers is not installed.")
+        model.encode(titles[:batch_size])  # warm-up
+        start = time.perf_counter()
+        vectors = np.asarray(model.encode(titles), dtype=np.float32)
+        results[backend] = (vectors, len(titles) / (time.perf_counter() - start))
+
+    baseline = backends[0]
+    base_vectors, base_rate = results[baseline]
+    print(f"{n} titles, model {model_name}, batch {batch_size}, baseline {baseline}")
+    for backend in backends:
+        vectors, rate = results[backend]
+        print(f"  {backend:<11} {rate:8.1f} texts/sec ({rate / base_rate:.2f}x) | "
+              f"neighbor@{k} {neighbor_overlap(base_vectors, vectors, k):.3f} | "
+              f"trend top-{k} {trend_overlap(base_vectors, vectors, k, threshold):.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--backends", nargs="+", default=list(BACKENDS), choices=BACKENDS)
+    parser.add_argument("--model", default="all-MiniLM-L6-v2")
+    parser.add_argument("-n", type=int, default=2000)
+    parser.add_argument("-k", type=int, default=10)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--threshold", type=float, default=0.65)
+    args = parser.parse_args()
+    run(args.backends, args.model, args.n, args.k, args.batch_size, args.threshold)
@@ -0,0 +1,89 @@
+"""Benchmark feed fetching against a local HTTP stand-in.
+
+Usage: python -m backend.bench_ingestion --feeds 40 --latency 0.2
+"""
+import argparse
+import hashlib
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from .ingestion import fetch_feeds
+
+
+def build_feed(index, entries=20):
+    items = "".join(
+        f"<item><title>Feed {index} story {i}</title>"
+        f"<link>http://127.0.0.1/feed/{index}/story/{i}</link>"
+        f"<description>Synthetic story {i} from feed {index}.</description></item>"
+        for i in range(entries)
+    )
+    return (
+        '<?xml version="1.0"?><rss version="2.0"><channel>'
+        f"<title>Feed {index}</title>{items}</channel></rss>"
+    ).encode()
+
+
+def make_handler(latency):
+    class FeedHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            time.sleep(latency)
+            index = int(self.path.strip('/').split('/')[-1])
+            body = build_feed(index)
+            etag = '"' + hashlib.md5(body).hexdigest() + '"'
+            if self.headers.get("If-None-Match") == etag:
+                self.send_response(304)
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "application/rss+xml")
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    return FeedHandler
+
+
+def run(feeds, latency, workers):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(latency))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    port = server.server_address[1]
+    sources = [
+        {"name": f"feed-{i}", "url": f"http://127.0.0.1:{port}/feed/{i}"}
+        for i in range(feeds)
+    ]
+
+    try:
+        start = time.perf_counter()
+        fetch_feeds(sources, max_workers=1)
+        sequential = time.perf_counter() - start
+
+        start = time.perf_counter()
+        results = fetch_feeds(sources, max_workers=workers)
+        concurrent = time.perf_counter() - start
+
+        states = {r["source"]['url']: (r["etag"], r["last_modified"]) for r in results}
+        start = time.perf_counter()
+        cached = fetch_feeds(sources, states=states, max_workers=workers)
+        conditional = time.perf_counter() - start
+        not_modified = sum(1 for r in cached if r["status"] == 304)
+    finally:
+        server.shutdown()
+
+    print(f"{feeds} feeds, {latency:.2f}s latency each")
+    print(f"  sequential:            {sequential:.2f}s")
+    print(f"  concurrent ({workers} workers): {concurrent:.2f}s ({sequential / concurrent:.1f}x)")
+    print(f"  conditional GET:       {conditional:.2f}s ({not_modified}/{feeds} returned 304)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--feeds", type=int, default=40)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--workers", type=int, default=8)
+    args = parser.parse_args()
+    run(args.feeds, args.latency, args.workers)
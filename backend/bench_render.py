@@ -0,0 +1,100 @@
+"""Benchmark video rendering: ffmpeg filtergraph vs MoviePy.
+
+Usage: python -m backend.bench_render --seconds 30 --clips 6
+"""
+import argparse
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+
+import numpy as np
+
+from .audio_io import write_wav
+from .media import VideoFileClip, MediaEngine
+
+SCRIPT = ("You won't believe who was spotted leaving the party last night! "
+          "Fans are losing it over the surprise reunion. "
+          "Sources say the pair talked for hours before slipping out the back. "
+          "Is a comeback album on the way? Subscribe for more tea!")
+
+
+class LocalFootageEngine(MediaEngine):
+    """MediaEngine whose stock search hands out copies of local clips."""
+
+    def __init__(self, clips, workdir, renderer):
+        super().__init__()
+        self.clips = clips
+        self.workdir = workdir
+        self.config['video']['renderer'] = renderer
+
+    def fetch_stock_videos(self, query, orientation="portrait", count=3):
+        # generate_video deletes what it was given, so hand out copies
+        files = []
+        for i, clip in enumerate(self.clips[:count]):
+            target = os.path.join(self.workdir, f"temp_stock_{i}.mp4")
+            shutil.copyfile(clip, target)
+            files.append(target)
+        return files
+
+
+def make_clips(ffmpeg, workdir, count, seconds, size="1280x720"):
+    clips = []
+    for i in range(count):
+        path = os.path.join(workdir, f"stock_{i}.mp4")
+        subprocess.run([ffmpeg, '-y', '-loglevel', 'error', '-f', 'lavfi',
+                        '-i', f"testsrc2=size={size}:rate=30:duration={seconds}",
+                        '-c:v', 'libx264', '-preset', 'ultrafast', '-pix_fmt', 'yuv420p', path], check=True)
+        clips.append(path)
+    return clips
+
+
+def make_narration(path, seconds, sample_rate=24000):
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    write_wav(path, 0.3 * np.sin(2 * np.pi * 220 * t) * (0.5 + 0.5 * np.sin(2 * np.pi * 3 * t)), sample_rate)
+    return path
+
+
+def run(seconds, clips, clip_seconds, renderers):
+    with tempfile.TemporaryDirectory() as workdir:
+        probe = MediaEngine()
+        ffmpeg = probe.ffmpeg_binary()
+        if not ffmpeg:
+            raise SystemExit("ffmpeg not found (install it or MoviePy's imageio-ffmpeg).")
+        started = time.perf_counter()
+        sources = make_clips(ffmpeg, workdir, clips, clip_seconds)
+        audio = make_narration(os.path.join(workdir, "narration.wav"), seconds)
+        print(f"inputs: {clips} x {clip_seconds}s 1280x720 clips, {seconds}s narration "
+              f"(made in {time.perf_counter() - started:.1f}s)")
+
+        results = {}
+        for renderer in renderers:
+            if renderer == 'moviepy' and VideoFileClip is None:
+                print("moviepy: skipped (not installed)")
+                continue
+            engine = LocalFootageEngine(sources, workdir, renderer)
+            output = os.path.join(workdir, f"out_{renderer}.mp4")
+            started = time.perf_counter()
+            ok = engine.generate_video(audio, SCRIPT, "celebrity", output, mode="shorts")
+            elapsed = time.perf_counter() - started
+            if not ok or not os.path.exists(output):
+                print(f"{renderer}: failed after {elapsed:.1f}s")
+                continue
+            duration = probe.audio_duration(output)
+            results[renderer] = elapsed
+            print(f"{renderer:8s} {elapsed:7.2f}s  ({seconds / elapsed:.2f}x real time, "
+                  f"output {duration:.2f}s, {os.path.getsize(output) / 1e6:.1f} MB)")
+
+        if len(results) == 2:
+            print(f"ffmpeg speedup: {results['moviepy'] / results['ffmpeg']:.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seconds", type=float, default=30)
+    parser.add_argument("--clips", type=int, default=6)
+    parser.add_argument("--clip-seconds", type=float, default=8)
+    parser.add_argument("--renderers", nargs="+", default=["ffmpeg", "moviepy"])
+    args = parser.parse_args()
+    run(args.seconds, args.clips, args.clip_seconds, args.renderers)
@@ -0,0 +1,98 @@
+"""Benchmark trend scoring on synthetic embeddings.
+
+Usage: python -m backend.bench_trends --sizes 1000 10000 50000
+"""
+import argparse
+import random
+import tempfile
+import time
+
+import numpy as np
+
+from .ann import IVFIndex
+from .embeddings import EmbeddingStore
+from .keywords import KeywordMatcher
+from .trends import count_similar, normalize
+
+KEYWORDS = ["shocking", "reveal", "secret", "relationship", "breakup", "spotted", "viral"]
+VOCAB = ["star", "dinner", "album", "tour", "red", "carpet", "wedding", "fans"] + KEYWORDS
+
+
+def synthetic(n, dim=384, stories=None, seed=0):
+    """n embeddings drawn around `stories` cluster centers, plus matching texts."""
+    rng = np.random.default_rng(seed)
+    stories = stories or max(1, n // 20)
+    centers = rng.standard_normal((stories, dim)).astype(np.float32)
+    labels = rng.integers(0, stories, n)
+    embeddings = centers[labels] + 0.5 * rng.standard_normal((n, dim)).astype(np.float32)
+    rnd = random.Random(seed)
+    texts = [" ".join(rnd.choices(VOCAB, k=12)) for _ in range(n)]
+    return embeddings, texts
+
+
+def loop_scores(embeddings, texts, threshold=0.65):
+    unit = normalize(embeddings)
+    cosine_scores = unit @ unit.T
+    scores = []
+    for i in range(len(texts)):
+        sim_count = 0
+        for j in range(len(texts)):
+            if i == j: continue
+            if cosine_scores[i][j] > threshold:
+                sim_count += 1
+        keyword_score = 0
+        content_lower = texts[i].lower()
+        for kw in KEYWORDS:
+            if kw.lower() in content_lower:
+                keyword_score += 1.5
+        scores.append(sim_count + keyword_score)
+    return np.array(scores)
+
+
+def vector_scores(embeddings, texts, threshold=0.65):
+    return count_similar(embeddings, threshold) + KeywordMatcher(KEYWORDS, default_weight=1.5).scores(texts)
+
+
+def ann_counts(embeddings, threshold=0.65):
+    """Build an IVF index in a temp dir; return (counts, build_s, query_s)."""
+    with tempfile.TemporaryDirectory() as tmp:
+        store = EmbeddingStore("bench", tmp)
+        ids = np.arange(1, len(embeddings) + 1)
+        store.add(ids, embeddings)
+        start = time.perf_counter()
+        index = IVFIndex(store, min_train_size=min(5000, len(ids)))
+        index.add(ids, np.zeros(len(ids)))
+        build = time.perf_counter() - start
+        start = time.perf_counter()
+        counts = index.count_neighbors(ids, threshold)
+        return counts, build, time.perf_counter() - start
+
+
+def run(sizes, loop_max, ann=False):
+    for n in sizes:
+        embeddings, texts = synthetic(n)
+        start = time.perf_counter()
+        fast = vector_scores(embeddings, texts)
+        vector_time = time.perf_counter() - start
+        line = f"n={n:>6}: vectorized {vector_time:8.3f}s"
+        if ann:
+            exact = count_similar(embeddings)
+            counts, build, query = ann_counts(embeddings)
+            recall = counts.sum() / max(1, exact.sum())
+            line += f" | ivf build {build:.3f}s query {query:.3f}s (recall {recall:.3f})"
+        if n <= loop_max:
+            start = time.perf_counter()
+            slow = loop_scores(embeddings, texts)
+            loop_time = time.perf_counter() - start
+            agree = np.allclose(fast, slow)
+            line += f" | loop {loop_time:8.3f}s ({loop_time / vector_time:.0f}x, match={agree})"
+        print(line)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--loop-max", type=int, default=2000)
+    parser.add_argument("--ann", action="store_true", help="also time the IVF index")
+    args = parser.parse_args()
+    run(args.sizes, args.loop_max, args.ann)
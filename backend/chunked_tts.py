@@ -0,0 +1,173 @@
+import logging
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from .audio_io import crossfade_concat
+
+# Setup basic logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+SENTENCE_END_RE = re.compile(r'(?<=[.!?…])["\')\]]*\s+')
+CLAUSE_END_RE = re.compile(r'(?<=[,;:])\s+')
+
+# Per-process voice model, created by the pool initializer
+_voice = None
+
+
+def _init_worker(factory, threads):
+    global _voice
+    if threads:
+        try:
+            import torch
+            torch.set_num_threads(threads)
+        except ImportError:
+            pass
+    _voice = factory()
+    if hasattr(_voice, 'load_model'):
+        _voice.load_model()
+
+
+def _warm(delay):
+    # Holds a worker long enough that every process in the pool gets spawned
+    time.sleep(delay)
+
+
+def _synthesize_chunk(index, text, language, speaker_wav):
+    start = time.perf_counter()
+    samples = np.asarray(_voice.synthesize(text, language=language, speaker_wav=speaker_wav), dtype=np.float32)
+    return index, samples, time.perf_counter() - start
+
+
+def _pack(pieces, max_chars):
+    """Greedily join pieces with spaces into chunks of at most `max_chars`."""
+    chunks = []
+    current = ""
+    for piece in pieces:
+        if current and len(current) + 1 + len(piece) > max_chars:
+            chunks.append(current)
+            current = piece
+        else:
+            current = f"{current} {piece}" if current else piece
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def _split_long(sentence, max_chars):
+    """An over-long sentence cut at clause punctuation, then at spaces."""
+    pieces = []
+    for clause in CLAUSE_END_RE.split(sentence):
+        while len(clause) > max_chars:
+            cut = clause.rfind(' ', 0, max_chars)
+            cut = cut if cut > 0 else max_chars
+            pieces.append(clause[:cut].strip())
+            clause = clause[cut:].strip()
+        pieces.append(clause)
+    return _pack(pieces, max_chars)
+
+
+def split_sentences(text, max_chars=250, merge=True):
+    """Sentence chunks of at most `max_chars`.
+
+    Short sentences are merged into one chunk unless `merge` is False (one
+    chunk per sentence). An over-long sentence is split at clause
+    punctuation, then at spaces, and never shares a chunk with its
+    neighbours.
+    """
+    chunks = []
+    run = []
+    for sentence in SENTENCE_END_RE.split(text.strip()):
+        sentence = sentence.strip()
+        if not sentence:
+            continue
+        if len(sentence) > max_chars:
+            chunks += _pack(run, max_chars) if merge else run
+            run = []
+            chunks += _split_long(sentence, max_chars)
+        else:
+            run.append(sentence)
+    chunks += _pack(run, max_chars) if merge else run
+    return chunks
+
+
+def stitch(chunks, pieces, seconds, sample_rate, crossfade_ms=40):
+    """Crossfade (segment, text) chunks' audio into one track plus per-chunk timings."""
+    samples, spans = crossfade_concat(pieces, sample_rate, crossfade_ms)
+    timings = [
+        {"index": i, "segment": segment, "text": text, "start": start, "end": end, "synth_seconds": seconds[i]}
+        for i, ((segment, text), (start, end)) in enumerate(zip(chunks, spans))
+    ]
+    return samples, timings
+
+
+class ChunkedSynthesizer:
+    """Process pool of warm voice models for one long script at a time.
+
+    `factory()` builds the voice in each worker process (it must be
+    picklable, e.g. functools.partial(VoiceGenerator, use_service=False));
+    the voice needs synthesize(text, language, speaker_wav) -> samples.
+    """
+
+    def __init__(self, factory, workers=2, sample_rate=24000, max_chars=250, crossfade_ms=40, threads_per_worker=None):
+        self.factory = factory
+        self.workers = workers
+        self.sample_rate = sample_rate
+        self.max_chars = max_chars
+        self.crossfade_ms = crossfade_ms
+        self.threads_per_worker = threads_per_worker
+        self.pool = None
+
+    def start(self):
+        """Spawn the workers and load a model in each (the slow part, done once)."""
+        if self.pool is None:
+            started = time.perf_counter()
+            self.pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                            initargs=(self.factory, self.threads_per_worker))
+            list(self.pool.map(_warm, [0.2] * self.workers))
+            logger.info(f"Warmed {self.workers} TTS workers in {time.perf_counter() - started:.1f}s")
+        return self
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
+
+    def synthesize_chunks(self, texts, language="en", speaker_wav=None):
+        """Samples and synthesis seconds for each text, in input order."""
+        self.start()
+        # Longest chunks first so a long tail doesn't leave workers idle
+        order = sorted(range(len(texts)), key=lambda i: -len(texts[i]))
+        futures = [self.pool.submit(_synthesize_chunk, i, texts[i], language, speaker_wav) for i in order]
+        pieces = [None] * len(texts)
+        seconds = [0.0] * len(texts)
+        for future in as_completed(futures):
+            index, samples, elapsed = future.result()
+            pieces[index] = samples
+            seconds[index] = elapsed
+        return pieces, seconds
+
+    def synthesize(self, segments, language="en", speaker_wav=None):
+        """Samples for `segments` (a string or list of strings) plus per-chunk timings.
+
+        Each timing is {"index", "segment", "text", "start", "end",
+        "synth_seconds"}, with start/end in seconds of the output audio.
+        """
+        if isinstance(segments, str):
+            segments = [segments]
+        chunks = [(s, text) for s, segment in enumerate(segments)
+                  for text in split_sentences(segment, self.max_chars)]
+        if not chunks:
+            return np.zeros(0, dtype=np.float32), []
+
+        started = time.perf_counter()
+        pieces, seconds = self.synthesize_chunks([text for _, text in chunks], language, speaker_wav)
+        samples, timings = stitch(chunks, pieces, seconds, self.sample_rate, self.crossfade_ms)
+        wall = time.perf_counter() - started
+        audio_seconds = len(samples) / self.sample_rate
+        logger.info(f"Synthesized {len(chunks)} chunks ({audio_seconds:.1f}s audio) in {wall:.1f}s "
+                    f"on {self.workers} workers (sum of chunk times {sum(seconds):.1f}s)")
+        return samples, timings
@@ -0,0 +1,131 @@
+import hashlib
+import re
+
+import numpy as np
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+# Query params that only track the click and never change the story
+TRACKING_PARAMS = {
+    'fbclid', 'gclid', 'dclid', 'msclkid', 'mc_cid', 'mc_eid', 'igshid',
+    'ocid', 'cmpid', 'ito', 'ref', 'ref_src', 'amp', 'outputtype',
+}
+TRACKING_PREFIXES = ('utm_', '_hs', 'ns_', 'at_')
+
+FINGERPRINT_BITS = 64
+# A 64-bit SimHash split into 4 x 16-bit bands. Two fingerprints within
+# Hamming distance 3 must agree exactly on at least one band (pigeonhole),
+# so near-duplicate lookup is an indexed equality query per band.
+BAND_COUNT = 4
+BAND_BITS = FINGERPRINT_BITS // BAND_COUNT
+MAX_HAMMING_DISTANCE = BAND_COUNT - 1
+
+_TAG_RE = re.compile(r'<[^>]+>')
+_WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def canonicalize_url(url):
+    """Normalize a story URL so tracking/amp variants collapse to one key.
+
+    Lowercases scheme and host, drops `www.`/`amp.` prefixes, default ports,
+    fragments, tracking params and trailing `/amp` path segments, and sorts
+    the remaining query string.
+    """
+    if not url:
+        return url
+    parts = urlsplit(url.strip())
+    scheme = (parts.scheme or 'http').lower()
+    if scheme == 'https':
+        scheme = 'http'
+
+    host = (parts.hostname or '').lower()
+    for prefix in ('www.', 'amp.', 'm.'):
+        if host.startswith(prefix):
+            host = host[len(prefix):]
+    if parts.port and parts.port not in (80, 443):
+        host = f"{host}:{parts.port}"
+
+    path = re.sub(r'/+', '/', parts.path or '/')
+    path = re.sub(r'(/amp)+/?$', '/', path)
+    path = re.sub(r'\.amp(\.html?)?$', r'\1', path)
+    if len(path) > 1:
+        path = path.rstrip('/')
+
+    query = [
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if k.lower() not in TRACKING_PARAMS and not k.lower().startswith(TRACKING_PREFIXES)
+    ]
+    return urlunsplit((scheme, host, path, urlencode(sorted(query)), ''))
+
+
+def _features(text):
+    words = _WORD_RE.findall(_TAG_RE.sub(' ', text or '').lower())
+    # Unigrams plus bigrams: short RSS summaries need some word-order signal
+    return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+
+def simhash(text):
+    """64-bit SimHash of the word/bigram features of `text` (unsigned int)."""
+    features = _features(text)
+    if not features:
+        return 0
+    digests = b''.join(hashlib.blake2b(f.encode('utf-8'), digest_size=8).digest() for f in features)
+    # One row of 64 bits per feature; digests read as little-endian ints, so column k is bit k
+    bits = np.unpackbits(np.frombuffer(digests, dtype=np.uint8), bitorder='little')
+    ones = bits.reshape(len(features), FINGERPRINT_BITS).sum(axis=0, dtype=np.int64)
+    # Bit k is set when more features have it set than unset
+    packed = np.packbits(2 * ones > len(features), bitorder='little')
+    return int.from_bytes(packed.tobytes(), 'little')
+
+
+def content_fingerprint(title, summary):
+    return simhash(f"{title or ''} {summary or ''}")
+
+
+def hamming_distance(a, b):
+    return bin((a ^ b) & ((1 << FINGERPRINT_BITS) - 1)).count('1')
+
+
+def fingerprint_bands(fingerprint):
+    """Split a fingerprint into BAND_COUNT integer bands (low bits first)."""
+    mask = (1 << BAND_BITS) - 1
+    return [(fingerprint >> (i * BAND_BITS)) & mask for i in range(BAND_COUNT)]
+
+
+def to_signed(fingerprint):
+    """SQLite integers are signed 64-bit; store the fingerprint two's-complement."""
+    return fingerprint - (1 << FINGERPRINT_BITS) if fingerprint >= 1 << (FINGERPRINT_BITS - 1) else fingerprint
+
+
+def to_unsigned(value):
+    return value + (1 << FINGERPRINT_BITS) if value < 0 else value
+
+
+class FingerprintIndex:
+    """In-memory band index: near-duplicate lookup without pairwise scans."""
+
+    def __init__(self, max_distance=MAX_HAMMING_DISTANCE):
+        self.max_distance = min(max_distance, MAX_HAMMING_DISTANCE)
+        self.bands = [dict() for _ in range(BAND_COUNT)]
+
+    def add(self, fingerprint):
+        for i, band in enumerate(fingerprint_bands(fingerprint)):
+            self.bands[i].setdefault(band, set()).add(fingerprint)
+
+    def find(self, fingerprint):
+        """Return a stored fingerprint within max_distance, or None."""
+        for i, band in enumerate(fingerprint_bands(fingerprint)):
+            for candidate in self.bands[i].get(band, ()):
+                if hamming_distance(candidate, fingerprint) <= self.max_distance:
+                    return candidate
+        return None
+
+
+def dedup_columns(url, title, summary):
+    """Article column values for the dedup index."""
+    fingerprint = content_fingerprint(title, summary)
+    columns = {"canonical_url": canonicalize_url(url), "fingerprint": None}
+    columns.update({f"fp_band{i}": None for i in range(BAND_COUNT)})
+    if fingerprint:
+        columns["fingerprint"] = to_signed(fingerprint)
+        columns.update({f"fp_band{i}": band for i, band in enumerate(fingerprint_bands(fingerprint))})
+    return columns
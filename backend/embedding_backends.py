@@ -0,0 +1,62 @@
+import logging
+
+try:
+    import torch
+    from sentence_transformers import SentenceTransformer
+    SENTENCE_TRANSFORMERS_AVAILABLE = True
+except ImportError:
+    SENTENCE_TRANSFORMERS_AVAILABLE = False
+
+# Setup basic logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# float32 PyTorch, PyTorch with int8 Linear layers, ONNX Runtime (sentence-transformers
+# >= 3.2) and ONNX Runtime with a pre-quantized int8 graph
+BACKENDS = ("torch", "torch-int8", "onnx", "onnx-int8")
+# Quantized graph shipped in the sentence-transformers/all-MiniLM-L6-v2 repo;
+# the AVX2 variant runs on any x86-64 VPS from the last decade.
+DEFAULT_ONNX_INT8_FILE = "onnx/model_quint8_avx2.onnx"
+
+
+class BatchedModel:
+    """Wraps a SentenceTransformer so every encode() uses the configured batch size."""
+
+    def __init__(self, model, backend, batch_size=32):
+        self.model = model
+        self.backend = backend
+        self.batch_size = batch_size
+
+    def encode(self, texts, **kwargs):
+        kwargs.setdefault("batch_size", self.batch_size)
+        kwargs.setdefault("convert_to_numpy", True)
+        return self.model.encode(texts, **kwargs)
+
+
+def store_key(model_name, backend):
+    """Embedding-store name: backends produce slightly different vectors, so never mix them."""
+    return model_name if backend == "torch" else f"{model_name}@{backend}"
+
+
+def load_embedding_model(model_name, backend="torch", batch_size=32, onnx_file=None):
+    """Load `model_name` on CPU with the requested backend (None if unavailable)."""
+    if not SENTENCE_TRANSFORMERS_AVAILABLE:
+        logger.warning("sentence-transformers not found. Embedding model unavailable.")
+        return None
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown embedding backend '{backend}', expected one of {BACKENDS}")
+
+    logger.info(f"Loading {model_name} ({backend})...")
+    if backend == "torch":
+        model = SentenceTransformer(model_name, device="cpu")
+    elif backend == "torch-int8":
+        model = SentenceTransformer(model_name, device="cpu")
+        model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    else:
+        model_kwargs = {"provider": "CPUExecutionProvider"}
+        if backend == "onnx-int8":
+            model_kwargs["file_name"] = onnx_file or DEFAULT_ONNX_INT8_FILE
+        elif onnx_file:
+            model_kwargs["file_name"] = onnx_file
+        model = SentenceTransformer(model_name, device="cpu", backend="onnx", model_kwargs=model_kwargs)
+    return BatchedModel(model, backend, batch_size)
@@ -0,0 +1,204 @@
+import argparse
+import base64
+import json
+import logging
+import queue
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import requests
+
+# Setup basic logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+def encode_array(array):
+    array = np.ascontiguousarray(array, dtype=np.float32)
+    return {"shape": list(array.shape), "data": base64.b64encode(array.tobytes()).decode('ascii')}
+
+
+def decode_array(payload):
+    return np.frombuffer(base64.b64decode(payload["data"]), dtype=np.float32).reshape(payload["shape"])
+
+
+class BatchingEncoder:
+    """Merges concurrent encode requests into batches for one model."""
+
+    def __init__(self, model, max_batch=64, max_wait=0.01):
+        self.model = model
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.requests = queue.Queue()
+        self.lock = threading.Lock()
+        self.started = time.time()
+        self.stats = {"requests": 0, "texts": 0, "batches": 0, "encode_seconds": 0.0}
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def encode(self, texts):
+        """Blocking; called from request threads."""
+        done = threading.Event()
+        job = {"texts": list(texts), "done": done, "result": None, "error": None}
+        self.requests.put(job)
+        done.wait()
+        if job["error"] is not None:
+            raise job["error"]
+        return job["result"]
+
+    def _run(self):
+        while True:
+            jobs = [self.requests.get()]
+            count = len(jobs[0]["texts"])
+            deadline = time.monotonic() + self.max_wait
+            while count < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    job = self.requests.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                jobs.append(job)
+                count += len(job["texts"])
+            self._encode_batch(jobs)
+
+    def _encode_batch(self, jobs):
+        texts = [t for job in jobs for t in job["texts"]]
+        start = time.perf_counter()
+        try:
+            vectors = np.asarray(
+                self.model.encode(texts, batch_size=self.max_batch, convert_to_numpy=True), dtype=np.float32
+            )
+        except Exception as e:
+            for job in jobs:
+                job["error"] = e
+                job["done"].set()
+            return
+        elapsed = time.perf_counter() - start
+        offset = 0
+        for job in jobs:
+            job["result"] = vectors[offset:offset + len(job["texts"])]
+            offset += len(job["texts"])
+            job["done"].set()
+        with self.lock:
+            self.stats["requests"] += len(jobs)
+            self.stats["texts"] += len(texts)
+            self.stats["batches"] += 1
+            self.stats["encode_seconds"] += elapsed
+
+    def metrics(self):
+        with self.lock:
+            stats = dict(self.stats)
+        stats["queue_depth"] = self.requests.qsize()
+        stats["uptime_seconds"] = time.time() - self.started
+        stats["avg_batch_size"] = stats["texts"] / stats["batches"] if stats["batches"] else 0.0
+        stats["texts_per_second"] = stats["texts"] / stats["encode_seconds"] if stats["encode_seconds"] else 0.0
+        return stats
+
+
+def make_handler(encoder, model_name, backend):
+    class EmbeddingHandler(BaseHTTPRequestHandler):
+        def _send_json(self, status, payload):
+            body = json.dumps(payload).encode('utf-8')
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == '/metrics':
+                self._send_json(200, dict(encoder.metrics(), model=model_name, backend=backend))
+            elif self.path == '/health':
+                self._send_json(200, {"status": "ok", "model": model_name, "backend": backend})
+            else:
+                self._send_json(404, {"error": "not found"})
+
+        def do_POST(self):
+            if self.path != '/encode':
+                self._send_json(404, {"error": "not found"})
+                return
+            try:
+                length = int(self.headers.get("Content-Length", 0))
+                texts = json.loads(self.rfile.read(length))["texts"]
+                self._send_json(200, {"model": model_name, "embeddings": encode_array(encoder.encode(texts))})
+            except Exception as e:
+                logger.error(f"Encode request failed: {e}")
+                self._send_json(500, {"error": str(e)})
+
+        def log_message(self, *args):
+            pass
+
+    return EmbeddingHandler
+
+
+class EmbeddingClient:
+    """Drop-in for SentenceTransformer.encode() backed by the service."""
+
+    def __init__(self, url, timeout=120):
+        self.url = url.rstrip('/')
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    def health(self):
+        """The service's /health payload, or None if it is unreachable."""
+        try:
+            resp = self.session.get(f"{self.url}/health", timeout=2)
+            return resp.json() if resp.ok else None
+        except (requests.RequestException, ValueError):
+            return None
+
+    def ping(self, model=None, backend=None):
+        """True if the service is up and (when given) runs `model` on `backend`.
+
+        Vectors from another model or backend don't match the caller's
+        embedding store, so a mismatch counts as unavailable.
+        """
+        health = self.health()
+        if health is None:
+            return False
+        served = (health.get("model"), health.get("backend"))
+        if (model and served[0] != model) or (backend and served[1] != backend):
+            logger.warning(f"Embedding service {self.url} runs {served[0]} ({served[1]}), "
+                           f"expected {model} ({backend}).")
+            return False
+        return True
+
+    def encode(self, texts, **kwargs):
+        resp = self.session.post(f"{self.url}/encode", json={"texts": list(texts)}, timeout=self.timeout)
+        resp.raise_for_status()
+        return decode_array(resp.json()["embeddings"])
+
+    def metrics(self):
+        return self.session.get(f"{self.url}/metrics", timeout=5).json()
+
+
+def serve(model, model_name, backend="torch", host="127.0.0.1", port=8765, max_batch=64, max_wait=0.01):
+    encoder = BatchingEncoder(model, max_batch=max_batch, max_wait=max_wait)
+    server = ThreadingHTTPServer((host, port), make_handler(encoder, model_name, backend))
+    logger.info(f"Embedding service for {model_name} ({backend}) on http://{host}:{server.server_address[1]}")
+    return server
+
+
+# Run: python -m backend.embedding_service --port 8765, then set
+# embedding_settings.service_url in config/trends.yaml
+if __name__ == "__main__":
+    from .embedding_backends import BACKENDS, load_embedding_model
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model", default="all-MiniLM-L6-v2")
+    parser.add_argument("--backend", default="torch", choices=BACKENDS,
+                        help="must match embedding_settings.backend of the callers")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--max-batch", type=int, default=64)
+    parser.add_argument("--max-wait-ms", type=float, default=10)
+    args = parser.parse_args()
+
+    model = load_embedding_model(args.model, backend=args.backend, batch_size=args.max_batch)
+    if model is None:
+        raise SystemExit("sentence-transformers is not installed.")
+    server = serve(model, args.model, args.backend, args.host, args.port, args.max_batch, args.max_wait_ms / 1000)
+    server.serve_forever()
@@ -0,0 +1,135 @@
+import hashlib
+import json
+import logging
+import os
+import re
+
+import numpy as np
+
+# Setup basic logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+def normalize(embeddings):
+    """Scale rows to unit length so dot products are cosine similarities."""
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    return embeddings / np.maximum(norms, 1e-12)
+
+
+def text_hash(text):
+    """Non-zero 64-bit content hash of an embedded text (0 marks rows stored without one)."""
+    digest = int.from_bytes(hashlib.blake2b(text.encode('utf-8'), digest_size=8).digest(), 'little')
+    return digest or 1
+
+
+class EmbeddingStore:
+    """Append-only, memory-mapped float32 embedding matrix per model.
+
+    An article id whose text changed is re-encoded into a new row; the id
+    then maps to its latest row.
+    """
+
+    def __init__(self, model_name, cache_dir="data/embeddings"):
+        self.model_name = model_name
+        slug = re.sub(r'[^A-Za-z0-9_.-]+', '_', model_name)
+        self.path = os.path.join(cache_dir, slug)
+        os.makedirs(self.path, exist_ok=True)
+        self.vectors_path = os.path.join(self.path, 'vectors.f32')
+        self.ids_path = os.path.join(self.path, 'ids.i64')
+        self.hashes_path = os.path.join(self.path, 'hashes.u64')
+        self.meta_path = os.path.join(self.path, 'meta.json')
+        self.dim = None
+        self.index = {}
+        self.hashes = {}
+        self.count = 0
+        self._vectors = None
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.meta_path):
+            return
+        with open(self.meta_path) as f:
+            self.dim = json.load(f)['dim']
+        ids = np.fromfile(self.ids_path, dtype=np.int64) if os.path.exists(self.ids_path) else np.empty(0, np.int64)
+        row_bytes = self.dim * 4
+        stored_rows = os.path.getsize(self.vectors_path) // row_bytes if os.path.exists(self.vectors_path) else 0
+        # A crash between the two appends can leave them out of step; trust the shorter one
+        rows = min(len(ids), stored_rows)
+        if rows != len(ids) or rows != stored_rows:
+            logger.warning(f"Embedding store {self.path} was truncated to {rows} rows.")
+            with open(self.ids_path, 'r+b') as f:
+                f.truncate(rows * 8)
+            with open(self.vectors_path, 'r+b') as f:
+                f.truncate(rows * row_bytes)
+        hashes = np.fromfile(self.hashes_path, dtype=np.uint64) if os.path.exists(self.hashes_path) else np.empty(0, np.uint64)
+        if len(hashes) != rows:
+            # Rows from before content hashes (or a crash mid-append) count as unknown: re-encoded on next use
+            hashes = np.concatenate([hashes[:rows], np.zeros(max(0, rows - len(hashes)), dtype=np.uint64)])
+            hashes.tofile(self.hashes_path)
+        self.count = rows
+        # Later rows win: an id re-encoded after a text change points at its newest vector
+        self.index = {int(article_id): row for row, article_id in enumerate(ids[:rows])}
+        self.hashes = {int(article_id): int(h) for article_id, h in zip(ids[:rows], hashes)}
+
+    def __len__(self):
+        return len(self.index)
+
+    def __contains__(self, article_id):
+        return article_id in self.index
+
+    def matrix(self):
+        """Read-only memmap over all stored rows (no copy)."""
+        if not self.index:
+            return np.empty((0, self.dim or 0), dtype=np.float32)
+        if self._vectors is None or len(self._vectors) != self.count:
+            self._vectors = np.memmap(self.vectors_path, dtype=np.float32, mode='r',
+                                      shape=(self.count, self.dim))
+        return self._vectors
+
+    def rows(self, article_ids):
+        return np.fromiter((self.index[i] for i in article_ids), dtype=np.int64, count=len(article_ids))
+
+    def get(self, article_ids):
+        """Embeddings for `article_ids` (all must be stored), in order."""
+        return self.matrix()[self.rows(article_ids)]
+
+    def add(self, article_ids, vectors, texts=None):
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        if len(article_ids) == 0:
+            return
+        if self.dim is None:
+            self.dim = vectors.shape[1]
+            with open(self.meta_path, 'w') as f:
+                json.dump({"model": self.model_name, "dim": self.dim}, f)
+        elif vectors.shape[1] != self.dim:
+            raise ValueError(f"Expected {self.dim}-dim embeddings for {self.model_name}, got {vectors.shape[1]}")
+        hashes = [text_hash(t) for t in texts] if texts is not None else [0] * len(article_ids)
+
+        with open(self.vectors_path, 'ab') as f:
+            f.write(vectors.tobytes())
+        with open(self.ids_path, 'ab') as f:
+            f.write(np.asarray(article_ids, dtype=np.int64).tobytes())
+        with open(self.hashes_path, 'ab') as f:
+            f.write(np.asarray(hashes, dtype=np.uint64).tobytes())
+        for offset, (article_id, h) in enumerate(zip(article_ids, hashes)):
+            self.index[int(article_id)] = self.count + offset
+            self.hashes[int(article_id)] = h
+        self.count += len(article_ids)
+        self._vectors = None
+
+    def get_or_encode(self, article_ids, texts, encode):
+        """Return embeddings for `article_ids`, encoding only the missing ones.
+
+        An id stored from a different text (or without a content hash) counts
+        as missing. `encode(list_of_texts)` must return an (n x dim) array.
+        """
+        missing = [(i, t) for i, t in zip(article_ids, texts)
+                   if i not in self.index or self.hashes.get(i) != text_hash(t)]
+        if missing:
+            new_ids = [i for i, _ in missing]
+            new_texts = [t for _, t in missing]
+            self.add(new_ids, np.asarray(encode(new_texts), dtype=np.float32), new_texts)
+        logger.info(f"Embeddings: {len(article_ids) - len(missing)} cached, {len(missing)} encoded.")
+        return self.get(article_ids)
@@ -0,0 +1,180 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def fake_script(prompt):
+    """Deterministic script that echoes the article, so outputs can be matched to inputs."""
+    article = prompt.rsplit("Article:", 1)[-1].strip()
+    return (
+        "1. Hook: You won't believe this...\n"
+        f"2. Story Body: {article}\n"
+        "3. CTA Outro: Subscribe for more tea!"
+    )
+
+
+def fake_json_script(prompt):
+    """fake_script() as the JSON object a `format`-constrained request returns."""
+    article = prompt.rsplit("Article:", 1)[-1].split("Respond with JSON", 1)[0].strip()
+    return json.dumps({
+        "hook": "You won't believe this...",
+        "body": article,
+        "cta": "Subscribe for more tea!",
+        "keywords": ["red carpet", "paparazzi", "celebrity"],
+    })
+
+
+class FakeOllama:
+    """Local stand-in for the Ollama HTTP API that records requests, concurrency and connections."""
+
+    def __init__(self, latency=0.0, host="127.0.0.1", port=0, chunk_delay=0.0, token_cost=0.0, context=True):
+        self.latency = latency
+        self.context = context
+        self.token_cost = token_cost
+        self.token_ids = {}
+        self.kv_cache = set()
+        self.chunk_delay = chunk_delay
+        self.lock = threading.Lock()
+        self.requests = []
+        self.connections = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.server = ThreadingHTTPServer((host, port), self._make_handler())
+        self.server.daemon_threads = True
+        self.url = f"http://{host}:{self.server.server_address[1]}"
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def respond(self, payload):
+        """Response text for a generate payload; override for custom behaviour."""
+        if payload.get("format"):
+            return fake_json_script(payload.get("prompt", ""))
+        return fake_script(payload.get("prompt", ""))
+
+    def tokenize(self, text):
+        with self.lock:
+            return [self.token_ids.setdefault(word, len(self.token_ids) + 1) for word in text.split()]
+
+    def _evaluate(self, payload):
+        """Prompt tokens to evaluate and the request's full token sequence."""
+        context = list(payload.get("context") or [])
+        prompt_tokens = self.tokenize(payload.get("system", "")) + self.tokenize(payload.get("prompt", ""))
+        with self.lock:
+            # Like Ollama's KV cache: any already evaluated token prefix is reused
+            cached = any(seq[:len(context)] == tuple(context) for seq in self.kv_cache)
+        evaluated = len(prompt_tokens) + (0 if cached or not context else len(context))
+        return evaluated, context + prompt_tokens
+
+    def _generate(self, handler, payload):
+        with self.lock:
+            self.requests.append(payload)
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            started = time.perf_counter()
+            evaluated, tokens = self._evaluate(payload)
+            prompt_seconds = evaluated * self.token_cost
+            time.sleep(self.latency + prompt_seconds)
+            text = self.respond(payload)
+            num_predict = (payload.get("options") or {}).get("num_predict")
+            if num_predict:
+                text = " ".join(text.split(" ")[:num_predict])
+            words = text.split(" ")
+            context = tokens + self.tokenize(text)
+            with self.lock:
+                self.kv_cache.add(tuple(context))
+            final = {
+                "model": payload.get("model"),
+                "done": True,
+                "prompt_eval_count": evaluated,
+                "prompt_eval_duration": int(prompt_seconds * 1e9),
+                "eval_count": len(words),
+                "eval_duration": int(max(self.latency, 1e-3) * 1e9),
+            }
+            if self.context:
+                final["context"] = context
+            if not payload.get("stream", True):
+                final["response"] = text
+                final["total_duration"] = int((time.perf_counter() - started) * 1e9)
+                handler.send_json(200, final)
+                return
+            handler.send_response(200)
+            handler.send_header("Content-Type", "application/x-ndjson")
+            handler.send_header("Transfer-Encoding", "chunked")
+            handler.end_headers()
+            for i, word in enumerate(words):
+                piece = word if i == 0 else " " + word
+                handler.write_chunk(json.dumps({"model": payload.get("model"), "response": piece, "done": False}) + "\n")
+                if self.chunk_delay:
+                    time.sleep(self.chunk_delay)
+            final["response"] = ""
+            final["total_duration"] = int((time.perf_counter() - started) * 1e9)
+            handler.write_chunk(json.dumps(final) + "\n")
+            handler.write_chunk("")
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+
+    def _make_handler(self):
+        fake = self
+
+        class OllamaHandler(BaseHTTPRequestHandler):
+            # Keep-alive and chunked transfer encoding, like the real server
+            protocol_version = "HTTP/1.1"
+
+            def setup(self):
+                super().setup()
+                with fake.lock:
+                    fake.connections += 1
+
+            def send_json(self, status, payload):
+                body = json.dumps(payload).encode('utf-8')
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def write_chunk(self, text):
+                data = text.encode('utf-8')
+                self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+                self.wfile.flush()
+
+            def do_GET(self):
+                if self.path == '/api/tags':
+                    self.send_json(200, {"models": [{"name": "mistral:latest"}]})
+                else:
+                    self.send_json(404, {"error": "not found"})
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                payload = json.loads(self.rfile.read(length) or b"{}")
+                if self.path == '/api/generate':
+                    fake._generate(self, payload)
+                else:
+                    self.send_json(404, {"error": "not found"})
+
+            def log_message(self, *args):
+                pass
+
+        return OllamaHandler
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--latency", type=float, default=1.0)
+    parser.add_argument("--token-cost", type=float, default=0.0)
+    args = parser.parse_args()
+    fake = FakeOllama(latency=args.latency, port=args.port, token_cost=args.token_cost)
+    print(f"Fake Ollama on {fake.url}")
+    fake.server.serve_forever()
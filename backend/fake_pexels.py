@@ -0,0 +1,111 @@
+import hashlib
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+class FakePexels:
+    """Local stand-in for the Pexels video search API that records searches and downloads."""
+
+    def __init__(self, catalog=None, clip=None, file_size=64 * 1024, host="127.0.0.1", port=0):
+        self.catalog = catalog or {}
+        self.file_size = file_size
+        self.content = None
+        if clip:
+            with open(clip, 'rb') as f:
+                self.content = f.read()
+        self.lock = threading.Lock()
+        self.searches = []
+        self.downloads = []
+        self.server = ThreadingHTTPServer((host, port), self._make_handler())
+        self.server.daemon_threads = True
+        self.url = f"http://{host}:{self.server.server_address[1]}"
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def video_ids(self, query, count):
+        if query in self.catalog:
+            return self.catalog[query][:count]
+        seed = int(hashlib.sha256(query.encode('utf-8')).hexdigest()[:6], 16)
+        return [seed * 100 + i for i in range(count)]
+
+    def video(self, video_id, orientation):
+        width, height = (1080, 1920) if orientation == "portrait" else (1920, 1080)
+        return {
+            "id": video_id,
+            "width": width,
+            "height": height,
+            "duration": 5 + video_id % 20,
+            "video_files": [
+                {"id": video_id * 10 + 1, "quality": "hd", "file_type": "video/mp4",
+                 "width": width * 2 // 3, "height": height * 2 // 3, "link": f"{self.url}/files/{video_id}_hd.mp4"},
+                {"id": video_id * 10 + 2, "quality": "sd", "file_type": "video/mp4",
+                 "width": width // 3, "height": height // 3, "link": f"{self.url}/files/{video_id}_sd.mp4"},
+            ],
+        }
+
+    def file_bytes(self, name):
+        if self.content is not None:
+            return self.content
+        return (name.encode('utf-8') * (self.file_size // len(name) + 1))[:self.file_size]
+
+    def _make_handler(self):
+        fake = self
+
+        class PexelsHandler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def send_body(self, status, body, content_type):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def send_json(self, status, payload):
+                self.send_body(status, json.dumps(payload).encode('utf-8'), "application/json")
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                if url.path == '/videos/search':
+                    if not self.headers.get("Authorization"):
+                        self.send_json(401, {"error": "Unauthorized"})
+                        return
+                    params = {k: v[0] for k, v in parse_qs(url.query).items()}
+                    with fake.lock:
+                        fake.searches.append(params)
+                    orientation = params.get("orientation", "landscape")
+                    ids = fake.video_ids(params.get("query", ""), int(params.get("per_page", 15)))
+                    self.send_json(200, {"page": 1, "per_page": len(ids), "total_results": len(ids),
+                                         "videos": [fake.video(i, orientation) for i in ids]})
+                elif url.path.startswith('/files/'):
+                    name = url.path[len('/files/'):]
+                    with fake.lock:
+                        fake.downloads.append(name)
+                    self.send_body(200, fake.file_bytes(name), "video/mp4")
+                else:
+                    self.send_json(404, {"error": "not found"})
+
+            def log_message(self, *args):
+                pass
+
+        return PexelsHandler
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8767)
+    parser.add_argument("--clip", help="serve this video file for every download")
+    args = parser.parse_args()
+    fake = FakePexels(clip=args.clip, port=args.port)
+    print(f"Fake Pexels on {fake.url} (set video.pexels_api_url to {fake.url}/videos/search)")
+    fake.server.serve_forever()
@@ -0,0 +1,214 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+# Setup basic logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+# Words too common to relate two searches
+STOPWORDS = {"the", "and", "for", "with", "from", "new", "news"}
+
+
+def normalize_query(query):
+    return " ".join(str(query).lower().split())
+
+
+def query_words(query):
+    return {w for w in normalize_query(query).split() if len(w) > 2 and w not in STOPWORDS}
+
+
+class FootageLibrary:
+    """Stock clips on disk plus a SQLite index of what they are and which searches found them."""
+
+    def __init__(self, path="data/footage", max_mb=2000, query_ttl_hours=168, eviction_grace_minutes=60):
+        self.path = path
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.query_ttl = query_ttl_hours * 3600
+        # Clips handed out this recently may still be rendering in another process
+        self.grace = eviction_grace_minutes * 60
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._conn = None
+
+    @property
+    def conn(self):
+        # Opened on first use, so an engine that never fetches footage leaves no files behind
+        if self._conn is None:
+            os.makedirs(self.path, exist_ok=True)
+            conn = sqlite3.connect(os.path.join(self.path, "index.db"), timeout=30, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS videos ("
+                " id INTEGER PRIMARY KEY, path TEXT NOT NULL, orientation TEXT, width INTEGER, height INTEGER,"
+                " duration REAL, size INTEGER NOT NULL, created REAL NOT NULL, last_used REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS videos_last_used ON videos (last_used)")
+            conn.execute("CREATE INDEX IF NOT EXISTS videos_shape ON videos (orientation, height, duration)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS searches ("
+                " query TEXT NOT NULL, orientation TEXT NOT NULL, per_page INTEGER NOT NULL, fetched REAL NOT NULL,"
+                " PRIMARY KEY (query, orientation))"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                " query TEXT NOT NULL, orientation TEXT NOT NULL, rank INTEGER NOT NULL, video_id INTEGER NOT NULL,"
+                " PRIMARY KEY (query, orientation, rank))"
+            )
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def path_for(self, video_id):
+        return os.path.join(self.path, f"pexels_{video_id}.mp4")
+
+    def owns(self, path):
+        """True for clips kept by the library (callers must not delete them)."""
+        return os.path.dirname(os.path.abspath(path)) == os.path.abspath(self.path)
+
+    def _touch(self, ids):
+        self.conn.executemany("UPDATE videos SET last_used = ? WHERE id = ?", [(time.time(), i) for i in ids])
+        self.conn.commit()
+
+    def _present(self, rows):
+        """Rows whose file is still on disk; index entries for vanished files are dropped."""
+        present = [dict(row) for row in rows if os.path.exists(row["path"])]
+        gone = [(row["id"],) for row in rows if not os.path.exists(row["path"])]
+        if gone:
+            self.conn.executemany("DELETE FROM videos WHERE id = ?", gone)
+            self.conn.commit()
+        return present
+
+    def lookup(self, query, orientation, count):
+        """Clips a fresh earlier search for `query` found, or None if Pexels must be asked."""
+        query = normalize_query(query)
+        with self.lock:
+            search = self.conn.execute(
+                "SELECT per_page, fetched FROM searches WHERE query = ? AND orientation = ?", (query, orientation)
+            ).fetchone()
+            if search is None or time.time() - search["fetched"] > self.query_ttl:
+                self.misses += 1
+                return None
+            rows = self.conn.execute(
+                "SELECT v.* FROM results r JOIN videos v ON v.id = r.video_id"
+                " WHERE r.query = ? AND r.orientation = ? ORDER BY r.rank", (query, orientation)
+            ).fetchall()
+            found = self.conn.execute(
+                "SELECT COUNT(*) FROM results WHERE query = ? AND orientation = ?", (query, orientation)
+            ).fetchone()[0]
+            clips = self._present(rows)
+            # Enough clips, or everything Pexels had for the query when asked for at least as many
+            if len(clips) < count and (search["per_page"] < count or len(clips) < found):
+                self.misses += 1
+                return None
+            clips = clips[:count]
+            self._touch([clip["id"] for clip in clips])
+            self.hits += 1
+            return clips
+
+    def record_search(self, query, orientation, per_page, video_ids):
+        query = normalize_query(query)
+        with self.lock:
+            self.conn.execute("DELETE FROM results WHERE query = ? AND orientation = ?", (query, orientation))
+            self.conn.executemany(
+                "INSERT INTO results (query, orientation, rank, video_id) VALUES (?, ?, ?, ?)",
+                [(query, orientation, rank, video_id) for rank, video_id in enumerate(video_ids)]
+            )
+            self.conn.execute(
+                "INSERT OR REPLACE INTO searches (query, orientation, per_page, fetched) VALUES (?, ?, ?, ?)",
+                (query, orientation, per_page, time.time())
+            )
+            self.conn.commit()
+
+    def get(self, video_id):
+        """The indexed clip for a Pexels id, or None if it isn't on disk."""
+        with self.lock:
+            row = self.conn.execute("SELECT * FROM videos WHERE id = ?", (video_id,)).fetchone()
+            clips = self._present([row]) if row is not None else []
+            if clips:
+                self._touch([video_id])
+            return clips[0] if clips else None
+
+    def add(self, video_id, path, orientation=None, width=None, height=None, duration=None, keep=()):
+        """Index a downloaded clip, then evict down to the size cap (never the ids in `keep`)."""
+        now = time.time()
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO videos (id, path, orientation, width, height, duration, size, created, last_used)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (video_id, path, orientation, width, height, duration, os.path.getsize(path), now, now)
+            )
+            self._evict(set(keep) | {video_id})
+            self.conn.commit()
+
+    def search(self, query, orientation=None, limit=10):
+        """Indexed clips found by earlier searches sharing a word with `query`, best match first.
+
+        Used when Pexels can't be asked; clips no earlier search related to
+        the query are never returned, so a story doesn't get unrelated footage.
+        """
+        words = query_words(query)
+        if not words:
+            return []
+        sql = "SELECT r.query, v.* FROM results r JOIN videos v ON v.id = r.video_id"
+        params = []
+        if orientation:
+            sql += " WHERE v.orientation = ?"
+            params.append(orientation)
+        with self.lock:
+            scores, rows = {}, {}
+            for row in self.conn.execute(sql, params):
+                shared = len(words & query_words(row["query"]))
+                if shared > scores.get(row["id"], 0):
+                    scores[row["id"]] = shared
+                    rows[row["id"]] = row
+            ranked = sorted(rows.values(), key=lambda row: (-scores[row["id"]], -row["last_used"]))
+            clips = [{k: clip[k] for k in clip if k != "query"} for clip in self._present(ranked)][:limit]
+            self._touch([clip["id"] for clip in clips])
+        return clips
+
+    def _evict(self, keep):
+        total = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM videos").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # Oldest first until back under the cap, sparing clips used within the grace period
+        doomed = []
+        rows = self.conn.execute("SELECT id, path, size FROM videos WHERE last_used < ? ORDER BY last_used",
+                                 (time.time() - self.grace,))
+        for row in rows:
+            if total <= self.max_bytes:
+                break
+            if row["id"] in keep:
+                continue
+            doomed.append((row["id"],))
+            total -= row["size"]
+            try:
+                os.remove(row["path"])
+            except FileNotFoundError:
+                pass
+        self.conn.executemany("DELETE FROM videos WHERE id = ?", doomed)
+        self.evictions += len(doomed)
+        logger.info(f"Footage library evicted {len(doomed)} clips.")
+        if total > self.max_bytes:
+            logger.warning(f"Footage library is {total / 2**20:.0f} MB, over its cap: the rest was used recently.")
+
+    def stats(self):
+        with self.lock:
+            entries, size = self.conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM videos").fetchone()
+            searches = self.conn.execute("SELECT COUNT(*) FROM searches").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            "clips": entries,
+            "bytes": size,
+            "searches": searches,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
@@ -1,8 +1,13 @@
 import feedparser
+import requests
 import yaml
 import os
 import datetime
-from .models import Article, init_db
+from concurrent.futures import ThreadPoolExecutor
+from .models import Article, FeedState, db, init_db
+from .dedup import (
+    BAND_COUNT, MAX_HAMMING_DISTANCE, FingerprintIndex, dedup_columns, to_unsigned,
+)
 import time
 import logging
 
@@ -10,9 +15,16 @@ import logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Keep IN (...) lists and multi-row INSERTs under SQLite's variable limit (999)
+BULK_CHUNK_SIZE = 500
+INSERT_CHUNK_SIZE = 50
+FINGERPRINT_CHUNK_SIZE = 200
+
 try:
     from newspaper import Article as NewspaperArticle
+    NEWSPAPER_AVAILABLE = True
 except ImportError:
+    NEWSPAPER_AVAILABLE = False
     logger.warning("newspaper3k not found. Using MockArticle.")
     class NewspaperArticle:
         def __init__(self, url):
@@ -21,7 +33,7 @@ except ImportError:
             self.text = "This is mock text because newspaper library failed to load."
             self.top_image = None
             self.publish_date = datetime.datetime.now()
-        def download(self): pass
+        def download(self, input_html=None): pass
         def parse(self): pass 
         def nlp(self): pass
         @property
@@ -33,56 +45,241 @@ def load_config():
     with open(config_path, 'r') as f:
         return yaml.safe_load(f)
 
+def fetch_feed(source, etag=None, last_modified=None, timeout=10):
+    """Download a single feed with a conditional GET.
+
+    Returns a dict with the parsed feed (None if unchanged or failed),
+    the HTTP status and the new cache validators.
+    """
+    headers = {"User-Agent": "Mozilla/5.0 (compatible; NewsBot/1.0)"}
+    if etag:
+        headers["If-None-Match"] = etag
+    if last_modified:
+        headers["If-Modified-Since"] = last_modified
+
+    result = {
+        "source": source,
+        "feed": None,
+        "status": None,
+        "etag": etag,
+        "last_modified": last_modified,
+        "elapsed": 0.0,
+    }
+    start = time.perf_counter()
+    try:
+        resp = requests.get(source['url'], headers=headers, timeout=timeout)
+        result["status"] = resp.status_code
+        if resp.status_code == 304:
+            return result
+        resp.raise_for_status()
+        result["feed"] = feedparser.parse(resp.content)
+        result["etag"] = resp.headers.get("ETag")
+        result["last_modified"] = resp.headers.get("Last-Modified")
+    except Exception as e:
+        logger.error(f"Failed to fetch {source['name']}: {e}")
+    finally:
+        result["elapsed"] = time.perf_counter() - start
+    return result
+
+def fetch_feeds(sources, states=None, max_workers=8, timeout=10):
+    """Fetch many feeds concurrently on a bounded thread pool.
+
+    `states` maps feed url -> (etag, last_modified). Results are returned
+    in the same order as `sources`.
+    """
+    states = states or {}
+    if not sources:
+        return []
+
+    def _fetch(source):
+        etag, last_modified = states.get(source['url'], (None, None))
+        return fetch_feed(source, etag, last_modified, timeout=timeout)
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(sources)))) as pool:
+        return list(pool.map(_fetch, sources))
+
+def load_feed_states(urls):
+    try:
+        rows = FeedState.select().where(FeedState.url.in_(urls))
+        return {row.url: (row.etag, row.last_modified) for row in rows}
+    except Exception as e:
+        logger.error(f"DB Error loading feed states: {e}")
+        return {}
+
+def save_feed_states(results):
+    now = datetime.datetime.now()
+    rows = [
+        {
+            "url": r["source"]['url'],
+            "etag": r["etag"],
+            "last_modified": r["last_modified"],
+            "last_status": r["status"],
+            "last_fetched": now,
+        }
+        for r in results if r["status"] is not None
+    ]
+    if not rows:
+        return
+    try:
+        FeedState.insert_many(rows).on_conflict_replace().execute()
+    except Exception as e:
+        logger.error(f"DB Error saving feed states: {e}")
+
+def entry_to_row(entry, source):
+    """Map a feedparser entry to an Article row dict (None if unusable)."""
+    url = entry.get('link')
+    if not url:
+        return None
+    # Valid RSS usually has summary or content; full parse happens later on demand.
+    if entry.get('published_parsed'):
+        published = datetime.datetime.fromtimestamp(time.mktime(entry.published_parsed))
+    else:
+        published = datetime.datetime.now()
+    title = entry.get('title', '')[:512]
+    content = entry.get('summary', '') or entry.get('description', '')
+    row = {
+        "url": url,
+        "title": title,
+        "content": content,
+        "source": source['name'],
+        "published_date": published,
+    }
+    row.update(dedup_columns(url, title, content))
+    return row
+
+def existing_urls(urls, chunk_size=BULK_CHUNK_SIZE):
+    """Return the subset of `urls` already stored (raw or canonical form).
+
+    One IN query per column and chunk, so each binds `chunk_size` variables;
+    both columns are indexed.
+    """
+    found = set()
+    for i in range(0, len(urls), chunk_size):
+        chunk = urls[i:i + chunk_size]
+        for column in (Article.url, Article.canonical_url):
+            query = Article.select(Article.url, Article.canonical_url).where(column.in_(chunk))
+            for url, canonical_url in query.tuples():
+                found.add(url)
+                found.add(canonical_url)
+    return found
+
+def load_fingerprint_index(rows, max_distance=MAX_HAMMING_DISTANCE, chunk_size=FINGERPRINT_CHUNK_SIZE):
+    """Build a FingerprintIndex of stored articles sharing a band with `rows`.
+
+    Each chunk is a single indexed lookup per band, so the cost grows with the
+    batch size and the number of band collisions, not with table size.
+    """
+    index = FingerprintIndex(max_distance)
+    rows = [r for r in rows if r.get("fingerprint") is not None]
+    band_fields = [getattr(Article, f"fp_band{i}") for i in range(BAND_COUNT)]
+    for i in range(0, len(rows), chunk_size):
+        chunk = rows[i:i + chunk_size]
+        condition = None
+        for b, field in enumerate(band_fields):
+            clause = field.in_({r[f"fp_band{b}"] for r in chunk})
+            condition = clause if condition is None else condition | clause
+        query = Article.select(Article.fingerprint).where(condition)
+        for (fingerprint,) in query.tuples():
+            index.add(to_unsigned(fingerprint))
+    return index
+
+def save_articles(rows, chunk_size=BULK_CHUNK_SIZE, max_distance=MAX_HAMMING_DISTANCE):
+    """Bulk-insert new article rows in a single transaction.
+
+    Rows whose raw or canonical URL is already stored (or repeated within the
+    batch) are dropped, as are near-duplicates whose content fingerprint is
+    within `max_distance` bits of a stored or earlier row. Returns the number
+    of inserted rows, or None if the insert failed (nothing was stored).
+    """
+    if not rows:
+        return 0
+    start = time.perf_counter()
+
+    unique = {}
+    for row in rows:
+        unique.setdefault(row["canonical_url"], row)
+
+    try:
+        seen = existing_urls(list({r["url"] for r in unique.values()} | set(unique)), chunk_size)
+        candidates = [row for key, row in unique.items() if key not in seen and row["url"] not in seen]
+
+        index = load_fingerprint_index(candidates, max_distance)
+        new_rows = []
+        near_duplicates = 0
+        for row in candidates:
+            if row["fingerprint"] is not None:
+                fingerprint = to_unsigned(row["fingerprint"])
+                if index.find(fingerprint) is not None:
+                    near_duplicates += 1
+                    continue
+                index.add(fingerprint)
+            new_rows.append(row)
+
+        fetched_at = datetime.datetime.now()
+        for row in new_rows:
+            row.setdefault("fetched_at", fetched_at)
+        with db.atomic():
+            for i in range(0, len(new_rows), INSERT_CHUNK_SIZE):
+                Article.insert_many(new_rows[i:i + INSERT_CHUNK_SIZE]).on_conflict_ignore().execute()
+    except Exception as e:
+        # If DB error, might need init
+        logger.error(f"Bulk insert failed: {e}")
+        return None
+
+    if near_duplicates:
+        logger.info(f"Rejected {near_duplicates} near-duplicate entries.")
+    elapsed = time.perf_counter() - start
+    rate = len(rows) / elapsed if elapsed > 0 else float('inf')
+    logger.info(
+        f"Stored {len(new_rows)} new of {len(rows)} entries in {elapsed:.3f}s "
+        f"({rate:.0f} rows/sec)"
+    )
+    return len(new_rows)
+
 def fetch_and_save_articles():
     config = load_config()
-    sources = config.get('sources', [])
-    
-    new_articles_count = 0
-    
-    for source in sources:
-        if not source.get('enabled', False):
+    sources = [s for s in config.get('sources', []) if s.get('enabled', False)]
+    fetch_settings = config.get('fetch_settings', {})
+
+    states = load_feed_states([s['url'] for s in sources])
+    results = fetch_feeds(
+        sources,
+        states=states,
+        max_workers=fetch_settings.get('max_workers', 8),
+        timeout=fetch_settings.get('timeout', 10),
+    )
+
+    rows = []
+    for result in results:
+        source = result["source"]
+        if result["status"] == 304:
+            logger.info(f"{source['name']} unchanged (304), skipping.")
+            continue
+        feed = result["feed"]
+        if feed is None:
             continue
-            
-        logger.info(f"Fetching from {source['name']}...")
-        feed = feedparser.parse(source['url'])
-        
+        logger.info(f"Fetched {source['name']} in {result['elapsed']:.2f}s ({len(feed.entries)} entries)")
+
         for entry in feed.entries:
-            # Basic Deduplication by URL
-            url = entry.link
             try:
-                if Article.select().where(Article.url == url).exists():
-                    continue
+                row = entry_to_row(entry, source)
             except Exception as e:
-                # If DB error, might need init
-                logger.error(f"DB Error checking duplicate: {e}")
+                logger.error(f"Skipping malformed entry from {source['name']}: {e}")
                 continue
-                
-            # Extract content
-            try:
-                # Use newspaper3k for better extraction if needed, 
-                # but valid RSS usually has summary or content.
-                # For now, quick ingest, full parse later or on demand to save time.
-                
-                published = None
-                if hasattr(entry, 'published_parsed'):
-                     published = datetime.datetime.fromtimestamp(time.mktime(entry.published_parsed))
-                else:
-                    published = datetime.datetime.now()
-
-                article = Article.create(
-                    url=url,
-                    title=entry.title,
-                    content=entry.get('summary', '') or entry.get('description', ''),
-                    source=source['name'],
-                    published_date=published
-                )
-                new_articles_count += 1
-                logger.info(f"Saved: {entry.title}")
-                
-            except Exception as e:
-                logger.error(f"Failed to save article {url}: {e}")
+            if row:
+                rows.append(row)
+
+    dedup_settings = config.get('dedup_settings', {})
+    new_articles_count = save_articles(
+        rows, max_distance=dedup_settings.get('max_hamming_distance', MAX_HAMMING_DISTANCE)
+    )
 
-    logger.info(f"Ingestion complete. {new_articles_count} new articles.")
+    # Persist validators only after entries are stored, so a failed run refetches
+    if new_articles_count is None:
+        logger.error("Articles were not stored; keeping old feed validators so the next run refetches.")
+    else:
+        save_feed_states(results)
+        logger.info(f"Ingestion complete. {new_articles_count} new articles.")
     
     # MOCK DATA FOR DEMO IF EMPTY
     try:
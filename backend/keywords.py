@@ -0,0 +1,107 @@
+import re
+
+import numpy as np
+
+_EXACT = 'exact'
+_PREFIX = 'prefix'
+_END = ''
+
+
+def _trie_pattern(node):
+    """Regex for a character trie: shared prefixes are matched once."""
+    end = node.get(_END)
+    branches = [re.escape(ch) + _trie_pattern(child) for ch, child in sorted(node.items()) if ch != _END]
+    if not branches:
+        return r'\w*' if end == _PREFIX else ''
+    alt = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+    if end == _PREFIX:
+        return r'(?:' + alt + r'|\w*)'
+    if end == _EXACT:
+        return '(?:' + alt + ')?'
+    return alt
+
+
+def _compile_trie(terms):
+    root = {}
+    for term, kind in terms:
+        node = root
+        for ch in term:
+            node = node.setdefault(ch, {})
+        # A prefix wildcard subsumes an exact term on the same node
+        if node.get(_END) != _PREFIX:
+            node[_END] = kind
+    return _trie_pattern(root)
+
+
+class KeywordMatcher:
+    """Compiled multi-keyword matcher: one regex pass per document.
+
+    Keywords are compiled into a single trie-shaped regex, so the cost of a
+    scan grows with the document length rather than with documents x
+    keywords. Entries in `keywords` are either plain strings or dicts:
+
+        - "breakup"                          # whole word, default weight
+        - "reveal*"                          # prefix: reveal, reveals, revealed
+        - {term: "Taylor Swift", weight: 3}
+        - {term: "tiktok", whole_word: false}
+
+    Matching is case-insensitive. Whole-word terms must not be preceded or
+    followed by a word character.
+    """
+
+    def __init__(self, keywords, default_weight=1.5, whole_word=True):
+        self.weights = {}
+        self.exact = {}
+        self.prefixes = {}
+        word_terms, substring_terms = [], []
+        for entry in keywords or []:
+            if isinstance(entry, str):
+                entry = {"term": entry}
+            term = entry["term"].strip().lower()
+            if not term:
+                continue
+            kind = _EXACT
+            if term.endswith('*'):
+                term, kind = term.rstrip('*'), _PREFIX
+            self.weights[entry["term"]] = float(entry.get("weight", default_weight))
+            (self.prefixes if kind == _PREFIX else self.exact)[term] = entry["term"]
+            if entry.get("whole_word", whole_word):
+                word_terms.append((term, kind))
+            else:
+                substring_terms.append((term, kind))
+
+        parts = []
+        if word_terms:
+            parts.append(r'(?<!\w)(?:' + _compile_trie(word_terms) + r')(?!\w)')
+        if substring_terms:
+            parts.append('(?:' + _compile_trie(substring_terms) + ')')
+        self.pattern = re.compile('|'.join(parts), re.IGNORECASE) if parts else None
+
+    def _keyword_for(self, matched):
+        matched = matched.lower()
+        keyword = self.exact.get(matched)
+        if keyword is not None:
+            return keyword
+        for length in range(len(matched), 0, -1):
+            keyword = self.prefixes.get(matched[:length])
+            if keyword is not None:
+                return keyword
+        return None
+
+    def counts(self, text):
+        """Hit count per configured keyword found in `text`."""
+        hits = {}
+        if self.pattern is None or not text:
+            return hits
+        for match in self.pattern.finditer(text):
+            keyword = self._keyword_for(match.group(0))
+            if keyword is not None:
+                hits[keyword] = hits.get(keyword, 0) + 1
+        return hits
+
+    def score(self, text):
+        """Sum of weights of the distinct keywords present in `text`."""
+        return sum(self.weights[k] for k in self.counts(text))
+
+    def scores(self, texts):
+        return np.fromiter((self.score(t) for t in texts), dtype=np.float64, count=len(texts))
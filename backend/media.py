@@ -1,9 +1,20 @@
 import os
+import re
+import json
+import time
+import wave
+import shutil
+import tempfile
+import subprocess
+import threading
 import requests
 import random
 import logging
 import yaml
 import math
+from .audio_io import wav_duration
+from .chunked_tts import split_sentences
+from .footage_library import FootageLibrary
 
 try:
     # MoviePy v1
@@ -17,25 +28,108 @@ except ImportError:
         logging.warning("MoviePy Import failed. Media generation will be mocked.")
         VideoFileClip = None
 
+try:
+    # Static ffmpeg build that ships with MoviePy
+    import imageio_ffmpeg
+    IMAGEIO_FFMPEG_AVAILABLE = True
+except ImportError:
+    IMAGEIO_FFMPEG_AVAILABLE = False
+
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+DURATION_RE = re.compile(r'Duration: (\d+):(\d+):(\d+(?:\.\d+)?)')
+
+# Output frame size per mode when video.resolution doesn't say
+RESOLUTIONS = {"shorts": (720, 1280), "long": (1280, 720)}
+
+ASS_COLORS = {"white": "FFFFFF", "black": "000000", "yellow": "FFFF00", "red": "FF0000"}
+HEX_COLOR_RE = re.compile(r'#?([0-9a-fA-F]{6})')
+
+
+def ass_color(name):
+    """'white' or '#rrggbb' as an ASS &HBBGGRR colour; anything else falls back to white."""
+    name = str(name).strip()
+    match = HEX_COLOR_RE.fullmatch(name)
+    if name.lower() in ASS_COLORS:
+        rgb = ASS_COLORS[name.lower()]
+    elif match:
+        rgb = match.group(1).upper()
+    else:
+        logger.warning(f"Unknown subtitle colour '{name}' (use {', '.join(ASS_COLORS)} or #rrggbb), using white.")
+        rgb = ASS_COLORS["white"]
+    return f"&H00{rgb[4:6]}{rgb[2:4]}{rgb[0:2]}"
+
+
+def srt_timestamp(seconds):
+    millis = int(round(seconds * 1000))
+    hours, millis = divmod(millis, 3600000)
+    minutes, millis = divmod(millis, 60000)
+    secs, millis = divmod(millis, 1000)
+    return f"{hours:02d}:{minutes:02d}:{secs:02d},{millis:03d}"
+
+
+def caption_cues(script_text, duration, timings=None, max_chars=80):
+    """(start, end, text) caption cues covering `duration` seconds.
+
+    With sentence `timings` from the voice step the cues follow the actual
+    narration; otherwise the script's sentences share the duration in
+    proportion to their length.
+    """
+    if timings:
+        return [(t["start"], min(t["end"], duration), t["text"]) for t in timings if t["start"] < duration]
+    sentences = split_sentences(script_text or "", max_chars)
+    total = sum(len(s) for s in sentences)
+    cues = []
+    start = 0.0
+    for sentence in sentences:
+        end = start + duration * len(sentence) / total
+        cues.append((start, end, sentence))
+        start = end
+    return cues
+
+
+def write_srt(cues, path):
+    with open(path, 'w', encoding='utf-8') as f:
+        for i, (start, end, text) in enumerate(cues, 1):
+            f.write(f"{i}\n{srt_timestamp(start)} --> {srt_timestamp(end)}\n{text}\n\n")
+    return path
+
+
 class MediaEngine:
     def __init__(self):
         self.config = self.load_config()
         self.pexels_key = self.config['video'].get('pexels_api_key')
+        self.pexels_url = self.config['video'].get('pexels_api_url', 'https://api.pexels.com/videos/search')
+        self.ffmpeg_settings = self.config['video'].get('ffmpeg') or {}
+        self.footage = self.build_footage_library()
+        self.http = requests.Session()
         
     def load_config(self):
         config_path = os.path.join(os.getcwd(), 'config', 'media.yaml')
         with open(config_path, 'r') as f:
             return yaml.safe_load(f)
 
+    def build_footage_library(self):
+        settings = self.config['video'].get('footage_library', {})
+        if not settings.get('enabled', True):
+            return None
+        return FootageLibrary(settings.get('path', 'data/footage'), max_mb=settings.get('max_mb', 2000),
+                              query_ttl_hours=settings.get('query_ttl_hours', 168),
+                              eviction_grace_minutes=settings.get('eviction_grace_minutes', 60))
+
     def fetch_stock_videos(self, query, orientation="portrait", count=3):
+        """Local paths of up to `count` stock clips for `query`, from the footage library when possible."""
+        if self.footage is not None:
+            cached = self.footage.lookup(query, orientation, count)
+            if cached is not None:
+                logger.info(f"Stock footage for '{query}' served from the library ({len(cached)} clips).")
+                return [clip["path"] for clip in cached]
+
         if not self.pexels_key or self.pexels_key == "YOUR_PEXELS_KEY":
             logger.warning("No Pexels API key found in config/media.yaml")
-            return []
+            return self.library_fallback(query, orientation, count)
             
-        url = "https://api.pexels.com/videos/search"
         headers = {"Authorization": self.pexels_key}
         params = {
             "query": query, 
@@ -45,10 +139,13 @@ class MediaEngine:
         }
         
         try:
-            resp = requests.get(url, headers=headers, params=params)
+            resp = self.http.get(self.pexels_url, headers=headers, params=params, timeout=30)
             resp.raise_for_status()
             data = resp.json()
             video_files = []
+            video_ids = []
+            # Clips of this result set must not evict each other while it downloads
+            wanted = [vid['id'] for vid in data.get('videos', [])]
             
             for vid in data.get('videos', []):
                 # Get best fit file
@@ -56,26 +153,104 @@ class MediaEngine:
                 # Simple selection: pick first mp4
                 target = next((f for f in files if f['file_type'] == 'video/mp4'), None)
                 if target:
-                    # Download
-                    filename = f"temp_stock_{vid['id']}.mp4"
-                    self.download_file(target['link'], filename)
-                    video_files.append(filename)
+                    video_files.append(self.stock_file(vid, target, orientation, keep=wanted))
+                    video_ids.append(vid['id'])
+            if self.footage is not None:
+                self.footage.record_search(query, orientation, count, video_ids)
             return video_files
         except Exception as e:
             logger.error(f"Failed to fetch stock videos: {e}")
+            return self.library_fallback(query, orientation, count)
+
+    def stock_file(self, vid, target, orientation, keep=()):
+        """Local copy of one Pexels video: the library's, downloading it only if missing."""
+        if self.footage is None:
+            filename = f"temp_stock_{vid['id']}.mp4"
+            self.download_file(target['link'], filename)
+            return filename
+        clip = self.footage.get(vid['id'])
+        if clip is not None:
+            return clip["path"]
+        path = self.footage.path_for(vid['id'])
+        # Unique temp name, then an atomic rename: workers may fetch the same clip at once
+        partial = f"{path}.{os.getpid()}.{threading.get_ident()}.part"
+        try:
+            self.download_file(target['link'], partial)
+            os.replace(partial, path)
+        finally:
+            if os.path.exists(partial): os.remove(partial)
+        self.footage.add(vid['id'], path, orientation=orientation,
+                         width=target.get('width') or vid.get('width'),
+                         height=target.get('height') or vid.get('height'),
+                         duration=vid.get('duration'), keep=keep)
+        return path
+
+    def library_fallback(self, query, orientation, count):
+        """Library clips from earlier related searches, when Pexels can't be asked."""
+        if self.footage is None:
             return []
+        clips = self.footage.search(query, orientation=orientation, limit=count)
+        if clips:
+            logger.info(f"Using {len(clips)} library clips for '{query}' without Pexels.")
+        else:
+            logger.warning(f"No library clips match '{query}'.")
+        return [clip["path"] for clip in clips]
 
     def download_file(self, url, filename):
-        with requests.get(url, stream=True) as r:
+        with self.http.get(url, stream=True, timeout=60) as r:
             r.raise_for_status()
             with open(filename, 'wb') as f:
                 for chunk in r.iter_content(chunk_size=8192):
                     f.write(chunk)
 
+    def ffmpeg_binary(self):
+        """ffmpeg executable: video.ffmpeg.binary, then PATH, then the one bundled with MoviePy."""
+        configured = self.ffmpeg_settings.get('binary')
+        if configured:
+            return configured
+        found = shutil.which('ffmpeg')
+        if found:
+            return found
+        if IMAGEIO_FFMPEG_AVAILABLE:
+            try:
+                return imageio_ffmpeg.get_ffmpeg_exe()
+            except RuntimeError:
+                pass
+        return None
+
+    def renderer(self):
+        """'ffmpeg' or 'moviepy' (video.renderer), falling back to whichever is installed."""
+        wanted = self.config['video'].get('renderer', 'moviepy')
+        if wanted == 'ffmpeg' and not self.ffmpeg_binary():
+            logger.warning("ffmpeg not found, rendering with MoviePy.")
+            return 'moviepy'
+        if wanted != 'ffmpeg' and VideoFileClip is None and self.ffmpeg_binary():
+            logger.warning("MoviePy not available, rendering with ffmpeg.")
+            return 'ffmpeg'
+        return wanted
+
+    def audio_duration(self, audio_path):
+        try:
+            return wav_duration(audio_path)
+        except (wave.Error, EOFError):
+            pass
+        # Not a WAV: ffmpeg prints the container duration on stderr
+        ffmpeg = self.ffmpeg_binary()
+        if not ffmpeg:
+            raise RuntimeError(f"{audio_path} is not a WAV and ffmpeg was not found to read its duration "
+                               "(install ffmpeg or set video.ffmpeg.binary)")
+        probe = subprocess.run([ffmpeg, '-hide_banner', '-i', audio_path],
+                               capture_output=True, text=True)
+        match = DURATION_RE.search(probe.stderr)
+        if not match:
+            raise ValueError(f"Could not read the duration of {audio_path}")
+        hours, minutes, seconds = match.groups()
+        return int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+
     def generate_video(self, audio_path, script_text, keywords, output_path, mode="shorts"):
+        renderer = self.renderer()
         # 1. Analyze Audio Duration
-        audio = AudioFileClip(audio_path)
-        duration = audio.duration
+        duration = self.audio_duration(audio_path)
         
         # 2. Fetch stock videos
         orientation = "portrait" if mode == "shorts" else "landscape"
@@ -84,6 +259,20 @@ class MediaEngine:
         if not videos:
             logger.error("No videos found. Cannot generate.")
             return False
+
+        try:
+            if renderer == 'ffmpeg':
+                return self.render_ffmpeg(audio_path, videos, script_text, output_path, mode, duration)
+            return self.render_moviepy(audio_path, videos, script_text, output_path, mode)
+        finally:
+            # Cleanup temp files (library clips are kept for the next article)
+            for v in videos:
+                if self.footage is not None and self.footage.owns(v): continue
+                if os.path.exists(v): os.remove(v)
+
+    def render_moviepy(self, audio_path, videos, script_text, output_path, mode="shorts"):
+        audio = AudioFileClip(audio_path)
+        duration = audio.duration
             
         # 3. Stitch Videos
         clips = []
@@ -124,11 +313,93 @@ class MediaEngine:
         
         # 5. Write Output
         final_video.write_videofile(output_path, fps=24, codec="libx264", audio_codec="aac")
-        
-        # Cleanup temp files
+        return True
+
+    def subtitle_style(self, height):
+        """libass force_style for video.subtitle_settings on a `height`-pixel frame."""
+        settings = self.config['video'].get('subtitle_settings', {})
+        font = settings.get('font', 'Arial')
+        bold = font.endswith('-Bold')
+        # libass lays out SRT on a 288-line canvas and scales it to the frame
+        fontsize = settings.get('fontsize', 50) * 288 / height
+        return ",".join([
+            f"FontName={font[:-5] if bold else font}",
+            f"Bold={1 if bold else 0}",
+            f"Fontsize={fontsize:.1f}",
+            f"PrimaryColour={ass_color(settings.get('color', 'white'))}",
+            f"OutlineColour={ass_color(settings.get('stroke_color', 'black'))}",
+            "BorderStyle=1",
+            f"Outline={settings.get('stroke_width', 2)}",
+            "Alignment=10",  # SSA numbering (force_style): middle centre
+        ])
+
+    def ffmpeg_command(self, audio_path, videos, output_path, mode, duration, subtitles=None):
+        """One ffmpeg invocation: scale/crop every clip, concat, burn captions, mux the narration."""
+        width, height = self.config['video'].get('resolution', {}).get(mode, RESOLUTIONS[mode])
+        fps = self.ffmpeg_settings.get('fps', 24)
+        cmd = [self.ffmpeg_binary(), '-y', '-hide_banner', '-loglevel', 'error']
         for v in videos:
-            if os.path.exists(v): os.remove(v)
-            
+            # No clip can contribute more than the whole narration, so don't decode past it
+            cmd += ['-t', f"{duration:.3f}", '-i', os.path.abspath(v)]
+        cmd += ['-i', os.path.abspath(audio_path)]
+
+        graph = [
+            f"[{i}:v]scale={width}:{height}:force_original_aspect_ratio=increase,"
+            f"crop={width}:{height},setsar=1,fps={fps}[v{i}]"
+            for i in range(len(videos))
+        ]
+        # Too little footage: hold the last frame until the narration ends
+        video = "".join(f"[v{i}]" for i in range(len(videos)))
+        video += (f"concat=n={len(videos)}:v=1:a=0,"
+                  f"tpad=stop_mode=clone:stop_duration={duration:.3f},trim=duration={duration:.3f}")
+        if subtitles:
+            video += f",subtitles={subtitles}:force_style='{self.subtitle_style(height)}'"
+        graph.append(video + "[v]")
+
+        cmd += ['-filter_complex', ";".join(graph), '-map', '[v]', '-map', f"{len(videos)}:a:0",
+                '-c:v', 'libx264', '-preset', self.ffmpeg_settings.get('preset', 'veryfast'),
+                '-crf', str(self.ffmpeg_settings.get('crf', 23)), '-pix_fmt', 'yuv420p',
+                '-c:a', 'aac', '-b:a', self.ffmpeg_settings.get('audio_bitrate', '128k'),
+                '-t', f"{duration:.3f}", '-movflags', '+faststart']
+        if self.ffmpeg_settings.get('threads'):
+            cmd += ['-threads', str(self.ffmpeg_settings['threads'])]
+        return cmd + [os.path.abspath(output_path)]
+
+    def render_ffmpeg(self, audio_path, videos, script_text, output_path, mode="shorts", duration=None):
+        """Render with a single ffmpeg filtergraph instead of MoviePy's per-frame compositing.
+
+        Captions follow the narration's sentence timings (<audio>.timings.json)
+        when the voice step wrote them, otherwise the script's sentences are
+        spread over the audio by length.
+        """
+        if duration is None:
+            duration = self.audio_duration(audio_path)
+        timings = None
+        timings_path = f"{os.path.splitext(audio_path)[0]}.timings.json"
+        if os.path.exists(timings_path):
+            with open(timings_path) as f:
+                timings = json.load(f)
+
+        with tempfile.TemporaryDirectory() as workdir:
+            subtitles = None
+            cues = caption_cues(script_text, duration, timings)
+            if cues:
+                write_srt(cues, os.path.join(workdir, "captions.srt"))
+                subtitles = "captions.srt"
+            cmd = self.ffmpeg_command(audio_path, videos, output_path, mode, duration, subtitles)
+            started = time.perf_counter()
+            timeout = self.ffmpeg_settings.get('timeout', 1800)
+            try:
+                # Run from the temp dir so the subtitles path needs no filtergraph escaping
+                proc = subprocess.run(cmd, cwd=workdir, capture_output=True, text=True, timeout=timeout)
+            except subprocess.TimeoutExpired:
+                logger.error(f"ffmpeg render of {output_path} timed out after {timeout}s")
+                if os.path.exists(output_path): os.remove(output_path)
+                return False
+        if proc.returncode != 0:
+            logger.error(f"ffmpeg render failed: {proc.stderr.strip()[-500:]}")
+            return False
+        logger.info(f"Rendered {output_path} ({duration:.1f}s) with ffmpeg in {time.perf_counter() - started:.1f}s")
         return True
 
     def generate_thumbnail(self, title, output_path):
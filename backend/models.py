@@ -27,15 +27,75 @@ class Article(BaseModel):
     # Metadata for downstream steps
     rewrite_text = TextField(null=True)
     video_path = CharField(null=True)
+
+    # Dedup keys (see backend/dedup.py): canonical URL plus a 64-bit SimHash
+    # of title + summary, split into indexed bands for near-duplicate lookup
+    canonical_url = CharField(max_length=1024, null=True, index=True)
+    fingerprint = BigIntegerField(null=True)
+    fp_band0 = IntegerField(null=True, index=True)
+    fp_band1 = IntegerField(null=True, index=True)
+    fp_band2 = IntegerField(null=True, index=True)
+    fp_band3 = IntegerField(null=True, index=True)
+
+    # Story cluster (see backend/velocity.py); null until trend scoring runs
+    cluster_id = IntegerField(null=True, index=True)
     
+class FeedState(BaseModel):
+    # HTTP cache validators per feed, so unchanged feeds come back as 304
+    url = CharField(unique=True, max_length=1024)
+    etag = CharField(null=True)
+    last_modified = CharField(null=True)
+    last_status = IntegerField(null=True)
+    last_fetched = DateTimeField(null=True)
+
+class StoryCluster(BaseModel):
+    # Online threshold clustering: one row per story; centroid is the running
+    # mean of its members as a float32 unit vector
+    centroid = BlobField()
+    member_count = IntegerField(default=0)
+    first_seen = DateTimeField(default=datetime.datetime.now)
+    last_seen = DateTimeField(default=datetime.datetime.now, index=True)
+
+class ClusterBucket(BaseModel):
+    # Mentions per story cluster per hour, for sliding-window velocity
+    cluster_id = IntegerField()
+    hour = DateTimeField(index=True)
+    mentions = IntegerField(default=0)
+
+    class Meta:
+        indexes = ((('cluster_id', 'hour'), True),)
+
 class Trend(BaseModel):
+    # Per-cycle snapshot of a story cluster: keyword is the representative title
     keyword = CharField()
     score = FloatField()
     timestamp = DateTimeField(default=datetime.datetime.now)
+    cluster_id = IntegerField(null=True, index=True)
+    article_id = IntegerField(null=True)
+    member_count = IntegerField(default=0)
+
+TABLES = [Article, FeedState, StoryCluster, ClusterBucket, Trend]
+
+def migrate_db():
+    # create_tables() does not alter existing tables; add columns introduced
+    # after a database was first created. Must run before create_tables(),
+    # which would otherwise index the not-yet-existing columns.
+    from playhouse.migrate import SqliteMigrator, migrate
+    migrator = SqliteMigrator(db)
+    for model in TABLES:
+        table = model._meta.table_name
+        if not db.table_exists(table):
+            continue
+        existing = {c.name for c in db.get_columns(table)}
+        for field in model._meta.sorted_fields:
+            if field.column_name not in existing:
+                # add_column() also creates the field's index
+                migrate(migrator.add_column(table, field.column_name, field))
 
 def init_db():
-    db.connect()
-    db.create_tables([Article, Trend])
+    db.connect(reuse_if_open=True)
+    migrate_db()
+    db.create_tables(TABLES)
     print(f"Database initialized at {DB_PATH}")
 
 if __name__ == "__main__":
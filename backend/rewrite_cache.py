@@ -0,0 +1,114 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+# Setup basic logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+def rewrite_key(model, system, prompt, options):
+    """Content address of a generation: identical inputs give identical keys."""
+    material = json.dumps(
+        {"model": model, "system": system or "", "prompt": prompt, "options": options or {}},
+        sort_keys=True, ensure_ascii=False,
+    )
+    return hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+
+class RewriteCache:
+    """Persistent LLM output cache in a standalone SQLite file.
+
+    Entries are keyed by rewrite_key(); once the stored text exceeds
+    `max_mb`, the least recently used entries are evicted. Safe to share
+    between threads, and between worker processes through SQLite locking.
+    """
+
+    def __init__(self, path="data/rewrite_cache.db", max_mb=50):
+        self.path = path
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._conn = None
+
+    @property
+    def conn(self):
+        # Opened on first use, so a writer that never generates leaves no file behind
+        if self._conn is None:
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS rewrites ("
+                " key TEXT PRIMARY KEY, model TEXT, response TEXT NOT NULL,"
+                " size INTEGER NOT NULL, created REAL NOT NULL, last_used REAL NOT NULL,"
+                " hits INTEGER NOT NULL DEFAULT 0)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS rewrites_last_used ON rewrites (last_used)")
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def get(self, key):
+        with self.lock:
+            row = self.conn.execute("SELECT response FROM rewrites WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.conn.execute(
+                "UPDATE rewrites SET last_used = ?, hits = hits + 1 WHERE key = ?", (time.time(), key)
+            )
+            self.conn.commit()
+            return row[0]
+
+    def put(self, key, response, model=None):
+        size = len(response.encode('utf-8'))
+        now = time.time()
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO rewrites (key, model, response, size, created, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?)", (key, model, response, size, now, now)
+            )
+            self._evict()
+            self.conn.commit()
+
+    def _evict(self):
+        total = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM rewrites").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # Oldest first until back under the cap
+        doomed = []
+        for key, size in self.conn.execute("SELECT key, size FROM rewrites ORDER BY last_used"):
+            if total <= self.max_bytes:
+                break
+            doomed.append((key,))
+            total -= size
+        self.conn.executemany("DELETE FROM rewrites WHERE key = ?", doomed)
+        self.evictions += len(doomed)
+        logger.info(f"Rewrite cache evicted {len(doomed)} entries.")
+
+    def stats(self):
+        with self.lock:
+            entries, size = self.conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM rewrites").fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "entries": entries,
+            "bytes": size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def clear(self):
+        with self.lock:
+            self.conn.execute("DELETE FROM rewrites")
+            self.conn.commit()
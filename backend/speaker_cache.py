@@ -0,0 +1,89 @@
+import hashlib
+import logging
+import os
+import threading
+
+import numpy as np
+
+# Setup basic logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class SpeakerLatentCache:
+    """Speaker latents per reference WAV, kept on disk and in memory."""
+
+    def __init__(self, cache_dir="data/speakers"):
+        self.cache_dir = cache_dir
+        self.lock = threading.Lock()
+        # abspath -> (mtime_ns, size, sha256); render() asks for the key on every job
+        self.hash_lock = threading.Lock()
+        self.hashes = {}
+        self.latents = {}
+        self.hits = 0
+        self.computed = 0
+
+    def key_for(self, wav_path):
+        """Content hash of a reference WAV, re-read only when its mtime or size changes."""
+        path = os.path.abspath(wav_path)
+        stat = os.stat(path)
+        marker = (stat.st_mtime_ns, stat.st_size)
+        with self.hash_lock:
+            known = self.hashes.get(path)
+            if known is not None and known[:2] == marker:
+                return known[2]
+            key = file_hash(path)
+            self.hashes[path] = marker + (key,)
+            return key
+
+    def path_for(self, key):
+        return os.path.join(self.cache_dir, f"{key}.npz")
+
+    def get(self, wav_path, compute):
+        """(gpt_cond_latent, speaker_embedding) for `wav_path` as float32 arrays.
+
+        `compute(wav_path)` is only called when the latents are not cached.
+        """
+        with self.lock:
+            key = self.key_for(wav_path)
+            latents = self.latents.get(key)
+            if latents is None:
+                path = self.path_for(key)
+                if os.path.exists(path):
+                    with np.load(path) as data:
+                        latents = (data["gpt_cond_latent"], data["speaker_embedding"])
+                    self.hits += 1
+                else:
+                    logger.info(f"Computing speaker latents for {wav_path}")
+                    gpt_cond_latent, speaker_embedding = compute(wav_path)
+                    latents = (np.asarray(gpt_cond_latent, dtype=np.float32),
+                               np.asarray(speaker_embedding, dtype=np.float32))
+                    os.makedirs(self.cache_dir, exist_ok=True)
+                    tmp_path = f"{path}.tmp.npz"
+                    np.savez(tmp_path, gpt_cond_latent=latents[0], speaker_embedding=latents[1])
+                    os.replace(tmp_path, path)
+                    self.computed += 1
+                self.latents[key] = latents
+            else:
+                self.hits += 1
+            return latents
+
+
+# Precompute all persona voices: python -m backend.speaker_cache
+if __name__ == "__main__":
+    from .voice import TTS_AVAILABLE, VoiceGenerator
+
+    if not TTS_AVAILABLE:
+        raise SystemExit("Coqui TTS is not installed.")
+    voice = VoiceGenerator(use_service=False)
+    for voice_id, wav_path in voice.voices.items():
+        voice.speaker_latents(wav_path)
+        print(f"{voice_id}: {wav_path} cached")
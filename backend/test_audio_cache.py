@@ -0,0 +1,84 @@
+"""Harness for the per-sentence TTS audio cache with a stand-in synthesizer.
+
+Usage: python -m backend.test_audio_cache
+"""
+import os
+import tempfile
+
+import numpy as np
+
+from .audio_cache import AudioSegmentCache, audio_key
+from .test_speaker_cache import write_reference
+from .voice import VoiceGenerator
+
+SCRIPT = ["You won't believe this...", "Brad Pitt ate a burger. Fans went wild. Brad Pitt ate a burger.",
+          "Subscribe for more tea!"]
+
+
+def make_voice(workdir, calls):
+    voice = VoiceGenerator(use_service=False)
+    voice.settings = dict(voice.settings, chunked={"enabled": False})
+    voice.audio_cache = AudioSegmentCache(os.path.join(workdir, "tts_cache.db"))
+
+    def synthesize(text, language="en", speaker_wav=None):
+        calls.append(text)
+        rng = np.random.default_rng(abs(hash((text, language))) % 2 ** 32)
+        return (0.1 * rng.standard_normal(240 * len(text.split()))).astype(np.float32)
+
+    voice.synthesize = synthesize
+    return voice
+
+
+def run():
+    with tempfile.TemporaryDirectory() as workdir:
+        diva = os.path.join(workdir, "diva.wav")
+        write_reference(diva, 220)
+        calls = []
+        voice = make_voice(workdir, calls)
+
+        first, timings = voice.render(SCRIPT, speaker_wav=diva)
+        # The repeated sentence inside the body is synthesized once
+        assert len(calls) == 4, calls
+        assert not any(t["cached"] for t in timings)
+
+        calls.clear()
+        again, timings = voice.render(SCRIPT, speaker_wav=diva)
+        assert calls == [] and all(t["cached"] for t in timings), calls
+        assert np.abs(again - first).max() < 1e-3, "cached audio differs beyond 16-bit rounding"
+
+        # A minor edit only re-synthesizes the edited sentence
+        edited = [SCRIPT[0], SCRIPT[1].replace("Fans went wild.", "Fans were stunned."), SCRIPT[2]]
+        calls.clear()
+        voice.render(edited, speaker_wav=diva)
+        assert calls == ["Fans were stunned."], calls
+
+        # Another language or voice is another entry
+        calls.clear()
+        voice.render(SCRIPT[:1], language="es", speaker_wav=diva)
+        voice.render(SCRIPT[:1])
+        assert len(calls) == 2, calls
+
+        # Survives a new process
+        calls.clear()
+        fresh = make_voice(workdir, calls)
+        fresh.render(SCRIPT, speaker_wav=diva)
+        assert calls == [], calls
+        print(f"cache: {voice.audio_cache.stats()}")
+
+        # LRU size cap
+        lru = AudioSegmentCache(os.path.join(workdir, "lru.db"), max_mb=0.02)
+        tone = 0.1 * np.sin(np.arange(2400, dtype=np.float32))
+        keys = [audio_key(f"sentence {i}", None, "en", "m") for i in range(20)]
+        for key in keys:
+            lru.put_many([(key, tone)], 24000)
+            lru.get_many([keys[0]], 24000)   # keep the first one hot
+        stats = lru.stats()
+        assert stats["bytes"] <= 0.02 * 1024 * 1024 and stats["evictions"] > 0, stats
+        assert lru.get_many([keys[0]], 24000)[0] is not None, "recently used entry was evicted"
+        assert lru.get_many([keys[1]], 24000)[0] is None, "least recently used entry survived"
+        print(f"lru: {stats}")
+    print("OK")
+
+
+if __name__ == "__main__":
+    run()
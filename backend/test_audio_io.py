@@ -0,0 +1,84 @@
+"""Harness for the WAV helpers in backend/audio_io.py.
+
+Usage: python -m backend.test_audio_io
+"""
+import os
+import struct
+import tempfile
+import wave
+
+import numpy as np
+
+from .audio_io import (STREAMING_SIZE, finalize_streamed_wav, read_wav, speech_seconds, to_pcm16,
+                       wav_duration, wav_header, write_silence, write_wav)
+
+SR = 24000
+
+
+def check_finalize(workdir):
+    path = os.path.join(workdir, "streamed.wav")
+    pcm = to_pcm16(np.linspace(-0.5, 0.5, SR // 2))
+    with open(path, 'wb') as f:
+        f.write(wav_header(SR))
+        f.write(pcm)
+    with open(path, 'rb') as f:
+        assert struct.unpack('<I', f.read(8)[4:])[0] == STREAMING_SIZE
+
+    assert finalize_streamed_wav(path) == len(pcm)
+    with open(path, 'rb') as f:
+        header = f.read(44)
+    assert struct.unpack('<I', header[4:8])[0] == os.path.getsize(path) - 8
+    assert struct.unpack('<I', header[40:44])[0] == len(pcm)
+    with wave.open(path, 'rb') as f:
+        assert f.getnframes() == SR // 2 and f.getframerate() == SR
+    assert wav_duration(path) == 0.5
+
+    short = os.path.join(workdir, "short.wav")
+    with open(short, 'wb') as f:
+        f.write(b'RIFF')
+    try:
+        finalize_streamed_wav(short)
+        raise AssertionError("a truncated header must be rejected")
+    except ValueError:
+        pass
+    print("finalize: header sizes OK")
+
+
+def check_speech_seconds(workdir):
+    assert speech_seconds(" ".join(["word"] * 150)) == 60.0
+    assert speech_seconds(["ten words " * 5, None, "and five more words here"]) == 6.0
+    assert speech_seconds("Hi!") == 1.0 and speech_seconds("", minimum=0.5) == 0.5
+    assert speech_seconds("one two three", words_per_minute=60) == 3.0
+
+    path = write_silence(os.path.join(workdir, "placeholder.wav"), speech_seconds("word " * 30), SR)
+    assert wav_duration(path) == 12.0
+    print("speech_seconds: placeholder sizing OK")
+
+
+def check_round_trip(workdir):
+    t = np.arange(SR) / SR
+    samples = (0.4 * np.sin(2 * np.pi * 220 * t)).astype(np.float32)
+    path = write_wav(os.path.join(workdir, "tone.wav"), np.append(samples, [1.5, -1.5]), SR)
+    back, sample_rate = read_wav(path)
+    assert sample_rate == SR and back.dtype == np.float32 and len(back) == SR + 2
+    assert np.max(np.abs(back[:SR] - samples)) < 1 / 32767 + 1e-6
+    assert back[-2] == 1.0 and back[-1] == -1.0, "out of range samples must be clipped"
+
+    # Stereo references (e.g. a recorded voice sample) are mixed down
+    stereo = os.path.join(workdir, "stereo.wav")
+    with wave.open(stereo, 'wb') as f:
+        f.setnchannels(2)
+        f.setsampwidth(2)
+        f.setframerate(SR)
+        f.writeframes(to_pcm16(np.stack([samples, np.zeros_like(samples)], axis=1).ravel()))
+    mono, _ = read_wav(stereo)
+    assert len(mono) == SR and np.allclose(mono, samples / 2, atol=1 / 32767)
+    print("round trip: write_wav/read_wav OK")
+
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as workdir:
+        check_finalize(workdir)
+        check_speech_seconds(workdir)
+        check_round_trip(workdir)
+    print("OK")
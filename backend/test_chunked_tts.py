@@ -0,0 +1,84 @@
+"""Harness for sentence-chunked TTS with a stand-in voice (no XTTS needed).
+
+Usage: python -m backend.test_chunked_tts [--workers 4] [--cost 0.1]
+"""
+import argparse
+import functools
+import time
+
+import numpy as np
+
+from .chunked_tts import ChunkedSynthesizer, crossfade_concat, split_sentences
+
+SCRIPT = [
+    "You won't believe this... Brad Pitt was spotted in New York!",
+    " ".join(f"Sentence {i} of the story body goes on about the burger, the fans and the paparazzi." for i in range(12)),
+    "What do you think? Subscribe for more tea!",
+]
+
+
+class BusyVoice:
+    sample_rate = 24000
+
+    def __init__(self, cost):
+        self.cost = cost
+
+    def synthesize(self, text, language="en", speaker_wav=None):
+        seconds = 0.06 * len(text.split())
+        time.sleep(seconds * self.cost)
+        t = np.arange(int(seconds * self.sample_rate)) / self.sample_rate
+        return (0.3 * np.sin(2 * np.pi * 220 * t)).astype(np.float32)
+
+
+def check_splitting():
+    chunks = split_sentences("One. Two! Three? " + "word, " * 80 + "end.", max_chars=60)
+    assert chunks[0] == "One. Two! Three?", chunks
+    assert all(len(c) <= 60 for c in chunks), chunks
+    assert " ".join(chunks).split() == ("One. Two! Three? " + "word, " * 80 + "end.").split()
+
+
+def check_crossfade():
+    sr = 1000
+    pieces = [np.ones(500, np.float32), np.ones(300, np.float32), np.ones(200, np.float32)]
+    samples, spans = crossfade_concat(pieces, sr, crossfade_ms=50)
+    assert len(samples) == 1000 - 2 * 50, len(samples)
+    assert np.allclose(samples, 1.0), "crossfade of equal signals must be flat"
+    assert spans == [(0.0, 0.5), (0.45, 0.75), (0.7, 0.9)], spans
+
+
+def run(workers, cost):
+    check_splitting()
+    check_crossfade()
+
+    voice = BusyVoice(cost)
+    started = time.perf_counter()
+    whole = voice.synthesize(" ".join(SCRIPT))
+    single_seconds = time.perf_counter() - started
+
+    synth = ChunkedSynthesizer(functools.partial(BusyVoice, cost), workers=workers, max_chars=120).start()
+    try:
+        started = time.perf_counter()
+        samples, timings = synth.synthesize(SCRIPT)
+        chunked_seconds = time.perf_counter() - started
+    finally:
+        synth.close()
+
+    assert [t["index"] for t in timings] == list(range(len(timings)))
+    assert {t["segment"] for t in timings} == {0, 1, 2}
+    assert all(a["start"] < b["start"] and a["end"] <= b["end"] for a, b in zip(timings, timings[1:]))
+    assert abs(timings[-1]["end"] - len(samples) / voice.sample_rate) < 1e-6
+    print(f"{len(timings)} chunks, {len(samples) / voice.sample_rate:.1f}s audio "
+          f"(whole script {len(whole) / voice.sample_rate:.1f}s)")
+    for t in timings[:3]:
+        print(f"  chunk {t['index']} [{t['start']:.2f}-{t['end']:.2f}s] synth {t['synth_seconds']:.2f}s: {t['text'][:40]}")
+    print(f"whole script: {single_seconds:.2f}s  chunked on {workers} workers: {chunked_seconds:.2f}s  "
+          f"speedup: {single_seconds / chunked_seconds:.1f}x")
+    print("OK")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--cost", type=float, default=0.1)
+    args = parser.parse_args()
+    run(args.workers, args.cost)
@@ -0,0 +1,140 @@
+"""Harness for the stock footage library against a local fake Pexels.
+
+Usage: python -m backend.test_footage_library
+"""
+import os
+import tempfile
+
+from .audio_io import silence, write_wav
+from .fake_pexels import FakePexels
+from .footage_library import FootageLibrary
+from .media import MediaEngine
+
+CLIP_KB = 64
+
+
+def make_engine(fake, library):
+    engine = MediaEngine()
+    engine.pexels_key = "test-key"
+    engine.pexels_url = f"{fake.url}/videos/search"
+    engine.footage = library
+    return engine
+
+
+def check_reuse(workdir):
+    fake = FakePexels(catalog={"celebrity": [1, 2, 3], "red carpet": [2, 3, 4]}).start()
+    try:
+        path = os.path.join(workdir, "reuse")
+        first = make_engine(fake, FootageLibrary(path)).fetch_stock_videos("celebrity", count=3)
+        assert len(first) == 3 and all(os.path.exists(p) for p in first)
+        assert len(fake.searches) == 1 and len(fake.downloads) == 3
+
+        # A new engine (another task) sees the same library: no search, no download
+        again = make_engine(fake, FootageLibrary(path)).fetch_stock_videos("  Celebrity ", count=3)
+        assert again == first, (again, first)
+        assert len(fake.searches) == 1 and len(fake.downloads) == 3
+
+        # Fewer clips than an earlier search returned is still a hit
+        assert make_engine(fake, FootageLibrary(path)).fetch_stock_videos("celebrity", count=2) == first[:2]
+        assert len(fake.searches) == 1
+
+        # Another query that returns clips we already have only downloads the new one
+        engine = make_engine(fake, FootageLibrary(path))
+        overlap = engine.fetch_stock_videos("red carpet", count=3)
+        assert len(fake.searches) == 2 and len(fake.downloads) == 4, fake.downloads
+        assert overlap[:2] == first[1:]
+
+        # Asking for more than the earlier search did goes back to Pexels
+        engine.fetch_stock_videos("celebrity", count=5)
+        assert len(fake.searches) == 3
+        print(f"reuse: {engine.footage.stats()}")
+    finally:
+        fake.stop()
+
+
+def check_eviction_and_ttl(workdir):
+    fake = FakePexels(file_size=CLIP_KB * 1024).start()
+    try:
+        library = FootageLibrary(os.path.join(workdir, "lru"), max_mb=5 * CLIP_KB / 1024, eviction_grace_minutes=0)
+        engine = make_engine(fake, library)
+        old = engine.fetch_stock_videos("wedding", count=3)
+        engine.fetch_stock_videos("tour", count=3)
+        stats = library.stats()
+        assert stats["clips"] == 5 and stats["bytes"] <= 5 * CLIP_KB * 1024, stats
+        assert not os.path.exists(old[0]), "least recently used clip was not deleted"
+
+        # An evicted clip makes its query a miss; only that clip is downloaded again
+        downloads = len(fake.downloads)
+        engine.fetch_stock_videos("wedding", count=3)
+        assert len(fake.downloads) == downloads + 1, fake.downloads[downloads:]
+
+        # A stale query is re-asked, but clips on disk are not re-downloaded
+        library.query_ttl = 0
+        searches, downloads = len(fake.searches), len(fake.downloads)
+        engine.fetch_stock_videos("wedding", count=3)
+        assert len(fake.searches) == searches + 1 and len(fake.downloads) == downloads
+        print(f"eviction: {library.stats()}")
+
+        # Clips used within the grace period may be in another process's render: the cap waits
+        busy = FootageLibrary(os.path.join(workdir, "grace"), max_mb=5 * CLIP_KB / 1024)
+        engine = make_engine(fake, busy)
+        clips = engine.fetch_stock_videos("wedding", count=3) + engine.fetch_stock_videos("tour", count=3)
+        assert all(os.path.exists(p) for p in clips) and busy.stats()["evictions"] == 0, busy.stats()
+        busy.grace = 0
+        engine.fetch_stock_videos("concert", count=1)
+        assert busy.stats()["clips"] == 5 and not os.path.exists(clips[0]), busy.stats()
+        print(f"grace: {busy.stats()}")
+    finally:
+        fake.stop()
+
+
+def check_offline(workdir):
+    fake = FakePexels().start()
+    library = FootageLibrary(os.path.join(workdir, "offline"))
+    portrait = make_engine(fake, library).fetch_stock_videos("red carpet", count=2)
+    make_engine(fake, library).fetch_stock_videos("beach", orientation="landscape", count=2)
+    fake.stop()
+
+    # Unreachable API, and no key at all: fall back to clips of related searches
+    engine = make_engine(fake, library)
+    clips = engine.fetch_stock_videos("Red carpet premiere", count=3)
+    assert sorted(clips) == sorted(portrait), clips
+    assert engine.fetch_stock_videos("paparazzi", count=3) == [], "unrelated clips must not be used"
+    engine.pexels_key = None
+    assert engine.fetch_stock_videos("beach wedding", orientation="landscape", count=1)
+    assert engine.fetch_stock_videos("beach wedding", count=1) == [], "wrong orientation"
+    print("offline: library fallback OK")
+
+
+def check_render_keeps_clips(workdir):
+    engine = MediaEngine()
+    ffmpeg = engine.ffmpeg_binary()
+    if not ffmpeg:
+        print("render: skipped (no ffmpeg)")
+        return
+    from .bench_render import make_clips
+
+    clip = make_clips(ffmpeg, workdir, 1, 2)[0]
+    fake = FakePexels(clip=clip).start()
+    try:
+        engine = make_engine(fake, FootageLibrary(os.path.join(workdir, "render")))
+        engine.config['video']['renderer'] = 'ffmpeg'
+        audio = write_wav(os.path.join(workdir, "narration.wav"), silence(3, 24000), 24000)
+        for i in range(2):
+            output = os.path.join(workdir, f"short{i}.mp4")
+            assert engine.generate_video(audio, "Hello there. Subscribe!", "celebrity", output)
+            assert os.path.exists(output)
+        assert all(os.path.exists(p) for p in engine.fetch_stock_videos("celebrity", count=1))
+        assert len(fake.searches) == 1 and len(fake.downloads) == 1, (fake.searches, fake.downloads)
+        print("render: library clips survived two renders")
+    finally:
+        fake.stop()
+
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as workdir:
+        check_reuse(workdir)
+        check_eviction_and_ttl(workdir)
+        check_offline(workdir)
+        check_render_keeps_clips(workdir)
+    print("OK")
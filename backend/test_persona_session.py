@@ -0,0 +1,107 @@
+"""Harness for persona sessions (prompt prefix reuse) against a local fake Ollama.
+
+Usage: python -m backend.test_persona_session [--articles 6] [--token-cost 0.005]
+"""
+import argparse
+import threading
+import time
+
+from .fake_ollama import FakeOllama
+from .writer import AIWriter
+
+
+def prompt_eval_seconds(writer, texts, persona_key):
+    total = 0.0
+    for text in texts:
+        writer.rewrite_article(text, persona_key=persona_key)
+        total += writer.last_stats["prompt_eval_seconds"]
+    return total
+
+
+def run(articles, token_cost):
+    fake = FakeOllama(token_cost=token_cost).start()
+    try:
+        texts = [f"Celebrity story number {i} happened today." for i in range(articles)]
+
+        cold = AIWriter(ollama_url=fake.url)
+        cold.cache = None
+        cold.use_persona_sessions = False
+        cold_seconds = prompt_eval_seconds(cold, texts, "gossip_queen")
+
+        warm = AIWriter(ollama_url=fake.url)
+        warm.cache = None
+        warm_seconds = prompt_eval_seconds(warm, texts, "gossip_queen")
+        warm_seconds += prompt_eval_seconds(warm, texts, "news_pro")
+        cold_seconds += prompt_eval_seconds(cold, texts, "news_pro")
+
+        session_calls = [r for r in fake.requests if "context" in r]
+        assert len(session_calls) == 2 * articles, "article calls did not reuse the persona context"
+        assert all("system" not in r and r.get("keep_alive") for r in session_calls)
+
+        report = {r["persona"]: r for r in warm.session_report()}
+        assert set(report) == {"gossip_queen", "news_pro"}, report
+        for persona, r in report.items():
+            assert r["calls"] == articles and r["reused_tokens"] == articles * r["prefix_tokens"], r
+            print(f"{persona}: {r['prefix_tokens']} prefix tokens primed in {r['prefix_eval_seconds']:.3f}s, "
+                  f"reused on {r['calls']} calls, ~{r['saved_prompt_eval_seconds']:.3f}s prompt eval saved")
+        primed = sum(r["prefix_eval_seconds"] for r in report.values())
+        print(f"prompt eval: {cold_seconds:.3f}s without sessions, "
+              f"{warm_seconds:.3f}s + {primed:.3f}s priming with sessions")
+        assert warm_seconds + primed < cold_seconds
+        print("OK")
+    finally:
+        fake.stop()
+
+
+def check_priming(latency=0.5):
+    fake = FakeOllama(latency=latency).start()
+    try:
+        writer = AIWriter(ollama_url=fake.url)
+        writer.cache = None
+        # Two personas primed at once: neither waits for the other's priming call
+        started = time.perf_counter()
+        threads = [threading.Thread(target=writer.rewrite_article, args=("Story.",), kwargs={"persona_key": key})
+                   for key in ("gossip_queen", "news_pro")]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        assert elapsed < 3 * latency, f"priming was serialized ({elapsed:.2f}s)"
+
+        # The prefix holds the persona system prompt only, not the priming reply
+        primes = [r for r in fake.requests if "system" in r]
+        assert len(primes) == 2 and all(not r["prompt"].strip() for r in primes), primes
+        for r in primes:
+            session = writer.sessions[(r["model"], "gossip_queen" if "Gossip" in r["system"] else "news_pro")]
+            assert session.context == fake.tokenize(r["system"]), "priming reply leaked into the session context"
+        print(f"priming: two personas in {elapsed:.2f}s, prefixes hold the system prompt only")
+    finally:
+        fake.stop()
+
+
+def check_no_context():
+    fake = FakeOllama(context=False).start()
+    try:
+        writer = AIWriter(ollama_url=fake.url)
+        writer.cache = None
+        for text in ("One story.", "Another story."):
+            writer.rewrite_article(text)
+        # One failed priming attempt, then plain system-prompt generations
+        generations = [r for r in fake.requests if r["prompt"].strip()]
+        assert len(fake.requests) - len(generations) == 1, fake.requests
+        assert all(r.get("system") and "context" not in r for r in generations), generations
+        assert writer.session_report() == []
+        print("no context: fell back to the system prompt")
+    finally:
+        fake.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--articles", type=int, default=6)
+    parser.add_argument("--token-cost", type=float, default=0.005)
+    args = parser.parse_args()
+    run(args.articles, args.token_cost)
+    check_priming()
+    check_no_context()
@@ -0,0 +1,96 @@
+"""Harness for the AIWriter rewrite cache against a local fake Ollama.
+
+Usage: python -m backend.test_rewrite_cache
+"""
+import os
+import tempfile
+
+from .fake_ollama import FakeOllama
+from .rewrite_cache import RewriteCache, rewrite_key
+from .writer import AIWriter
+
+
+def check_hits(workdir):
+    fake = FakeOllama(latency=0.2).start()
+    try:
+        writer = AIWriter(ollama_url=fake.url)
+        writer.use_persona_sessions = False  # count only article generations
+        writer.cache = RewriteCache(os.path.join(workdir, "rewrites.db"))
+        article = "Brad Pitt was seen eating a burger in New York yesterday."
+
+        first = writer.rewrite_article(article)
+        second = writer.rewrite_article(article)
+        assert first == second
+        assert len(fake.requests) == 1, f"cache hit still called Ollama ({len(fake.requests)} requests)"
+
+        # Streaming reads the same entry and still surfaces the hook
+        hooks = []
+        streamed = writer.rewrite_article(article, stream=True, on_hook=hooks.append)
+        assert streamed == first and hooks, "streamed cache hit lost the script or hook"
+        assert len(fake.requests) == 1
+
+        # Another persona is another system prompt, hence another key
+        writer.rewrite_article(article, persona_key="news_pro")
+        assert len(fake.requests) == 2
+
+        # A new writer (e.g. a retried task) sees the persisted entry
+        retry = AIWriter(ollama_url=fake.url)
+        retry.use_persona_sessions = False
+        retry.cache = RewriteCache(os.path.join(workdir, "rewrites.db"))
+        assert retry.rewrite_article(article) == first
+        assert len(fake.requests) == 2
+
+        stats = writer.cache.stats()
+        assert (stats["hits"], stats["misses"]) == (2, 2), stats
+        print(f"hits/misses: {stats}")
+    finally:
+        fake.stop()
+
+
+def check_hits_with_sessions(workdir):
+    fake = FakeOllama().start()
+    try:
+        writer = AIWriter(ollama_url=fake.url)
+        writer.use_persona_sessions = True
+        writer.cache = RewriteCache(os.path.join(workdir, "sessions.db"))
+        article = "Taylor Swift announced a surprise tour date in London."
+        first = writer.rewrite_article(article)
+        assert "context" in fake.requests[-1], "generation did not use the persona session"
+        assert writer.rewrite_article(article) == first
+        assert writer.rewrite_article(article, stream=True) == first
+        # One priming call plus one generation; both repeats were cache hits
+        assert len(fake.requests) == 2, f"{len(fake.requests)} requests reached Ollama"
+        stats = writer.cache.stats()
+        assert (stats["hits"], stats["misses"]) == (2, 1), stats
+        print(f"with persona sessions: {stats}")
+    finally:
+        fake.stop()
+
+
+def check_no_mock_caching(workdir):
+    writer = AIWriter(ollama_url="http://127.0.0.1:9")
+    writer.cache = RewriteCache(os.path.join(workdir, "offline.db"))
+    writer.rewrite_article("Nobody is listening.")
+    assert writer.cache.stats()["entries"] == 0, "mock fallback was cached"
+
+
+def check_eviction(workdir):
+    cache = RewriteCache(os.path.join(workdir, "lru.db"), max_mb=3000 / (1024 * 1024))
+    keys = [rewrite_key("mistral", "system", f"prompt {i}", {}) for i in range(5)]
+    for key in keys[:3]:
+        cache.put(key, "x" * 1000)
+    cache.get(keys[0])          # keys[1] is now least recently used
+    cache.put(keys[3], "x" * 1000)
+    assert cache.get(keys[1]) is None, "LRU entry survived eviction"
+    assert cache.get(keys[0]) is not None and cache.get(keys[3]) is not None
+    assert cache.stats()["bytes"] <= 3000
+    print(f"eviction: {cache.stats()}")
+
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as workdir:
+        check_hits(workdir)
+        check_hits_with_sessions(workdir)
+        check_no_mock_caching(workdir)
+        check_eviction(workdir)
+    print("OK")
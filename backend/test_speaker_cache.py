@@ -0,0 +1,71 @@
+"""Harness for SpeakerLatentCache with a stand-in latent encoder (no XTTS needed).
+
+Usage: python -m backend.test_speaker_cache
+"""
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+from .audio_io import write_wav
+from . import speaker_cache
+from .speaker_cache import SpeakerLatentCache
+
+
+def write_reference(path, freq):
+    t = np.arange(24000) / 24000
+    write_wav(path, 0.3 * np.sin(2 * np.pi * freq * t), 24000)
+
+
+def run():
+    calls = []
+
+    def compute(path):
+        calls.append(path)
+        seed = len(calls)
+        return np.full((1, 32, 1024), seed, dtype=np.float32), np.full((1, 512, 1), seed, dtype=np.float32)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        diva = os.path.join(workdir, "diva.wav")
+        copy = os.path.join(workdir, "diva_copy.wav")
+        write_reference(diva, 220)
+        shutil.copy(diva, copy)
+
+        cache = SpeakerLatentCache(os.path.join(workdir, "speakers"))
+        first = cache.get(diva, compute)
+        assert cache.get(diva, compute)[0] is first[0], "in-memory latents not reused"
+        # Same content under another path is the same voice
+        assert np.array_equal(cache.get(copy, compute)[0], first[0])
+        assert len(calls) == 1, calls
+
+        # A new process reads the latents from disk
+        fresh = SpeakerLatentCache(os.path.join(workdir, "speakers"))
+        assert np.array_equal(fresh.get(diva, compute)[1], first[1])
+        assert len(calls) == 1, calls
+
+        # A re-recorded reference gets new latents
+        write_reference(diva, 330)
+        os.utime(diva, ns=(0, 0))
+        assert not np.array_equal(cache.get(diva, compute)[0], first[0])
+        assert len(calls) == 2, calls
+
+        # render() asks for the key on every job: the WAV is hashed once per change
+        hashed = []
+        real_hash = speaker_cache.file_hash
+        speaker_cache.file_hash = lambda path: hashed.append(path) or real_hash(path)
+        try:
+            keys = {cache.key_for(diva) for _ in range(50)}
+            assert len(keys) == 1 and hashed == [], hashed
+            write_reference(diva, 440)
+            os.utime(diva, ns=(1, 1))
+            assert cache.key_for(diva) not in keys and cache.key_for(diva) == real_hash(diva)
+            assert len(hashed) == 1 and len(cache.hashes) == 2, (hashed, cache.hashes)
+        finally:
+            speaker_cache.file_hash = real_hash
+        print(f"computed {cache.computed}, hits {cache.hits}; files: {sorted(os.listdir(cache.cache_dir))}")
+    print("OK")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,83 @@
+"""Harness for structured (JSON) scripts: repair cases and a fake-Ollama round trip.
+
+Usage: python -m backend.test_structured_script
+"""
+from .fake_ollama import FakeOllama
+from .writer import AIWriter, SCRIPT_SCHEMA, extract_hook, parse_script, script_text
+
+GOOD = '{"hook": "Wow", "body": "Story", "cta": "Sub?", "keywords": ["red carpet", "paparazzi"]}'
+
+REPAIRS = [
+    # (model reply, expected hook, expected body, expected cta)
+    ('```json\n' + GOOD + '\n```', "Wow", "Story", "Sub?"),
+    ('Sure! Here is your script: ' + GOOD + ' Enjoy!', "Wow", "Story", "Sub?"),
+    ('{"hook": "Wow", "body": "Story", "cta": "Sub?", "keywords": ["red carp', "Wow", "Story", "Sub?"),
+    ("1. Hook (3-5s): Wow\n2. Story Body: Story\n3. CTA Outro: Sub?", "Wow", "Story", "Sub?"),
+    ("Hook: Wow\nBody: Story\nCTA: Sub?", "Wow", "Story", "Sub?"),
+    ("Hook (3-5s) - Wow\nStory Body - Story\nCTA Outro - Sub?", "Wow", "Story", "Sub?"),
+    ("Wow. Story", "Wow.", "Story", ""),
+    ('{"body": "Brad Pitt ate a burger in New York", "cta": "Subscribe!"}',
+     "Brad Pitt ate a burger in New York", "", "Subscribe!"),
+]
+
+
+def check_parsing():
+    script = parse_script(GOOD)
+    assert not script["repaired"] and script["keywords"] == ["red carpet", "paparazzi"], script
+    for reply, hook, body, cta in REPAIRS:
+        script = parse_script(reply, fallback_keywords=["Brad", "Pitt"])
+        assert script["repaired"], reply
+        assert (script["hook"], script["body"], script["cta"]) == (hook, body, cta), (reply, script)
+        assert script["keywords"], reply
+    assert script_text(parse_script(GOOD)) == "Wow\n\nStory\n\nSub?"
+    # A lone sentence is narrated once
+    assert script_text(parse_script(REPAIRS[-1][0])) == "Brad Pitt ate a burger in New York\n\nSubscribe!"
+    print(f"parsing: {len(REPAIRS)} repair cases OK")
+
+HOOKS = [
+    "1. Hook (3-5s): Wow\n2. Story Body: Story",
+    "Hook (3-5s) - Wow\nStory Body - Story",
+    "**Hook:** Wow\n**Body:** Story",
+    "Hook - Wow\nCTA Outro - Sub?",
+]
+
+
+def check_hooks():
+    for text in HOOKS:
+        assert extract_hook(text) == "Wow", (text, extract_hook(text))
+    assert extract_hook("Hook (3-5s) - Wow") is None, "hook returned before the next section started"
+    assert extract_hook("Hook (3-5s) - Wow", complete=True) == "Wow"
+    # Section words inside the hook are not headers; only labels are
+    assert extract_hook("Hook: Body-shaming scandal rocks Hollywood\nBody: Story") == "Body-shaming scandal rocks Hollywood"
+    assert extract_hook("Hook: Outro music leaked\n2. Story Body: Story") == "Outro music leaked"
+    bullets = "Hook:\n- Wow, the receipts are in\n- body of evidence keeps growing\n**Body**\nStory"
+    assert extract_hook(bullets) == "- Wow, the receipts are in\n- body of evidence keeps growing", extract_hook(bullets)
+    assert extract_hook("1. Hook: Wow\n2. The Story: Story") == "Wow"
+    assert parse_script("Hook: Body-shaming scandal\nBody: - body of evidence grows\nCTA: Sub?")["body"] == \
+        "- body of evidence grows"
+    print(f"hooks: {len(HOOKS)} header forms OK")
+
+
+def check_round_trip():
+    fake = FakeOllama().start()
+    try:
+        writer = AIWriter(ollama_url=fake.url)
+        writer.cache = None
+        article = "Brad Pitt was seen eating a burger in New York yesterday."
+        script = writer.rewrite_structured(article, fallback_keywords=["Brad"])
+        assert fake.requests[-1]["format"] == SCRIPT_SCHEMA
+        assert article in script["body"] and script["keywords"] == ["red carpet", "paparazzi", "celebrity"], script
+        assert not script["repaired"]
+
+        restyled = writer.restyle(script, "news_pro")
+        assert isinstance(restyled, dict) and restyled["keywords"], restyled
+        print(f"round trip: {script}")
+    finally:
+        fake.stop()
+
+
+if __name__ == "__main__":
+    check_parsing()
+    check_hooks()
+    check_round_trip()
+    print("OK")
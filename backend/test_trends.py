@@ -0,0 +1,115 @@
+"""Harness for TrendEngine scoring with stand-in embedding models.
+
+Usage: python -m backend.test_trends
+"""
+import datetime
+import hashlib
+import os
+import tempfile
+
+import numpy as np
+
+from .ann import IVFIndex
+from .embeddings import EmbeddingStore
+from .models import TABLES, Article, db
+from .trends import TrendEngine, count_similar
+
+DIM = 32
+STORIES = [
+    "Brad Pitt spotted eating a burger in New York",
+    "Taylor Swift announces a surprise album",
+    "Royal wedding guest list revealed",
+]
+
+
+class HashModel:
+    """Bag-of-words vectors; `salt` stands in for a different model."""
+
+    def __init__(self, salt):
+        self.salt = salt
+        self.texts = 0
+
+    def encode(self, texts, **kwargs):
+        self.texts += len(texts)
+        vectors = np.zeros((len(texts), DIM), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in text.lower().split():
+                digest = hashlib.sha256(f"{self.salt}:{word}".encode('utf-8')).digest()
+                vectors[row, digest[0] % DIM] += 1.0
+        return vectors
+
+
+class LocalTrendEngine(TrendEngine):
+    """TrendEngine on `model_name` (a HashModel) with its store under `cache_dir`."""
+
+    def __init__(self, model_name, cache_dir, scoring="pairwise", ann=False):
+        self.overrides = (model_name, cache_dir, scoring, ann)
+        super().__init__()
+
+    def load_config(self):
+        config = super().load_config()
+        model_name, cache_dir, scoring, ann = self.overrides
+        config['trend_settings']['scoring'] = scoring
+        config['embedding_settings'].update(model=model_name, cache_dir=cache_dir, service_url="")
+        config['ann_settings'] = {"enabled": ann}
+        return config
+
+    def load_model(self, service_url=None):
+        return HashModel(self.model_name)
+
+
+def add_articles(count, start=0):
+    now = datetime.datetime.now()
+    for i in range(start, start + count):
+        Article.create(url=f"https://example.com/{i}", title=f"{STORIES[i % len(STORIES)]} ({i})",
+                       source="test", published_date=now - datetime.timedelta(minutes=i))
+
+
+def check_model_switch(workdir, ann):
+    cache_dir = os.path.join(workdir, "ann" if ann else "exact")
+    add_articles(6)
+    first = LocalTrendEngine("hash-a", cache_dir, ann=ann)
+    first.calculate_trends()
+    assert Article.select().where(Article.cluster_id.is_null()).count() == 0
+
+    # Same articles, still unprocessed, but a new model: its store starts empty
+    add_articles(3, start=6)
+    second = LocalTrendEngine("hash-b", cache_dir, ann=ann)
+    assert len(second.embedding_store) == 0
+    second.calculate_trends()
+    articles = list(Article.select())
+    assert second.model.texts == len(articles) and len(second.embedding_store) == len(articles)
+    assert all(a.trend_score >= 2 for a in articles), [a.trend_score for a in articles]
+
+    # Next cycle on the new model encodes nothing
+    second.calculate_trends()
+    assert second.model.texts == len(articles)
+    print(f"model switch ({'ann' if ann else 'exact'}): {len(articles)} articles re-encoded once")
+    Article.delete().execute()
+
+
+def check_small_index(workdir):
+    # min_train_size is configurable: tiny indexes must still train, and with
+    # every list probed they match the exact counts
+    vectors = HashModel("small").encode([f"{STORIES[i % 3]} ({i})" for i in range(15)])
+    for n in (1, 2, 3, 5, 15):
+        store = EmbeddingStore(f"small-{n}", os.path.join(workdir, "small"))
+        store.add(list(range(1, n + 1)), vectors[:n])
+        index = IVFIndex(store, nprobe=64, min_train_size=1)
+        index.add(list(range(1, n + 1)), np.zeros(n))
+        assert index.centroids is not None and len(index.centroids) <= n
+        counts = index.count_neighbors(list(range(1, n + 1)), threshold=0.65)
+        assert np.array_equal(counts, count_similar(vectors[:n], 0.65)), (n, counts)
+    print("small index: trains with fewer articles than 4 * sqrt(n) lists")
+
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as workdir:
+        db.init(os.path.join(workdir, "news.db"))
+        db.connect()
+        db.create_tables(TABLES)
+        check_model_switch(workdir, ann=False)
+        check_model_switch(workdir, ann=True)
+        check_small_index(workdir)
+        db.close()
+    print("OK")
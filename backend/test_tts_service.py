@@ -0,0 +1,102 @@
+"""Harness for the TTS service with a stand-in voice (no XTTS needed).
+
+Usage: python -m backend.test_tts_service [--jobs 6] [--cost 0.2]
+"""
+import argparse
+import json
+import os
+import tempfile
+import threading
+import time
+import wave
+
+import numpy as np
+
+from .audio_io import crossfade_concat, read_wav
+from .tts_service import TTSClient, serve
+from .voice import VoiceGenerator
+
+
+class ToneVoice:
+    sample_rate = 24000
+
+    def __init__(self, cost):
+        self.cost = cost
+
+    def synthesize(self, text, language="en", speaker_wav=None):
+        seconds = 0.05 * len(text.split())
+        time.sleep(seconds * self.cost)
+        t = np.arange(int(seconds * self.sample_rate)) / self.sample_rate
+        return (0.3 * np.sin(2 * np.pi * 220 * t)).astype(np.float32)
+
+
+def run(jobs, cost):
+    voice = ToneVoice(cost)
+    server = serve(voice, port=0, max_batch=4)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    client = TTSClient(f"http://127.0.0.1:{server.server_address[1]}")
+    assert client.ping()
+
+    segments = ["You won't believe this...", "Brad Pitt was seen eating a burger " * 8, "Subscribe for more tea!"]
+    # Segments are crossfaded exactly as the in-process path does
+    reference, spans = crossfade_concat([voice.synthesize(s) for s in segments], voice.sample_rate, 40)
+    expected = len(reference) * 2
+    with tempfile.TemporaryDirectory() as workdir:
+        paths = [os.path.join(workdir, f"job{i}.wav") for i in range(jobs)]
+        started = time.perf_counter()
+        threads = [threading.Thread(target=client.synthesize, args=(segments, p)) for p in paths]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        for path in paths:
+            with wave.open(path) as w:
+                assert w.getframerate() == voice.sample_rate and w.getsampwidth() == 2
+                assert w.getnframes() * 2 == expected, (w.getnframes() * 2, expected)
+        samples, _ = read_wav(paths[0])
+        assert np.max(np.abs(samples - reference)) < 2 / 32767, "service audio differs from crossfade_concat"
+
+        # The client branch of generate_audio writes the service's timings over a stale file
+        generator = VoiceGenerator(use_service=False)
+        generator.client = client
+        output = os.path.join(workdir, "narration.wav")
+        timings_path = os.path.join(workdir, "narration.timings.json")
+        with open(timings_path, 'w') as f:
+            json.dump([{"text": "stale", "start": 0.0, "end": 99.0}], f)
+        assert generator.generate_audio(segments, output)
+        with open(timings_path) as f:
+            timings = json.load(f)
+        assert [t["text"] for t in timings] == segments and [t["segment"] for t in timings] == [0, 1, 2], timings
+        assert all(abs(t["start"] - a) < 1e-6 and abs(t["end"] - b) < 1e-6 for t, (a, b) in zip(timings, spans))
+        print(f"timings: {[(round(t['start'], 2), round(t['end'], 2)) for t in timings]}")
+
+    # The first segment's audio must arrive before the job finishes
+    started = time.perf_counter()
+    first_audio = None
+    received = 0
+    with client.session.post(f"{client.url}/synthesize", json={"segments": segments}, stream=True) as resp:
+        for chunk in resp.iter_content(chunk_size=None):
+            received += len(chunk)
+            if first_audio is None and received > 44:
+                first_audio = time.perf_counter() - started
+    total = time.perf_counter() - started
+    assert first_audio < total * 0.5, f"audio was not streamed (first bytes at {first_audio:.2f}s of {total:.2f}s)"
+    print(f"streaming: first audio after {first_audio:.2f}s, job done after {total:.2f}s")
+
+    metrics = client.metrics()
+    assert metrics["jobs"] == jobs + 2 and metrics["segments"] == (jobs + 2) * len(segments), metrics
+    assert metrics["batches"] < jobs, "concurrent jobs were not batched"
+    print(f"{jobs} jobs in {elapsed:.2f}s")
+    print(f"metrics: {metrics}")
+    server.shutdown()
+    print("OK")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--jobs", type=int, default=6)
+    parser.add_argument("--cost", type=float, default=0.2)
+    args = parser.parse_args()
+    run(args.jobs, args.cost)
@@ -0,0 +1,67 @@
+"""Harness for AIWriter.rewrite_articles against a local fake Ollama.
+
+Usage: python -m backend.test_writer_batch [--articles 8] [--latency 0.3] [--in-flight 4]
+"""
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .fake_ollama import FakeOllama
+from .writer import AIWriter
+
+
+def run(articles, latency, in_flight):
+    fake = FakeOllama(latency=latency).start()
+    try:
+        writer = AIWriter(ollama_url=fake.url)
+        writer.cache = None  # measure generations, not rewrite-cache hits
+        texts = [f"Celebrity story number {i} happened today." for i in range(articles)]
+
+        started = time.perf_counter()
+        sequential = [writer.rewrite_article(t) for t in texts]
+        sequential_seconds = time.perf_counter() - started
+        assert fake.connections == 1, f"expected one pooled connection, saw {fake.connections}"
+
+        fake.max_in_flight = 0
+        before = fake.connections
+        started = time.perf_counter()
+        scripts = writer.rewrite_articles(texts, max_in_flight=in_flight)
+        batch_seconds = time.perf_counter() - started
+
+        assert scripts == sequential, "batch results differ from sequential ones"
+        for text, script in zip(texts, scripts):
+            assert text in script, f"result out of order for {text!r}"
+        assert fake.max_in_flight <= in_flight, f"{fake.max_in_flight} generations in flight, cap was {in_flight}"
+        opened = fake.connections - before
+        assert opened <= in_flight, f"{opened} connections opened for {in_flight} workers"
+
+        # A second batch must ride the same keep-alive pool
+        before = fake.connections
+        assert writer.rewrite_articles(texts, max_in_flight=in_flight) == scripts
+        assert fake.connections == before, f"second batch opened {fake.connections - before} new connections"
+
+        # Each thread reads the stats of its own call, even with others in flight
+        varied = [f"Story {'really ' * i}happened today." for i in range(articles)]
+        expected = []
+        for text in varied:
+            writer.rewrite_article(text)
+            expected.append(writer.last_stats["tokens"])
+        with ThreadPoolExecutor(max_workers=in_flight) as pool:
+            seen = list(pool.map(lambda text: (writer.rewrite_article(text), writer.last_stats["tokens"])[1], varied))
+        assert seen == expected, f"last_stats crossed threads: {seen} != {expected}"
+
+        print(f"sequential: {sequential_seconds:.2f}s  batch: {batch_seconds:.2f}s  "
+              f"speedup: {sequential_seconds / batch_seconds:.1f}x")
+        print(f"peak in flight: {fake.max_in_flight}/{in_flight}  connections: {opened}")
+        print("OK")
+    finally:
+        fake.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--articles", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=0.3)
+    parser.add_argument("--in-flight", type=int, default=4)
+    args = parser.parse_args()
+    run(args.articles, args.latency, args.in_flight)
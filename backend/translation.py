@@ -3,7 +3,10 @@ try:
 except ImportError:
     class EasyNMT:
         def __init__(self, *args): pass
-        def translate(self, text, **kwargs): return text + " [Translated]"
+        def translate(self, text, **kwargs):
+            if isinstance(text, list):
+                return [t + " [Translated]" for t in text]
+            return text + " [Translated]"
 
 import logging
 import os
@@ -43,6 +46,23 @@ class TranslatorService:
             logger.error(f"Translation failed: {e}")
             return text
 
+    def translate_batch(self, texts, target_lang="en", source_lang="en", batch_size=16):
+        """Translate several texts in one model call; order is preserved."""
+        texts = list(texts)
+        if target_lang == source_lang or not texts:
+            return texts
+
+        if not self.model:
+            self.load_model()
+
+        try:
+            translations = self.model.translate(texts, target_lang=target_lang, source_lang=source_lang,
+                                                batch_size=batch_size)
+            return list(translations)
+        except Exception as e:
+            logger.error(f"Batch translation failed: {e}")
+            return texts
+
 if __name__ == "__main__":
     ts = TranslatorService()
     print(ts.translate("Hello world", target_lang="es"))
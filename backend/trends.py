@@ -1,37 +1,112 @@
-try:
-    from sentence_transformers import SentenceTransformer, util
-except ImportError:
-    class SentenceTransformer:
-        def __init__(self, *args, **kwargs): pass
-        def encode(self, *args, **kwargs): return []
-    class util:
-        @staticmethod
-        def cos_sim(*args, **kwargs): return [[0]]
-    import logging
-    logging.getLogger(__name__).warning("SentenceTransformer not found. Using Mock.")
-
 import yaml
 import os
-from .models import Article
+import datetime
+import numpy as np
+from peewee import fn
+from .models import Article, StoryCluster, Trend, db
+from .embeddings import EmbeddingStore, normalize
+from .ann import IVFIndex
+from .velocity import StoryTracker
+from .keywords import KeywordMatcher
+from .embedding_service import EmbeddingClient
+from .embedding_backends import load_embedding_model, store_key
 import logging
 
 # Setup basic logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Rows of the similarity matrix computed at once: block x n float32 stays
+# around 100 MB even at 50k articles.
+SIMILARITY_BLOCK = 512
+SCORE_UPDATE_BATCH = 200
+
+def count_similar(embeddings, threshold=0.65, block_size=SIMILARITY_BLOCK):
+    """Number of *other* rows with cosine similarity above `threshold`, per row.
+
+    Computes the thresholded similarity matrix block by block, so memory is
+    O(block_size * n) instead of O(n^2).
+    """
+    unit = normalize(embeddings)
+    n = len(unit)
+    counts = np.zeros(n, dtype=np.int64)
+    for start in range(0, n, block_size):
+        block = unit[start:start + block_size] @ unit.T
+        # Exclude self-similarity
+        rows = np.arange(len(block))
+        block[rows, start + rows] = -1.0
+        counts[start:start + block_size] = np.count_nonzero(block > threshold, axis=1)
+    return counts
+
 class TrendEngine:
     def __init__(self):
         self.config = self.load_config()
         self.min_mentions = self.config['trend_settings'].get('min_mentions', 3)
         self.keywords = self.config['trend_settings'].get('keywords', [])
-        # Load model only when needed to save RAM, or keep it if frequent updates.
-        # For a daily batch job, loading once is fine.
+        self.similarity_threshold = self.config['trend_settings'].get('similarity_threshold', 0.65)
+        self.keyword_boost = self.config['trend_settings'].get('keyword_boost', 1.5)
+        # Compiled once; scans each document in a single pass
+        self.keyword_matcher = KeywordMatcher(self.keywords, default_weight=self.keyword_boost)
+        embedding_settings = self.config.get('embedding_settings', {})
+        self.embedding_settings = embedding_settings
+        self.model_name = embedding_settings.get('model', 'all-MiniLM-L6-v2')
+        self.backend = embedding_settings.get('backend', 'torch')
+        # Embeddings are cached per (article id, model, backend) so articles that
+        # stay unprocessed across cycles are never re-encoded.
+        self.embedding_store = EmbeddingStore(
+            store_key(self.model_name, self.backend), embedding_settings.get('cache_dir', 'data/embeddings')
+        )
+        # Optional ANN mode: an on-disk IVF index over all ingested articles,
+        # so similarity counts never need the full n x n matrix.
+        ann_settings = self.config.get('ann_settings', {})
+        self.ann_index = None
+        if ann_settings.get('enabled', False):
+            self.ann_index = IVFIndex(
+                self.embedding_store,
+                nprobe=ann_settings.get('nprobe', 8),
+                min_train_size=ann_settings.get('min_train_size', 5000),
+            )
+        self.time_window_hours = self.config['trend_settings'].get('time_window_hours', 24)
+        # "windowed": streaming story clusters with hourly mention buckets;
+        # "pairwise": similarity counts among unprocessed articles (exact or ANN)
+        self.scoring = self.config['trend_settings'].get('scoring', 'windowed')
+        # Story clustering runs in both modes; get_top_stories() uses it to
+        # return one article per story.
+        self.tracker = StoryTracker(
+            threshold=self.similarity_threshold,
+            window_hours=self.time_window_hours,
+            min_mentions=self.min_mentions,
+        )
+        self.model = self.load_model(embedding_settings.get('service_url'))
+
+    def load_model(self, service_url=None):
+        # Prefer the shared embedding service (model already warm, see
+        # backend/embedding_service.py); otherwise load in-process.
+        if service_url:
+            client = EmbeddingClient(service_url)
+            if client.ping(model=self.model_name, backend=self.backend):
+                logger.info(f"Using embedding service at {service_url}")
+                return client
+            logger.warning(f"Embedding service {service_url} unavailable or serving another model. Loading model locally.")
         # all-MiniLM-L6-v2 is ~80MB, very fast and cheap.
-        logger.info("Loading SentenceTransformer model...")
         try:
-            self.model = SentenceTransformer('all-MiniLM-L6-v2') 
-        except:
-            self.model = None
+            return load_embedding_model(
+                self.model_name,
+                backend=self.backend,
+                batch_size=self.embedding_settings.get('batch_size', 32),
+                onnx_file=self.embedding_settings.get('onnx_file'),
+            )
+        except Exception as e:
+            logger.error(f"Failed to load embedding model: {e}")
+            return None
+
+    def load_config(self):
+        config_path = os.path.join(os.getcwd(), 'config', 'trends.yaml')
+        with open(config_path, 'r') as f:
+            return yaml.safe_load(f)
+
+    def encode(self, texts):
+        return self.model.encode(texts, convert_to_numpy=True)
 
     def calculate_trends(self):
         # 1. Fetch unprocessed articles
@@ -40,73 +115,133 @@ class TrendEngine:
             logger.info("No new articles to process.")
             return
 
-        titles = [a.title for a in articles]
-        
         # Mock Logic if model missing
-        if not self.model or isinstance(self.model, SentenceTransformer) and not hasattr(self.model, 'encode'):
+        if not self.model:
              for art in articles:
                  art.trend_score = 5.0 # default high score for demo
                  art.save()
              return
 
-        # 2. Encode all titles
-        embeddings = self.model.encode(titles, convert_to_tensor=True)
-        # ... rest of real logic (won't be reached if mocked above or will fail gracefully)
- 
+        # 2. Assign new articles to story clusters (embeds only those)
+        self.assign_clusters(articles)
 
-    def load_config(self):
-        config_path = os.path.join(os.getcwd(), 'config', 'trends.yaml')
-        with open(config_path, 'r') as f:
-            return yaml.safe_load(f)
+        # 3. Story velocity (windowed) or pairwise similarity counts
+        if self.scoring == 'windowed':
+            velocity = self.tracker.velocity([a.cluster_id for a in articles])
+            sim_counts = np.array([velocity[a.cluster_id] for a in articles], dtype=np.float64)
+        elif self.ann_index is not None:
+            sim_counts = self.count_similar_ann(articles)
+        else:
+            # For each article, count how many others are similar (cosine > threshold).
+            embeddings = self.embed(articles)
+            sim_counts = count_similar(embeddings, self.similarity_threshold)
 
-    def calculate_trends(self):
-        # 1. Fetch unprocessed articles
-        articles = list(Article.select().where(Article.processed == False))
-        if not articles:
-            logger.info("No new articles to process.")
+        # 4. Keyword Boost
+        texts = [a.title + " " + (a.content or "") for a in articles]
+        keyword_scores = self.keyword_matcher.scores(texts)
+
+        # Final Score formula
+        # Base score = similarity count (news velocity/verification) + keyword relevance
+        total_scores = sim_counts + keyword_scores
+        for art, total_score, sim_count, keyword_score in zip(articles, total_scores, sim_counts, keyword_scores):
+            art.trend_score = float(total_score)
+            logger.debug(f"Scored '{art.title}': {total_score} (Sim: {sim_count}, KW: {keyword_score})")
+
+        with db.atomic():
+            Article.bulk_update(articles, fields=[Article.trend_score], batch_size=SCORE_UPDATE_BATCH)
+            self.record_trends(articles)
+        logger.info(f"Scored {len(articles)} articles (top score {total_scores.max():.1f}).")
+
+    def embed(self, articles):
+        """Title embeddings of `articles`, encoding any the store doesn't hold.
+
+        Articles clustered in an earlier cycle are normally stored already,
+        but not after a change of model or backend (a new store).
+        """
+        return self.embedding_store.get_or_encode([a.id for a in articles], [a.title for a in articles], self.encode)
+
+    def assign_clusters(self, articles):
+        """Give each article without a cluster a stable story cluster id.
+
+        Only those articles are embedded and assigned; clusters and their
+        hourly buckets persist across cycles.
+        """
+        new_articles = [a for a in articles if a.cluster_id is None]
+        if new_articles:
+            self.tracker.assign(new_articles, self.embed(new_articles))
+
+    def record_trends(self, articles):
+        """Snapshot this cycle's score per story cluster into the Trend table."""
+        best = {}
+        for art in articles:
+            if art.cluster_id is not None and (art.cluster_id not in best or art.trend_score > best[art.cluster_id].trend_score):
+                best[art.cluster_id] = art
+        if not best:
             return
+        members = dict(
+            StoryCluster.select(StoryCluster.id, StoryCluster.member_count)
+            .where(StoryCluster.id.in_(list(best)))
+            .tuples()
+        )
+        now = datetime.datetime.now()
+        rows = [
+            {
+                "keyword": art.title[:255],
+                "score": art.trend_score,
+                "cluster_id": cluster_id,
+                "article_id": art.id,
+                "member_count": members.get(cluster_id, 0),
+                "timestamp": now,
+            }
+            for cluster_id, art in best.items()
+        ]
+        for start in range(0, len(rows), SCORE_UPDATE_BATCH // 2):
+            Trend.insert_many(rows[start:start + SCORE_UPDATE_BATCH // 2]).execute()
+
+    def count_similar_ann(self, articles):
+        """Neighbor counts from the IVF index, within time_window_hours.
 
-        titles = [a.title for a in articles]
-        
-        # 2. Encode all titles
-        embeddings = self.model.encode(titles, convert_to_tensor=True)
-        
-        # 3. Clustering / Similarity Check
-        # A simple approach: for each article, count how many others are similar (> 0.7 cosine sim)
-        cosine_scores = util.cos_sim(embeddings, embeddings)
-        
-        processed_ids = set()
-        
-        for i in range(len(articles)):
-            if articles[i].id in processed_ids:
-                continue
-                
-            sim_count = 0
-            # Check row i for matches
-            for j in range(len(articles)):
-                if i == j: continue
-                if cosine_scores[i][j] > 0.65: # Threshold
-                    sim_count += 1
-            
-            # 4. Keyword Boost
-            keyword_score = 0
-            content_lower = (articles[i].title + " " + (articles[i].content or "")).lower()
-            for kw in self.keywords:
-                if kw.lower() in content_lower:
-                    keyword_score += 1.5 # Arbitrary boost
-            
-            # Final Score formula
-            # Base score = similarity count (news velocity/verification) + keyword relevance
-            total_score = sim_count + keyword_score
-            
-            articles[i].trend_score = total_score
-            articles[i].save()
-            
-            logger.info(f"Scored '{articles[i].title}': {total_score} (Sim: {sim_count}, KW: {keyword_score})")
+        Unlike the exact path (which compares unprocessed articles with each
+        other), this counts every indexed article, so stories already covered
+        still add to the velocity of fresh mentions.
+        """
+        # The index reads vectors from the store, so every article must be in it
+        self.embed(articles)
+        self.ann_index.add(
+            [a.id for a in articles], [a.published_date.timestamp() for a in articles]
+        )
+        return self.ann_index.count_neighbors(
+            [a.id for a in articles],
+            threshold=self.similarity_threshold,
+            window_seconds=self.time_window_hours * 3600,
+        )
 
     def get_top_stories(self, limit=5):
-        # Return top scoring articles
-        return Article.select().where(Article.processed == False).order_by(Article.trend_score.desc()).limit(limit)
+        """Top scoring unprocessed articles, one representative per story cluster.
+
+        Stories that already have a processed article are skipped, so the same
+        story is not rendered twice. Articles without a cluster (e.g. mock
+        scoring) are treated as their own story.
+        """
+        story = fn.COALESCE(Article.cluster_id, 0 - Article.id)
+        ranked = (Article
+                  .select(Article.id, fn.ROW_NUMBER().over(
+                      partition_by=[story],
+                      order_by=[Article.trend_score.desc(), Article.published_date.desc()]).alias('rank'))
+                  .where(Article.processed == False))
+        covered = (Article
+                   .select(Article.cluster_id)
+                   .where((Article.processed == True) & Article.cluster_id.is_null(False)))
+        representatives = (Article
+                           .select(ranked.c.id)
+                           .from_(ranked)
+                           .where(ranked.c.rank == 1))
+        return (Article
+                .select()
+                .where(Article.id.in_(representatives) &
+                       (Article.cluster_id.is_null() | Article.cluster_id.not_in(covered)))
+                .order_by(Article.trend_score.desc())
+                .limit(limit))
 
 if __name__ == "__main__":
     engine = TrendEngine()
@@ -0,0 +1,284 @@
+import argparse
+import collections
+import itertools
+import json
+import logging
+import os
+import queue
+import resource
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import requests
+
+from .audio_io import finalize_streamed_wav, to_pcm16, wav_header
+
+# Setup basic logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Finished jobs whose timings are kept for the client to fetch
+TIMINGS_KEPT = 256
+
+def memory_mb():
+    """Current and peak resident memory of this process, in MB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    try:
+        with open('/proc/self/statm') as f:
+            current = int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except (OSError, ValueError):
+        current = peak
+    return current, peak
+
+
+class SynthesisQueue:
+    """Single synthesis thread in front of one loaded voice model.
+
+    `voice` needs synthesize(text, language, speaker_wav) -> float32 samples
+    (or render(segments, ...) -> (samples, timings), preferred when present)
+    and a `sample_rate`; VoiceGenerator provides all of them.
+    """
+
+    def __init__(self, voice, max_batch=8, crossfade_ms=40):
+        self.voice = voice
+        self.max_batch = max_batch
+        self.crossfade_ms = crossfade_ms
+        self.jobs = queue.Queue()
+        self.lock = threading.Lock()
+        self.job_ids = itertools.count(1)
+        self.timings = collections.OrderedDict()
+        self.started = time.time()
+        self.stats = {"jobs": 0, "segments": 0, "batches": 0, "failed": 0,
+                      "audio_seconds": 0.0, "synth_seconds": 0.0}
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def submit(self, segments, language="en", speaker_wav=None):
+        """Queue a job; returns (job id, queue that yields PCM bytes as segments finish, then None)."""
+        job_id = next(self.job_ids)
+        out = queue.Queue()
+        self.jobs.put({"id": job_id, "segments": list(segments), "language": language,
+                       "speaker_wav": speaker_wav, "out": out})
+        return job_id, out
+
+    def pop_timings(self, job_id):
+        """Sentence timings of a finished job (once), or None."""
+        with self.lock:
+            return self.timings.pop(job_id, None)
+
+    def _run(self):
+        while True:
+            batch = [self.jobs.get()]
+            while len(batch) < self.max_batch:
+                try:
+                    batch.append(self.jobs.get_nowait())
+                except queue.Empty:
+                    break
+            # Same voice back to back: the model keeps its speaker conditioning warm
+            batch.sort(key=lambda job: (job["speaker_wav"] or '', job["language"]))
+            for job in batch:
+                self._synthesize(job)
+            with self.lock:
+                self.stats["batches"] += 1
+
+    def _synthesize(self, job):
+        sample_rate = self.voice.sample_rate
+        fade = int(sample_rate * self.crossfade_ms / 1000)
+        # The track's last `fade` samples are held back until the next segment
+        # is crossfaded into them (same result as chunked_tts.stitch)
+        held = np.zeros(0, dtype=np.float32)
+        length = 0
+        timings = []
+        try:
+            for segment, text in enumerate(job["segments"]):
+                if not text.strip():
+                    continue
+                start = time.perf_counter()
+                if hasattr(self.voice, 'render'):
+                    # Sentence-level audio cache and crossfades (VoiceGenerator)
+                    samples, pieces = self.voice.render([text], language=job["language"], speaker_wav=job["speaker_wav"])
+                else:
+                    samples = self.voice.synthesize(text, language=job["language"], speaker_wav=job["speaker_wav"])
+                    pieces = None
+                elapsed = time.perf_counter() - start
+                samples = np.asarray(samples, dtype=np.float32)
+                if pieces is None:
+                    pieces = [{"text": text, "start": 0.0, "end": len(samples) / sample_rate, "synth_seconds": elapsed}]
+
+                overlap = min(fade, len(held), len(samples))
+                offset = (length - overlap) / sample_rate
+                if overlap:
+                    ramp = np.linspace(0.0, 1.0, overlap, endpoint=False, dtype=np.float32)
+                    mixed = held[len(held) - overlap:] * (1.0 - ramp) + samples[:overlap] * ramp
+                    pending = np.concatenate([held[:len(held) - overlap], mixed, samples[overlap:]])
+                else:
+                    pending = np.concatenate([held, samples])
+                length += len(samples) - overlap
+                cut = max(0, len(pending) - fade)
+                if cut:
+                    job["out"].put(to_pcm16(pending[:cut]))
+                held = pending[cut:]
+                for piece in pieces:
+                    timings.append(dict(piece, index=len(timings), segment=segment,
+                                        start=piece["start"] + offset, end=piece["end"] + offset))
+                with self.lock:
+                    self.stats["segments"] += 1
+                    self.stats["synth_seconds"] += elapsed
+                    self.stats["audio_seconds"] += len(samples) / sample_rate
+            if len(held):
+                job["out"].put(to_pcm16(held))
+            with self.lock:
+                self.stats["jobs"] += 1
+                self.timings[job["id"]] = timings
+                while len(self.timings) > TIMINGS_KEPT:
+                    self.timings.popitem(last=False)
+        except Exception as e:
+            logger.error(f"Synthesis failed: {e}")
+            with self.lock:
+                self.stats["failed"] += 1
+            job["out"].put(e)
+        job["out"].put(None)
+
+    def metrics(self):
+        with self.lock:
+            stats = dict(self.stats)
+        current, peak = memory_mb()
+        stats["queue_depth"] = self.jobs.qsize()
+        stats["uptime_seconds"] = time.time() - self.started
+        # Below 1.0 means faster than real time
+        stats["real_time_factor"] = stats["synth_seconds"] / stats["audio_seconds"] if stats["audio_seconds"] else None
+        stats["memory_mb"] = current
+        stats["peak_memory_mb"] = peak
+        return stats
+
+
+def make_handler(synth):
+    class TTSHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _send_json(self, status, payload):
+            body = json.dumps(payload).encode('utf-8')
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _write_chunk(self, data):
+            self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+            self.wfile.flush()
+
+        def do_GET(self):
+            if self.path == '/metrics':
+                self._send_json(200, synth.metrics())
+            elif self.path == '/health':
+                self._send_json(200, {"status": "ok", "sample_rate": synth.voice.sample_rate})
+            elif self.path.startswith('/timings/') and self.path[len('/timings/'):].isdigit():
+                timings = synth.pop_timings(int(self.path[len('/timings/'):]))
+                if timings is None:
+                    self._send_json(404, {"error": "unknown or unfinished job"})
+                else:
+                    self._send_json(200, timings)
+            else:
+                self._send_json(404, {"error": "not found"})
+
+        def do_POST(self):
+            if self.path != '/synthesize':
+                self._send_json(404, {"error": "not found"})
+                return
+            try:
+                length = int(self.headers.get("Content-Length", 0))
+                job = json.loads(self.rfile.read(length))
+                segments = job["segments"] if "segments" in job else [job["text"]]
+            except Exception as e:
+                self._send_json(400, {"error": str(e)})
+                return
+            job_id, out = synth.submit(segments, job.get("language", "en"), job.get("speaker_wav"))
+            self.send_response(200)
+            self.send_header("Content-Type", "audio/wav")
+            self.send_header("X-Job-Id", str(job_id))
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            self._write_chunk(wav_header(synth.voice.sample_rate))
+            while True:
+                item = out.get()
+                if item is None:
+                    break
+                if isinstance(item, Exception):
+                    # Headers are gone; a truncated stream tells the client it failed
+                    self.close_connection = True
+                    return
+                self._write_chunk(item)
+            self._write_chunk(b"")
+
+        def log_message(self, *args):
+            pass
+
+    return TTSHandler
+
+
+class TTSClient:
+    """Sends synthesis jobs to the TTS service and writes the streamed WAV."""
+
+    def __init__(self, url, timeout=600):
+        self.url = url.rstrip('/')
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    def ping(self):
+        try:
+            return self.session.get(f"{self.url}/health", timeout=2).ok
+        except requests.RequestException:
+            return False
+
+    def synthesize(self, segments, output_path, language="en", speaker_wav=None):
+        """Stream the job's audio into `output_path`; returns its sentence timings (None if unavailable)."""
+        if isinstance(segments, str):
+            segments = [segments]
+        payload = {"segments": list(segments), "language": language, "speaker_wav": speaker_wav}
+        with self.session.post(f"{self.url}/synthesize", json=payload, stream=True, timeout=self.timeout) as resp:
+            resp.raise_for_status()
+            job_id = resp.headers.get("X-Job-Id")
+            with open(output_path, 'wb') as f:
+                for chunk in resp.iter_content(chunk_size=None):
+                    f.write(chunk)
+        if os.path.getsize(output_path) < 44:
+            raise RuntimeError("TTS service returned no audio")
+        # Replace the streaming placeholders with the real sizes
+        finalize_streamed_wav(output_path)
+        if job_id is None:
+            return None
+        resp = self.session.get(f"{self.url}/timings/{job_id}", timeout=5)
+        return resp.json() if resp.ok else None
+
+    def metrics(self):
+        return self.session.get(f"{self.url}/metrics", timeout=5).json()
+
+
+def serve(voice, host="127.0.0.1", port=8766, max_batch=8, crossfade_ms=40):
+    synth = SynthesisQueue(voice, max_batch=max_batch, crossfade_ms=crossfade_ms)
+    server = ThreadingHTTPServer((host, port), make_handler(synth))
+    server.daemon_threads = True
+    logger.info(f"TTS service on http://{host}:{server.server_address[1]}")
+    return server
+
+
+# Run: python -m backend.tts_service --port 8766, then set tts.service_url
+# in config/media.yaml
+if __name__ == "__main__":
+    from .voice import TTS_AVAILABLE, VoiceGenerator
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--max-batch", type=int, default=8)
+    parser.add_argument("--cuda", action="store_true")
+    args = parser.parse_args()
+
+    if not TTS_AVAILABLE:
+        raise SystemExit("Coqui TTS is not installed.")
+    voice = VoiceGenerator(use_cuda=args.cuda, use_service=False)
+    voice.load_model()
+    server = serve(voice, args.host, args.port, args.max_batch, voice.settings.get('crossfade_ms', 40))
+    server.serve_forever()
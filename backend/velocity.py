@@ -0,0 +1,139 @@
+import datetime
+import logging
+
+import numpy as np
+from peewee import EXCLUDED
+
+from .embeddings import normalize
+from .models import Article, ClusterBucket, StoryCluster, db
+
+# Setup basic logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+def hour_bucket(when):
+    return when.replace(minute=0, second=0, microsecond=0)
+
+
+class StoryTracker:
+    """Streaming story velocity from hourly mention buckets per story cluster.
+
+    Each new article joins the most similar active cluster (above
+    `threshold`) or starts one; scores read only the buckets inside
+    `window_hours`, never the full history.
+    """
+
+    def __init__(self, threshold=0.65, window_hours=24, min_mentions=3):
+        self.threshold = threshold
+        self.window_hours = window_hours
+        self.min_mentions = min_mentions
+
+    def _active_clusters(self, now):
+        cutoff = now - datetime.timedelta(hours=self.window_hours)
+        clusters = list(StoryCluster.select().where(StoryCluster.last_seen >= cutoff))
+        centroids = [np.frombuffer(c.centroid, dtype=np.float32) for c in clusters]
+        return clusters, centroids
+
+    def assign(self, articles, embeddings, now=None):
+        """Assign `articles` (with their embeddings) to clusters and count mentions.
+
+        Sets `article.cluster_id` on each article and returns the list of
+        cluster ids touched.
+        """
+        if not articles:
+            return []
+        now = now or datetime.datetime.now()
+        unit = normalize(embeddings)
+        clusters, centroids = self._active_clusters(now)
+
+        # Growable centroid matrix; new clusters are appended as they appear
+        dim = unit.shape[1]
+        matrix = np.zeros((max(16, 2 * (len(centroids) + len(articles))), dim), dtype=np.float32)
+        if centroids:
+            matrix[:len(centroids)] = np.vstack(centroids)
+        size = len(centroids)
+
+        order = sorted(range(len(articles)), key=lambda i: articles[i].published_date)
+        buckets = {}
+        touched = {}
+        created = 0
+        with db.atomic():
+            for i in order:
+                article = articles[i]
+                vector = unit[i]
+                best = -1
+                if size:
+                    sims = matrix[:size] @ vector
+                    best = int(np.argmax(sims))
+                    if sims[best] <= self.threshold:
+                        best = -1
+                if best < 0:
+                    cluster = StoryCluster.create(
+                        centroid=vector.tobytes(),
+                        first_seen=article.published_date,
+                        last_seen=article.published_date,
+                    )
+                    clusters.append(cluster)
+                    matrix[size] = vector
+                    best = size
+                    size += 1
+                    created += 1
+                cluster = clusters[best]
+                if cluster.member_count:
+                    mean = matrix[best] * cluster.member_count + vector
+                    matrix[best] = mean / max(np.linalg.norm(mean), 1e-12)
+                cluster.member_count += 1
+                cluster.last_seen = max(cluster.last_seen, article.published_date)
+                touched[cluster.id] = cluster
+                article.cluster_id = cluster.id
+                key = (cluster.id, hour_bucket(article.published_date))
+                buckets[key] = buckets.get(key, 0) + 1
+
+            positions = {c.id: i for i, c in enumerate(clusters)}
+            for cluster in touched.values():
+                cluster.centroid = matrix[positions[cluster.id]].tobytes()
+            StoryCluster.bulk_update(
+                list(touched.values()),
+                fields=[StoryCluster.centroid, StoryCluster.member_count, StoryCluster.last_seen],
+                batch_size=200,
+            )
+            Article.bulk_update(articles, fields=[Article.cluster_id], batch_size=200)
+            rows = [{"cluster_id": c, "hour": h, "mentions": m} for (c, h), m in buckets.items()]
+            for start in range(0, len(rows), 200):
+                (ClusterBucket
+                 .insert_many(rows[start:start + 200])
+                 .on_conflict(
+                     conflict_target=[ClusterBucket.cluster_id, ClusterBucket.hour],
+                     update={ClusterBucket.mentions: ClusterBucket.mentions + EXCLUDED.mentions})
+                 .execute())
+
+        logger.info(f"Assigned {len(articles)} articles to {len(touched)} story clusters ({created} new).")
+        return list(touched)
+
+    def velocity(self, cluster_ids, now=None):
+        """Recency-weighted mentions inside the window, per cluster id.
+
+        A mention in the current hour counts 1.0, decaying linearly to 0 at
+        the edge of the window. Clusters with fewer than `min_mentions`
+        mentions in the window score 0 (not a trend yet).
+        """
+        now = now or datetime.datetime.now()
+        cutoff = hour_bucket(now - datetime.timedelta(hours=self.window_hours))
+        cluster_ids = list(set(cluster_ids))
+        mentions = dict.fromkeys(cluster_ids, 0)
+        weighted = dict.fromkeys(cluster_ids, 0.0)
+        window_seconds = self.window_hours * 3600.0
+        for start in range(0, len(cluster_ids), 500):
+            query = (ClusterBucket
+                     .select(ClusterBucket.cluster_id, ClusterBucket.hour, ClusterBucket.mentions)
+                     .where(ClusterBucket.cluster_id.in_(cluster_ids[start:start + 500]) &
+                            (ClusterBucket.hour >= cutoff)))
+            for cluster_id, hour, count in query.tuples():
+                age = max(0.0, (now - hour).total_seconds())
+                mentions[cluster_id] += count
+                weighted[cluster_id] += count * max(0.0, 1.0 - age / window_seconds)
+        return {
+            c: weighted[c] if mentions[c] >= self.min_mentions else 0.0
+            for c in cluster_ids
+        }
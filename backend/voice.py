@@ -1,5 +1,15 @@
 import os
+import json
+import time
 import logging
+import functools
+import yaml
+import numpy as np
+from .audio_cache import AudioSegmentCache, audio_key
+from .audio_io import speech_seconds, write_silence, write_wav
+from .chunked_tts import ChunkedSynthesizer, split_sentences, stitch
+from .speaker_cache import SpeakerLatentCache
+from .tts_service import TTSClient
 try:
     import torch
     from TTS.api import TTS
@@ -12,62 +22,218 @@ logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(
 logger = logging.getLogger(__name__)
 
 class VoiceGenerator:
-    def __init__(self, use_cuda=False):
+    def __init__(self, use_cuda=False, use_service=True):
         self.use_cuda = use_cuda and TTS_AVAILABLE and torch.cuda.is_available()
         self.model_name = "tts_models/multilingual/multi-dataset/xtts_v2"
         self.tts = None
+        self.settings = self.load_config().get('tts', {})
+        # Voice id -> reference WAV; personas in config/prompts.yaml name a voice id
+        self.voices = self.settings.get('voices') or {}
+        missing = [f"{voice}: {path}" for voice, path in self.voices.items() if not os.path.exists(path)]
+        if missing:
+            logger.warning(f"Reference WAVs missing for {', '.join(missing)}; record them (see tts.voices "
+                           "in config/media.yaml) or those voices fall back to another reference.")
+        self.speaker_cache = SpeakerLatentCache(self.settings.get('speaker_cache_dir', 'data/speakers'))
+        self.chunker = None
+        self.last_timings = None
+        cache_settings = self.settings.get('audio_cache', {})
+        self.audio_cache = None
+        if cache_settings.get('enabled', True):
+            self.audio_cache = AudioSegmentCache(cache_settings.get('path', 'data/tts_cache.db'),
+                                                 max_mb=cache_settings.get('max_mb', 500))
+        self.client = None
+        service_url = self.settings.get('service_url')
+        if use_service and service_url:
+            client = TTSClient(service_url, timeout=self.settings.get('timeout', 600))
+            if client.ping():
+                logger.info(f"Using TTS service at {service_url}")
+                self.client = client
+            else:
+                logger.warning(f"TTS service {service_url} unreachable. Synthesizing in-process.")
+
+    def load_config(self):
+        config_path = os.path.join(os.getcwd(), 'config', 'media.yaml')
+        if not os.path.exists(config_path):
+            return {}
+        with open(config_path, 'r') as f:
+            return yaml.safe_load(f) or {}
+
+    @property
+    def sample_rate(self):
+        if self.tts is not None:
+            return self.tts.synthesizer.output_sample_rate
+        return 24000  # XTTS-v2 output rate
+
+    def resolve_speaker(self, speaker_wav=None, voice=None):
+        """Reference WAV for a voice id.
+
+        Falls back to `speaker_wav`, then to any configured voice whose file
+        exists; None if there is no reference on disk at all.
+        """
+        wanted = None
+        if voice:
+            wanted = self.voices.get(voice)
+            if wanted is None:
+                logger.warning(f"Unknown voice id '{voice}', check tts.voices in config/media.yaml")
+        for path in [wanted, speaker_wav] + list(self.voices.values()):
+            if path and os.path.exists(path):
+                if wanted and path != wanted:
+                    logger.warning(f"Reference WAV {wanted} for voice '{voice}' not found, using {path}")
+                return path
+        return None
+
+    def speaker_latents(self, speaker_wav):
+        """XTTS conditioning latents for a reference WAV, computed once per file content."""
+        self.load_model()
+        model = self.tts.synthesizer.tts_model
+
+        def compute(path):
+            gpt_cond_latent, speaker_embedding = model.get_conditioning_latents(audio_path=[path])
+            return gpt_cond_latent.cpu().numpy(), speaker_embedding.cpu().numpy()
+
+        gpt_cond_latent, speaker_embedding = self.speaker_cache.get(speaker_wav, compute)
+        return torch.from_numpy(gpt_cond_latent).to(model.device), torch.from_numpy(speaker_embedding).to(model.device)
+
+    def synthesize(self, text, language="en", speaker_wav=None):
+        """Float32 samples for `text` at self.sample_rate (needs Coqui TTS).
+
+        With a reference WAV, cached speaker latents are fed straight to XTTS
+        inference, so the reference audio is not re-processed per call.
+        """
+        self.load_model()
+        model = self.tts.synthesizer.tts_model
+        if not speaker_wav or not hasattr(model, 'get_conditioning_latents'):
+            wav = self.tts.tts(text=text, speaker_wav=speaker_wav, language=language)
+            return np.asarray(wav, dtype=np.float32)
+
+        gpt_cond_latent, speaker_embedding = self.speaker_latents(speaker_wav)
+        pieces = []
+        for sentence in self.tts.synthesizer.split_into_sentences(text):
+            out = model.inference(sentence, language, gpt_cond_latent, speaker_embedding)
+            wav = out["wav"]
+            pieces.append(wav.cpu().numpy() if hasattr(wav, 'cpu') else np.asarray(wav))
+        if not pieces:
+            return np.zeros(0, dtype=np.float32)
+        return np.concatenate(pieces).astype(np.float32)
     
+    def chunked_synthesizer(self):
+        """Pool of pre-warmed model processes for sentence-chunked synthesis (built once)."""
+        if self.chunker is None:
+            settings = self.settings.get('chunked', {})
+            self.chunker = ChunkedSynthesizer(
+                functools.partial(VoiceGenerator, use_cuda=self.use_cuda, use_service=False),
+                workers=settings.get('workers', 2),
+                sample_rate=self.sample_rate,
+                max_chars=self.settings.get('max_chars', 250),
+                crossfade_ms=self.settings.get('crossfade_ms', 40),
+                threads_per_worker=settings.get('threads_per_worker'),
+            )
+        return self.chunker.start()
+
+    def render(self, segments, language="en", speaker_wav=None):
+        """Narration for `segments`, assembled from cached and freshly synthesized sentences.
+
+        Sentences are looked up in the audio cache by text, speaker latents,
+        language and model; only misses are synthesized (on the chunked pool
+        when enabled), then everything is crossfaded in order. Returns
+        (samples, timings) with one timing per sentence.
+        """
+        if isinstance(segments, str):
+            segments = [segments]
+        chunks = [(s, text) for s, segment in enumerate(segments)
+                  for text in split_sentences(segment, self.settings.get('max_chars', 250), merge=False)]
+        if not chunks:
+            return np.zeros(0, dtype=np.float32), []
+
+        speaker = self.speaker_cache.key_for(speaker_wav) if speaker_wav else None
+        keys = [audio_key(text, speaker, language, self.model_name) for _, text in chunks]
+        pieces = self.audio_cache.get_many(keys, self.sample_rate) if self.audio_cache else [None] * len(chunks)
+        seconds = [0.0] * len(chunks)
+        cached = [p is not None for p in pieces]
+
+        # Repeated sentences in one script are synthesized once
+        missing = {}
+        for i, piece in enumerate(pieces):
+            if piece is None:
+                missing.setdefault(keys[i], chunks[i][1])
+        if missing:
+            texts = list(missing.values())
+            if self.settings.get('chunked', {}).get('enabled'):
+                fresh, fresh_seconds = self.chunked_synthesizer().synthesize_chunks(texts, language, speaker_wav)
+            else:
+                fresh, fresh_seconds = [], []
+                for text in texts:
+                    start = time.perf_counter()
+                    fresh.append(self.synthesize(text, language=language, speaker_wav=speaker_wav))
+                    fresh_seconds.append(time.perf_counter() - start)
+            by_key = dict(zip(missing, zip(fresh, fresh_seconds)))
+            for i, key in enumerate(keys):
+                if pieces[i] is None:
+                    pieces[i], seconds[i] = by_key[key]
+            if self.audio_cache is not None:
+                self.audio_cache.put_many([(key, samples) for key, (samples, _) in by_key.items()], self.sample_rate)
+
+        samples, timings = stitch(chunks, pieces, seconds, self.sample_rate, self.settings.get('crossfade_ms', 40))
+        for timing, hit in zip(timings, cached):
+            timing["cached"] = hit
+        logger.info(f"Rendered {len(chunks)} sentences: {sum(cached)} from audio cache, {len(missing)} synthesized.")
+        return samples, timings
+
     def load_model(self):
         if TTS_AVAILABLE and not self.tts:
             logger.info(f"Loading TTS Model: {self.model_name}")
             # Ensure we accept usage terms if using coqui
             os.environ["COQUI_TOS_AGREED"] = "1"
             self.tts = TTS(self.model_name).to("cuda" if self.use_cuda else "cpu")
+
+    def save_timings(self, output_path, timings):
+        """Write sentence timings next to the audio for caption alignment, or drop a stale file."""
+        self.last_timings = timings
+        path = f"{os.path.splitext(output_path)[0]}.timings.json"
+        if timings:
+            with open(path, 'w') as f:
+                json.dump(timings, f, indent=1)
+        elif os.path.exists(path):
+            os.remove(path)
             
-    def generate_audio(self, text, output_path, language="en", speaker_wav=None):
+    def generate_audio(self, text, output_path, language="en", speaker_wav=None, voice=None):
+        """Write narration for `text` (a string, or a list of script segments) to `output_path`.
+
+        `voice` is a voice id from tts.voices in config/media.yaml.
+        """
+        segments = [text] if isinstance(text, str) else [t for t in text if t]
+        text = " ".join(segments)
+        speaker_wav = self.resolve_speaker(speaker_wav, voice)
+        if self.client is not None:
+            try:
+                timings = self.client.synthesize(segments, output_path, language=language, speaker_wav=speaker_wav)
+                self.save_timings(output_path, timings)
+                logger.info(f"Audio saved to {output_path}")
+                return True
+            except Exception as e:
+                logger.error(f"TTS service failed ({e}), synthesizing in-process.")
+
         if not TTS_AVAILABLE:
             logger.warning("TTS library not found. Generating dummy audio for demo.")
-            # Generate 5 seconds of silence or simple wave
-            import wave
-            import struct
-            with wave.open(output_path, 'w') as f:
-                f.setnchannels(1)
-                f.setsampwidth(2)
-                f.setframerate(44100)
-                # 3 seconds of silence/noise
-                for i in range(44100 * 3):
-                    value = 0
-                    data = struct.pack('<h', value)
-                    f.writeframesraw(data)
+            # Silence as long as the script would take to read, so video timing stays realistic
+            write_silence(output_path, speech_seconds(segments), self.sample_rate)
+            self.save_timings(output_path, None)
             return True
 
+        if not speaker_wav or not os.path.exists(speaker_wav):
+            # XTTS clones a reference recording; without one there is nothing to write
+            logger.error(f"XTTS requires a speaker_wav reference audio and none was found for voice '{voice}' "
+                         "(record the tts.voices files in config/media.yaml).")
+            return False
+
         self.load_model()
         
         try:
             logger.info(f"Generating audio for: {text[:30]}...")
             
-            # If speaker_wav is provided, use it for cloning/persona
-            # Otherwise use default speaker if available or first one
-            
-            if speaker_wav and os.path.exists(speaker_wav):
-                self.tts.tts_to_file(
-                    text=text, 
-                    file_path=output_path, 
-                    speaker_wav=speaker_wav, 
-                    language=language
-                )
-            else:
-                # Fallback to a default speaker if XTTS requires one
-                # XTTS usually requires a reference audio.
-                # For now, let's assume we have a reference or use a different model if no ref.
-                # But implementation plan said XTTS-v2.
-                # We should provide a default reference audio in the repo or user config.
-                msg = "XTTS requires a speaker_wav reference audio."
-                logger.warning(msg)
-                # Try generating without speaker_wav if model supports it (some do, XTTS usually doesn't)
-                # Or use a different model like 'tts_models/en/ljspeech/glow-tts' for fallback
-                pass
-                
+            samples, timings = self.render(segments, language=language, speaker_wav=speaker_wav)
+            write_wav(output_path, samples, self.sample_rate)
+            self.save_timings(output_path, timings)
             logger.info(f"Audio saved to {output_path}")
             return True
         except Exception as e:
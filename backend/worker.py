@@ -1,12 +1,13 @@
-from celery import Celery
+from celery import Celery, chord, group
 from backend.models import Article, db
-from backend.writer import AIWriter
+from backend.writer import AIWriter, SCRIPT_SEGMENTS, script_text
 from backend.voice import VoiceGenerator
 from backend.media import MediaEngine
 from backend.uploader import UploaderService
 from backend.translation import TranslatorService
 import os
 import logging
+import yaml
 
 # Setup basic logging
 logging.basicConfig(level=logging.INFO)
@@ -34,45 +35,171 @@ else:
 celery = Celery('news_worker')
 celery.conf.update(CELERY_CONFIG)
 
+DEFAULT_PERSONA = "gossip_queen"
+
+_writer = None
+
+def get_writer():
+    # One AIWriter per worker process: prompts.yaml is read once and the
+    # Ollama keep-alive session is reused across tasks.
+    global _writer
+    if _writer is None:
+        _writer = AIWriter()
+    return _writer
+
+def load_languages():
+    config_path = os.path.join(os.getcwd(), 'config', 'languages.yaml')
+    with open(config_path, 'r') as f:
+        return yaml.safe_load(f).get('languages', {})
+
+_voice = None
+
+def get_voice():
+    # Reused per worker process: connects to the TTS service once, or keeps
+    # the in-process model loaded if there is no service
+    global _voice
+    if _voice is None:
+        _voice = VoiceGenerator()
+    return _voice
+
+_translator = None
+
+def get_translator():
+    global _translator
+    if _translator is None:
+        _translator = TranslatorService()
+    return _translator
+
+def variant_slug(variant):
+    return f"{variant['persona']}_{variant['language']}"
+
+def plan_variants(tenant_configs):
+    """Distinct (persona, language) pairs across tenants; tenants sharing one share the render."""
+    variants = {}
+    for config in tenant_configs:
+        persona = config.get('persona') or DEFAULT_PERSONA
+        language = config.get('language') or 'en'
+        variant = variants.setdefault((persona, language), {"persona": persona, "language": language, "tenants": []})
+        if config.get('name'):
+            variant["tenants"].append(config['name'])
+    return list(variants.values())
+
+def build_variant_scripts(article, variants):
+    """One LLM rewrite per article, then cheap per-persona and per-language derivations.
+
+    The canonical structured script is written in the persona most tenants
+    use; other personas are restyled from it with a short prompt, and
+    non-English variants are translated segment by segment in one batch per
+    target language. Stock-search keywords stay in English.
+    """
+    writer = get_writer()
+    personas = [v["persona"] for v in variants]
+    canonical_persona = max(dict.fromkeys(personas), key=personas.count)
+    canonical = writer.rewrite_structured(article.content or article.title, persona_key=canonical_persona,
+                                          fallback_keywords=article.title.split()[:3])
+
+    by_persona = {canonical_persona: canonical}
+    by_persona.update(writer.restyle_many(canonical, [p for p in personas if p != canonical_persona]))
+
+    translator = get_translator()
+    for language in dict.fromkeys(v["language"] for v in variants if v["language"] != 'en'):
+        targets = [v for v in variants if v["language"] == language]
+        segments = [by_persona[v["persona"]][k] for v in targets for k in SCRIPT_SEGMENTS]
+        translated = iter(translator.translate_batch(segments, target_lang=language))
+        for variant in targets:
+            script = dict(by_persona[variant["persona"]])
+            script.update((k, next(translated)) for k in SCRIPT_SEGMENTS)
+            variant["script"] = script
+    for variant in variants:
+        variant.setdefault("script", by_persona[variant["persona"]])
+    return canonical, variants
+
 @celery.task
-def process_article_task(article_id, tenant_config=None):
+def process_article_task(article_id, tenant_config=None, tenant_configs=None):
+    """Rewrite once, derive every tenant's persona/language variant, then render them in parallel."""
     logger.info(f"Processing Article {article_id}")
     try:
         db.connect(reuse_if_open=True)
         article = Article.get_by_id(article_id)
         
-        # 1. Rewrite
-        writer = AIWriter()
-        script = writer.rewrite_article(article.content or article.title)
-        article.rewrite_text = script
+        # 1. Rewrite (canonical script + derived variants)
+        variants = plan_variants(tenant_configs or [tenant_config or {}])
+        script, variants = build_variant_scripts(article, variants)
+        article.rewrite_text = script_text(script)
         article.save()
+        logger.info(f"Article {article_id}: {len(variants)} variants "
+                    f"({', '.join(variant_slug(v) for v in variants)})")
+        
+        # 2-4. Voice, video and thumbnail per variant, as parallel jobs
+        jobs = group(render_variant_task.s(article_id, variant) for variant in variants)
+        chord(jobs)(finalize_article_task.s(article_id))
+        return "Queued"
+    except Exception as e:
+        logger.error(f"Task failed: {e}")
+        return f"Error: {e}"
+    finally:
+        if not db.is_closed():
+            db.close()
+
+@celery.task
+def render_variant_task(article_id, variant):
+    slug = variant_slug(variant)
+    logger.info(f"Rendering Article {article_id} variant {slug}")
+    result = dict(variant, status="Failed")
+    try:
+        db.connect(reuse_if_open=True)
+        article = Article.get_by_id(article_id)
+        script = script_text(variant["script"])
+        tts_language = load_languages().get(variant["language"], {}).get('tts_code', variant["language"])
         
-        # 2. Voice (English default for MVP)
-        voice_gen = VoiceGenerator()
-        audio_path = f"data/audio_{article.id}.wav"
+        # 2. Voice
+        voice_gen = get_voice()
+        audio_path = f"data/audio_{article.id}_{slug}.wav"
         os.makedirs("data", exist_ok=True)
-        if voice_gen.generate_audio(script, audio_path):
-            pass
-        else:
+        segments = [variant["script"][k] for k in SCRIPT_SEGMENTS]
+        voice = get_writer().personas.get(variant["persona"], {}).get('voice')
+        if not voice_gen.generate_audio(segments, audio_path, language=tts_language, voice=voice):
             logger.error("Voice generation failed.")
-            return "Failed Voice"
+            result["status"] = "Failed Voice"
+            return result
             
         # 3. Video
         media = MediaEngine()
-        video_path = f"data/video_{article.id}.mp4"
-        # Extract keywords for stock check (simple extraction)
-        keywords = article.title.split()[:3] 
-        if media.generate_video(audio_path, script, keywords[0], video_path, mode="shorts"):
-            article.video_path = video_path
-            article.save()
-        else:
+        video_path = f"data/video_{article.id}_{slug}.mp4"
+        # Stock-search keywords come with the structured script
+        keywords = variant["script"].get("keywords") or article.title.split()[:3]
+        if not media.generate_video(audio_path, script, keywords[0], video_path, mode="shorts"):
             logger.error("Video generation failed.")
-            return "Failed Video"
+            result["status"] = "Failed Video"
+            return result
             
         # 4. Thumbnail
-        thumb_path = f"data/thumb_{article.id}.jpg"
+        thumb_path = f"data/thumb_{article.id}_{slug}.jpg"
         media.generate_thumbnail(article.title, thumb_path)
         
+        result.update(status="Success", audio_path=audio_path, video_path=video_path, thumb_path=thumb_path)
+        return result
+    except Exception as e:
+        logger.error(f"Render of {slug} failed: {e}")
+        result["status"] = f"Error: {e}"
+        return result
+    finally:
+        if not db.is_closed():
+            db.close()
+
+@celery.task
+def finalize_article_task(results, article_id):
+    try:
+        db.connect(reuse_if_open=True)
+        article = Article.get_by_id(article_id)
+        rendered = [r for r in results if r.get("status") == "Success"]
+        for r in results:
+            logger.info(f"Article {article_id} variant {variant_slug(r)}: {r['status']}")
+        if not rendered:
+            return "Failed"
+        
+        # The first variant (the primary tenant's) is the one queued for approval
+        article.video_path = rendered[0]["video_path"]
         # Mark processed (pending approval)
         article.processed = True
         article.approval_status = 'pending'
@@ -80,7 +207,7 @@ def process_article_task(article_id, tenant_config=None):
         
         return "Success"
     except Exception as e:
-        logger.error(f"Task failed: {e}")
+        logger.error(f"Finalize failed: {e}")
         return f"Error: {e}"
     finally:
         if not db.is_closed():
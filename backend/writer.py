@@ -1,30 +1,259 @@
 import requests
+from requests.adapters import HTTPAdapter
+from concurrent.futures import ThreadPoolExecutor
 import yaml
 import os
+import re
 import json
+import time
 import logging
+import threading
+
+from .rewrite_cache import RewriteCache, rewrite_key
 
 # Setup basic logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# "Hook" header as the personas are asked to write it ("1. Hook (3-5s):",
+# "**Hook:**", "Hook (3-5s) - ", "Hook -"), and any header that starts the next section.
+# A dash after the label (and optional "(3-5s)") ends the header; otherwise it runs to a colon.
+HEADER_END = r'(?:\s*(?:\([^)\n]*\))?\**\s*[\-\u2013\u2014]|[^\n:]*:)?\**[ \t]*'
+# Later sections need a real label: the word, optional "(20s)" and **/#, then a
+# colon, a spaced dash or the end of the line; "Body-shaming..." or a
+# "- body of evidence" bullet is hook text, not a header.
+LABEL_END = r'\s*(?:\([^)\n]*\))?[ \t*#]*(?::|\s[\-\u2013\u2014](?=\s|$)|$)\**[ \t]*'
+HOOK_HEADER_RE = re.compile(r'^[\s#*>\-]*(?:1[.)]\s*)?\**\s*hook\b' + HEADER_END, re.IGNORECASE | re.MULTILINE)
+NEXT_SECTION_RE = re.compile(
+    r'^[\s#*>\-]*(?:[23][.)][^\n:]{0,40}:|(?:[23][.)]\s*)?\**\s*(?:(?:story\s*)?body|cta(?:\s*outro)?|outro)'
+    + LABEL_END + ')',
+    re.IGNORECASE | re.MULTILINE,
+)
+
+def extract_hook(text, complete=False):
+    """Return the Hook section once it is complete (next section started), else None.
+
+    With `complete`, `text` is the whole script, so a hook with nothing after it counts.
+    """
+    header = HOOK_HEADER_RE.search(text)
+    if not header:
+        return None
+    rest = text[header.end():]
+    following = NEXT_SECTION_RE.search(rest)
+    if not following and not complete:
+        return None
+    hook = rest[:following.start() if following else len(rest)].strip().strip('*').strip()
+    return hook or None
+
+# JSON schema passed as Ollama's `format` for structured scripts
+SCRIPT_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "hook": {"type": "string"},
+        "body": {"type": "string"},
+        "cta": {"type": "string"},
+        "keywords": {"type": "array", "items": {"type": "string"}},
+    },
+    "required": ["hook", "body", "cta", "keywords"],
+}
+SCRIPT_SEGMENTS = ("hook", "body", "cta")
+SECTION_RE = re.compile(
+    r'^[\s#*>\-]*(?:\d[.)]\s*)?\**\s*(hook|(?:story\s*)?body|cta(?:\s*outro)?|outro|keywords)' + LABEL_END,
+    re.IGNORECASE | re.MULTILINE,
+)
+
+def _load_json_object(text):
+    """Best-effort json.loads of a model reply: fences, chatter and truncation tolerated."""
+    text = re.sub(r'^```(?:json)?\s*|\s*```$', '', text.strip())
+    start, end = text.find('{'), text.rfind('}')
+    candidates = [text]
+    if start >= 0:
+        if end > start:
+            candidates.append(text[start:end + 1])
+        # Cut off mid-generation: close the open string/array/object
+        tail = text[start:]
+        candidates += [tail + suffix for suffix in ('}', '"}', ']}', '"]}')]
+    for candidate in candidates:
+        try:
+            data = json.loads(candidate)
+        except ValueError:
+            continue
+        if isinstance(data, dict):
+            return data
+    return None
+
+def _parse_sections(text):
+    """Hook/body/CTA/keywords from a free-text script with section headers."""
+    sections = {}
+    matches = list(SECTION_RE.finditer(text))
+    for match, following in zip(matches, matches[1:] + [None]):
+        name = match.group(1).lower()
+        name = 'cta' if name.startswith(('cta', 'outro')) else 'body' if name.endswith('body') else name
+        content = text[match.end():following.start() if following else len(text)].strip().strip('*').strip()
+        sections.setdefault(name, content)
+    return sections
+
+def parse_script(text, fallback_keywords=None):
+    """Validated structured script from a model reply.
+
+    Returns {"hook", "body", "cta", "keywords", "repaired"}. Replies that are
+    not clean JSON are repaired: JSON is recovered from fences, surrounding
+    chatter or truncation, and failing that the sections are read from
+    free-text headers. Missing fields are filled from what is there.
+    """
+    try:
+        clean = isinstance(json.loads(text), dict)
+    except ValueError:
+        clean = False
+    data = _load_json_object(text)
+    repaired = not clean or not all(isinstance(data.get(k), str) and data.get(k).strip() for k in SCRIPT_SEGMENTS)
+    if data is None:
+        data = _parse_sections(text)
+    script = {k: str(data.get(k) or '').strip() for k in SCRIPT_SEGMENTS}
+    if not any(script.values()):
+        script["body"] = text.strip()
+    if not script["hook"]:
+        # A one-sentence body becomes the hook alone, so it isn't narrated twice
+        sentences = re.split(r'(?<=[.!?])\s+', script["body"], maxsplit=1)
+        script["hook"] = sentences[0]
+        script["body"] = sentences[1] if len(sentences) > 1 else ""
+
+    keywords = data.get("keywords") or []
+    if isinstance(keywords, str):
+        keywords = re.split(r'[,;\n]', keywords)
+    keywords = [str(k).strip().strip('#"\'') for k in keywords if str(k).strip()]
+    if not keywords:
+        repaired = True
+        keywords = list(fallback_keywords or [])
+    script["keywords"] = list(dict.fromkeys(keywords))[:5]
+    script["repaired"] = repaired
+    return script
+
+def script_text(script):
+    """Narration text of a structured script (segments in reading order)."""
+    return "\n\n".join(script[k] for k in SCRIPT_SEGMENTS if script.get(k))
+
+def generation_stats(final_chunk, started, first_token_at, chunks):
+    """Timing for one Ollama call: time-to-first-token and tokens/sec."""
+    now = time.perf_counter()
+    eval_count = final_chunk.get('eval_count') or chunks
+    eval_seconds = (final_chunk.get('eval_duration') or 0) / 1e9
+    if not eval_seconds and first_token_at is not None:
+        eval_seconds = now - first_token_at
+    return {
+        "ttft": (first_token_at - started) if first_token_at is not None else None,
+        "total_seconds": now - started,
+        "tokens": eval_count,
+        "tokens_per_second": eval_count / eval_seconds if eval_seconds else None,
+        "prompt_tokens": final_chunk.get('prompt_eval_count'),
+        "prompt_eval_seconds": (final_chunk.get('prompt_eval_duration') or 0) / 1e9,
+    }
+
+class PersonaSession:
+    """Evaluated persona prefix for one (model, persona), reused across articles.
+
+    `context` holds the tokens Ollama returned after evaluating the persona
+    system prompt once. Later generations send those tokens instead of the
+    system prompt, so with the model pinned by keep_alive the prefix stays in
+    the KV cache and only the article tokens are evaluated.
+    """
+
+    def __init__(self, model, persona_key, primed, system_prompt):
+        self.model = model
+        self.persona_key = persona_key
+        self.context = primed['context']
+        self.prefix_tokens = len(self.context)
+        # Cold cost of the prefix, measured from the priming call
+        self.prefix_seconds = (primed.get('prompt_eval_duration') or 0) / 1e9
+        self.prefix_eval_tokens = primed.get('prompt_eval_count') or self.prefix_tokens
+        # Tokenizer density of this model, to estimate a new prompt's length
+        self.tokens_per_char = self.prefix_tokens / max(len(system_prompt), 1)
+        self.lock = threading.Lock()
+        self.calls = 0
+        self.reused_tokens = 0
+        self.saved_seconds = 0.0
+
+    def record(self, stats, prompt):
+        """Credit the prefix tokens Ollama did not have to evaluate for one call."""
+        evaluated = stats.get('prompt_tokens')
+        if evaluated is None:
+            return
+        # A warm call evaluates about the new prompt alone, a cold one the prefix as well
+        expected = len(prompt) * self.tokens_per_char
+        reused = self.prefix_tokens if evaluated < expected + self.prefix_tokens / 2 else 0
+        per_token = self.prefix_seconds / self.prefix_eval_tokens if self.prefix_eval_tokens else 0.0
+        with self.lock:
+            self.calls += 1
+            self.reused_tokens += reused
+            self.saved_seconds += reused * per_token
+
+    def report(self):
+        with self.lock:
+            return {
+                "model": self.model,
+                "persona": self.persona_key,
+                "prefix_tokens": self.prefix_tokens,
+                "prefix_eval_seconds": self.prefix_seconds,
+                "calls": self.calls,
+                "reused_tokens": self.reused_tokens,
+                "saved_prompt_eval_seconds": self.saved_seconds,
+            }
+
 class AIWriter:
     def __init__(self, ollama_url="http://localhost:11434"):
         self.ollama_url = ollama_url
         self.config = self.load_config()
         self.prompts = self.config['prompts']
         self.personas = self.config['personas']
+        # Per thread, so concurrent rewrites don't overwrite each other's stats
+        self._local = threading.local()
+        ollama_settings = self.config.get('ollama', {})
+        # Generations in flight at once; more than Ollama's OLLAMA_NUM_PARALLEL
+        # just queue server-side.
+        self.max_in_flight = int(os.getenv('OLLAMA_NUM_PARALLEL', ollama_settings.get('max_in_flight', 1)))
+        self.timeout = ollama_settings.get('timeout', 600)
+        # How long Ollama keeps the model (and its KV cache) loaded after a call
+        self.keep_alive = ollama_settings.get('keep_alive', '30m')
+        self.use_persona_sessions = ollama_settings.get('persona_sessions', True)
+        self.sessions = {}
+        self.sessions_lock = threading.Lock()
+        self.priming_locks = {}
+        # One keep-alive connection pool shared by every call (and thread)
+        self.http = requests.Session()
+        self.pool_size = 0
+        self.ensure_pool(self.max_in_flight)
+        cache_settings = self.config.get('rewrite_cache', {})
+        self.cache = None
+        if cache_settings.get('enabled', True):
+            self.cache = RewriteCache(cache_settings.get('path', 'data/rewrite_cache.db'),
+                                      max_mb=cache_settings.get('max_mb', 50))
+
+    def ensure_pool(self, size):
+        """Keep at least `size` idle connections, so concurrent calls don't reconnect."""
+        size = max(size, 1)
+        if size <= self.pool_size:
+            return
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=size)
+        self.http.mount('http://', adapter)
+        self.http.mount('https://', adapter)
+        self.pool_size = size
+
+    @property
+    def last_stats(self):
+        """Timing of the calling thread's most recent generation (None before any)."""
+        return getattr(self._local, 'stats', None)
 
     def load_config(self):
         config_path = os.path.join(os.getcwd(), 'config', 'prompts.yaml')
         with open(config_path, 'r') as f:
             return yaml.safe_load(f)
 
-    def generate(self, model, prompt, system=None):
+    def build_payload(self, model, prompt, system=None, stream=False, format=None):
         payload = {
             "model": model, 
             "prompt": prompt, 
-            "stream": False,
+            "stream": stream,
+            "keep_alive": self.keep_alive,
             "options": {
                 "num_ctx": 4096,
                 "temperature": 0.7
@@ -32,23 +261,43 @@ class AIWriter:
         }
         if system:
             payload["system"] = system
-            
-        try:
-            resp = requests.post(f"{self.ollama_url}/api/generate", json=payload)
-            resp.raise_for_status()
-            return resp.json()['response']
-        except Exception as e:
-            logger.error(f"Ollama generation failed: {e}")
-            logger.warning("Returning MOCK content for demonstration.")
-            return (
-                f"[MOCK SCRIPT by {model}]\n"
-                "Hook: Did you hear the latest shocking news?\n"
-                f"Body: {prompt[:100]}...\n"
-                "This is a simulated AI response because Ollama is not running.\n"
-                "CTA: Subscribe for more tea!"
-            )
-
-    def rewrite_article(self, article_text, persona_key="gossip_queen", model="mistral"):
+        if format:
+            payload["format"] = format
+        return payload
+
+    def mock_script(self, model, prompt):
+        logger.warning("Returning MOCK content for demonstration.")
+        return (
+            f"[MOCK SCRIPT by {model}]\n"
+            "Hook: Did you hear the latest shocking news?\n"
+            f"Body: {prompt[:100]}...\n"
+            "This is a simulated AI response because Ollama is not running.\n"
+            "CTA: Subscribe for more tea!"
+        )
+
+    def cache_key(self, payload):
+        """Rewrite-cache key; taken before attach_session() swaps `system` for context."""
+        if self.cache is None:
+            return None
+        options = payload.get('options')
+        if payload.get('format'):
+            options = dict(options or {}, format=payload['format'])
+        return rewrite_key(payload['model'], payload.get('system'), payload['prompt'], options)
+
+    def cached(self, key, model):
+        if key is None:
+            return None
+        text = self.cache.get(key)
+        if text is not None:
+            logger.info(f"Rewrite cache hit ({model}), skipping generation.")
+        return text
+
+    def remember(self, key, text, model):
+        # Only real generations are stored; mock fallbacks never reach here
+        if key is not None and text:
+            self.cache.put(key, text, model=model)
+
+    def persona_prompt(self, persona_key):
         persona = self.personas.get(persona_key)
         if not persona:
             logger.warning(f"Persona {persona_key} not found, using Gossip Queen default.")
@@ -65,16 +314,253 @@ class AIWriter:
             "2. Story Body\n"
             "3. CTA Outro\n"
         )
+        return persona, system_prompt
+
+    def persona_session(self, model, persona_key, system_prompt):
+        """Session for (model, persona), priming it on first use. None if sessions can't be used.
+
+        Priming sends the system prompt with a blank user turn; the reply
+        tokens are cut off the returned context, so later generations carry
+        only the persona prefix. Only callers of the same persona wait on a
+        priming call.
+        """
+        key = (model, persona_key)
+        with self.sessions_lock:
+            if key in self.sessions:
+                return self.sessions[key]
+            priming = self.priming_locks.setdefault(key, threading.Lock())
+        with priming:
+            with self.sessions_lock:
+                if key in self.sessions:
+                    return self.sessions[key]
+            payload = self.build_payload(model, " ", system_prompt)
+            payload["options"]["num_predict"] = 1
+            try:
+                resp = self.http.post(f"{self.ollama_url}/api/generate", json=payload, timeout=self.timeout)
+                resp.raise_for_status()
+                data = resp.json()
+            except Exception as e:
+                # Not remembered: the next call tries again
+                logger.warning(f"Could not prime persona session {persona_key}@{model}: {e}")
+                return None
+            context = data.get('context') or []
+            reply_tokens = data.get('eval_count') or 0
+            session = None
+            if len(context) > reply_tokens:
+                session = PersonaSession(model, persona_key, dict(data, context=context[:len(context) - reply_tokens]),
+                                         system_prompt)
+                logger.info(f"Primed persona session {persona_key}@{model}: {session.prefix_tokens} prefix tokens "
+                            f"evaluated in {session.prefix_seconds:.2f}s")
+            else:
+                # `context` is deprecated in Ollama; keep sending the system prompt
+                logger.warning(f"Ollama returned no context for {persona_key}@{model}; sending the system prompt instead.")
+            with self.sessions_lock:
+                self.sessions[key] = session
+            return session
+
+    def attach_session(self, payload, persona_key):
+        """Swap the system prompt for the persona's evaluated context, if sessions are on."""
+        if not persona_key or not self.use_persona_sessions or not payload.get("system"):
+            return None
+        session = self.persona_session(payload["model"], persona_key, payload["system"])
+        if session is not None:
+            # The persona system prompt is already inside the session's context tokens
+            payload.pop("system")
+            payload["context"] = session.context
+        return session
+
+    def session_report(self):
+        """Measured prompt-eval savings per persona session."""
+        with self.sessions_lock:
+            sessions = [s for s in self.sessions.values() if s is not None]
+        return [s.report() for s in sessions]
+
+    def log_stats(self, stats):
+        self._local.stats = stats
+        ttft = f"{stats['ttft']:.2f}s" if stats['ttft'] is not None else "n/a"
+        rate = f"{stats['tokens_per_second']:.1f}" if stats['tokens_per_second'] else "n/a"
+        logger.info(f"Generated {stats['tokens']} tokens in {stats['total_seconds']:.1f}s (TTFT {ttft}, {rate} tok/s)")
+
+    def generate(self, model, prompt, system=None, persona_key=None, format=None):
+        payload = self.build_payload(model, prompt, system, format=format)
+        key = self.cache_key(payload)
+        text = self.cached(key, model)
+        if text is not None:
+            return text
+        session = self.attach_session(payload, persona_key)
+        started = time.perf_counter()
+        try:
+            resp = self.http.post(f"{self.ollama_url}/api/generate", json=payload, timeout=self.timeout)
+            resp.raise_for_status()
+            data = resp.json()
+            # Without streaming the first token arrives with the last one
+            stats = generation_stats(data, started, time.perf_counter(), 1)
+            self.log_stats(stats)
+            if session is not None:
+                session.record(stats, prompt)
+            self.remember(key, data['response'], model)
+            return data['response']
+        except Exception as e:
+            logger.error(f"Ollama generation failed: {e}")
+            return self.mock_script(model, prompt)
+
+    def generate_stream(self, model, prompt, system=None, on_hook=None, persona_key=None):
+        """Yield response text chunks as Ollama produces them (NDJSON stream).
+
+        `on_hook(hook_text)` is called once, as soon as the Hook section is
+        complete, so hook TTS can start while the body is still generating.
+        Timing is logged and kept in `self.last_stats` (per thread). A rewrite-cache hit
+        is yielded as a single chunk.
+        """
+        payload = self.build_payload(model, prompt, system, stream=True)
+        key = self.cache_key(payload)
+        text = self.cached(key, model)
+        if text is not None:
+            yield text
+            if on_hook is not None:
+                hook = extract_hook(text, complete=True)
+                if hook:
+                    on_hook(hook)
+            return
+        session = self.attach_session(payload, persona_key)
+        started = time.perf_counter()
+        first_token_at = None
+        chunks = 0
+        text = ""
+        hook_sent = on_hook is None
+        final = {}
+        try:
+            with self.http.post(f"{self.ollama_url}/api/generate", json=payload, stream=True, timeout=self.timeout) as resp:
+                resp.raise_for_status()
+                # chunk_size=None: hand over each chunk as soon as it arrives
+                for line in resp.iter_lines(chunk_size=None):
+                    if not line:
+                        continue
+                    chunk = json.loads(line)
+                    if chunk.get('error'):
+                        raise RuntimeError(chunk['error'])
+                    piece = chunk.get('response', '')
+                    if piece:
+                        if first_token_at is None:
+                            first_token_at = time.perf_counter()
+                        chunks += 1
+                        text += piece
+                        yield piece
+                        if not hook_sent:
+                            hook = extract_hook(text)
+                            if hook:
+                                hook_sent = True
+                                on_hook(hook)
+                    if chunk.get('done'):
+                        final = chunk
+                        break
+        except Exception as e:
+            logger.error(f"Ollama streaming failed: {e}")
+            if text:
+                # Keep what was already streamed; don't append a mock script to it
+                return
+            text = self.mock_script(model, prompt)
+            yield text
+        else:
+            stats = generation_stats(final, started, first_token_at, chunks)
+            self.log_stats(stats)
+            if session is not None:
+                session.record(stats, prompt)
+            if final:
+                self.remember(key, text, model)
+
+        if not hook_sent:
+            hook = extract_hook(text, complete=True)
+            if hook:
+                on_hook(hook)
+
+    def rewrite_article(self, article_text, persona_key="gossip_queen", model="mistral", stream=False, on_chunk=None, on_hook=None):
+        persona, system_prompt = self.persona_prompt(persona_key)
         
         # Base User Prompt
         user_prompt = self.prompts['base_rewrite'].format(article_text=article_text)
         
         # Generate
         logger.info(f"Generating script with persona: {persona['name']}")
-        script = self.generate(model, user_prompt, system=system_prompt)
-        
+        if not stream:
+            return self.generate(model, user_prompt, system=system_prompt, persona_key=persona_key)
+
+        # Streaming: hand chunks/hook to the caller as they arrive, return the full script
+        script = ""
+        for piece in self.generate_stream(model, user_prompt, system=system_prompt, on_hook=on_hook, persona_key=persona_key):
+            script += piece
+            if on_chunk:
+                on_chunk(piece)
+        return script
+
+    def restyle(self, script, persona_key, model="mistral"):
+        """Re-voice an existing script for another persona (short style-transfer prompt).
+
+        A structured script (dict) comes back structured, keeping its keywords
+        if the model drops them.
+        """
+        persona, system_prompt = self.persona_prompt(persona_key)
+        logger.info(f"Restyling script for persona: {persona['name']}")
+        if not isinstance(script, dict):
+            user_prompt = self.prompts['style_transfer'].format(script=script)
+            return self.generate(model, user_prompt, system=system_prompt, persona_key=persona_key)
+        user_prompt = self.prompts['style_transfer'].format(script=script_text(script)) + self.prompts['structured_output']
+        reply = self.generate(model, user_prompt, system=system_prompt, persona_key=persona_key, format=SCRIPT_SCHEMA)
+        return self.parse_reply(reply, script.get('keywords'))
+
+    def restyle_many(self, script, persona_keys, model="mistral", max_in_flight=None):
+        """Restyle one script for several personas concurrently; returns {persona_key: script}."""
+        persona_keys = list(dict.fromkeys(persona_keys))
+        if not persona_keys:
+            return {}
+        workers = max(1, min(max_in_flight or self.max_in_flight, len(persona_keys)))
+        self.ensure_pool(workers)
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            scripts = pool.map(lambda key: self.restyle(script, key, model=model), persona_keys)
+            return dict(zip(persona_keys, scripts))
+
+    def parse_reply(self, reply, fallback_keywords=None):
+        script = parse_script(reply, fallback_keywords)
+        if script['repaired']:
+            logger.warning("Structured script was not valid JSON; repaired it.")
         return script
 
+    def rewrite_structured(self, article_text, persona_key="gossip_queen", model="mistral", fallback_keywords=None):
+        """Like rewrite_article, but returns {"hook", "body", "cta", "keywords"}.
+
+        The reply is constrained with Ollama's `format` (SCRIPT_SCHEMA), then
+        validated and repaired by parse_script(). `fallback_keywords` fill in
+        stock-search keywords if the model gives none.
+        """
+        persona, system_prompt = self.persona_prompt(persona_key)
+        user_prompt = self.prompts['base_rewrite'].format(article_text=article_text) + self.prompts['structured_output']
+        logger.info(f"Generating structured script with persona: {persona['name']}")
+        reply = self.generate(model, user_prompt, system=system_prompt, persona_key=persona_key, format=SCRIPT_SCHEMA)
+        return self.parse_reply(reply, fallback_keywords)
+
+    def rewrite_articles(self, article_texts, persona_key="gossip_queen", model="mistral", max_in_flight=None):
+        """Rewrite many articles concurrently; results come back in input order.
+
+        At most `max_in_flight` (default: self.max_in_flight) generations run
+        at once, all over the shared keep-alive session.
+        """
+        article_texts = list(article_texts)
+        if not article_texts:
+            return []
+        workers = max(1, min(max_in_flight or self.max_in_flight, len(article_texts)))
+        self.ensure_pool(workers)
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            scripts = list(pool.map(
+                lambda text: self.rewrite_article(text, persona_key=persona_key, model=model),
+                article_texts,
+            ))
+        logger.info(f"Rewrote {len(scripts)} articles in {time.perf_counter() - started:.1f}s ({workers} in flight)")
+        for report in self.session_report():
+            logger.info(f"Persona session {report['persona']}@{report['model']}: prefix reused on "
+                        f"{report['calls']} calls, ~{report['saved_prompt_eval_seconds']:.1f}s prompt eval saved")
+        return scripts
+
 if __name__ == "__main__":
     writer = AIWriter()
     sample_text = "Brad Pitt was seen eating a burger in New York yesterday. He looked happy."
@@ -4,13 +4,23 @@ import logging
 import os
 import yaml
 from backend.models import init_db
-from backend.ingestion import fetch_and_save_articles
+from backend.ingestion import fetch_and_save_articles, load_config as load_sources_config
+from backend.extraction import extract_full_text
 from backend.trends import TrendEngine, Article
 from backend.worker import process_article_task
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+_trend_engine = None
+
+def get_trend_engine():
+    # Built once per scheduler process so the embedding model is loaded once
+    global _trend_engine
+    if _trend_engine is None:
+        _trend_engine = TrendEngine()
+    return _trend_engine
+
 def run_cycle():
     logger.info("Starting Daily Cycle...")
     
@@ -18,17 +28,23 @@ def run_cycle():
     fetch_and_save_articles()
     
     # 2. Trends
-    trend_engine = TrendEngine()
+    trend_engine = get_trend_engine()
     trend_engine.calculate_trends()
     
-    # 3. Select Top Stories
-    top_stories = trend_engine.get_top_stories(limit=3)
+    # 3. Select Top Stories (optionally pulling full text for the top-K first)
+    extraction_settings = load_sources_config().get('extraction_settings', {})
+    if extraction_settings.get('enabled', False):
+        candidates = list(trend_engine.get_top_stories(limit=extraction_settings.get('top_k', 10)))
+        extract_full_text(candidates, extraction_settings)
+        top_stories = candidates[:3]
+    else:
+        top_stories = trend_engine.get_top_stories(limit=3)
     
-    # 4. Queue Processing
+    # 4. Queue Processing (one rewrite per story, fanned out to every tenant's persona/language)
+    tenant_configs = load_tenant_configs()
     for story in top_stories:
         logger.info(f"Queueing story: {story.title} (Score: {story.trend_score})")
-        # In a real multi-tenant app, we'd loop tenants here
-        process_article_task.delay(story.id)
+        process_article_task.delay(story.id, tenant_configs=tenant_configs)
         
     logger.info("Cycle complete.")
 
@@ -40,6 +56,18 @@ def load_tenants():
     # Logic to load individual tenant configs would go here
     return os.listdir(tenants_dir)
 
+def load_tenant_configs():
+    configs = []
+    for name in sorted(load_tenants()):
+        config_path = os.path.join(os.getcwd(), 'tenants', name, 'config.yaml')
+        if not os.path.exists(config_path):
+            continue
+        with open(config_path, 'r') as f:
+            config = yaml.safe_load(f) or {}
+        config.setdefault('name', name)
+        configs.append(config)
+    return configs
+
 if __name__ == "__main__":
     init_db()
     